@@ -0,0 +1,91 @@
+"""
+Per-frame cost of the dashboard renderer.
+
+Compares the old approach (spawn `clear`/`cls` + tabulate every grid +
+print) with TerminalRenderer (row-cached grids, redraw changed rows only).
+Output goes to an in-memory buffer so terminal speed does not skew the
+numbers.
+
+    python benchmarks/bench_render.py --positions 50 --frames 200
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+os.environ.setdefault('MT5_BACKEND', 'sim')  # tidak butuh terminal MT5
+
+import monitor  # noqa: E402
+from tabulate import tabulate  # noqa: E402
+
+
+def make_data(n_positions, n_history):
+    account = {'balance': 1000.0, 'equity': 1002.5, 'free_margin': 950.0}
+    positions = [{'type': 'BUY' if i % 2 else 'SELL', 'symbol': 'XAUUSDm', 'volume': 0.01,
+                  'price_open': 2000.0 + i, 'sl': 1995.0 + i, 'tp': 2005.0 + i, 'profit': 0.5 * i}
+                 for i in range(n_positions)]
+    history = [{'type': 'BUY', 'symbol': 'XAUUSDm', 'volume': 0.01, 'price_open': 2000.0,
+                'price_close': 2001.0, 'time_close': 1_700_000_000 + i * 60, 'profit': (-1) ** i * 1.0}
+               for i in range(n_history)]
+    return account, positions, history
+
+
+def tick(positions, frame):
+    # Simulasi harga bergerak: hanya profit posisi pertama yang berubah
+    if positions:
+        positions[0] = dict(positions[0], profit=frame * 0.01)
+
+
+def _tabulate_grid(rows, headers=(), tablefmt="grid", colalign=None):
+    return tabulate(rows, headers=headers, tablefmt=tablefmt, colalign=colalign)
+
+
+def bench_legacy(frames, account, positions, history):
+    buf = io.StringIO()
+    grid, monitor._grid = monitor._grid, _tabulate_grid
+    t0 = time.perf_counter()
+    for f in range(frames):
+        tick(positions, f)
+        os.system('cls' if os.name == 'nt' else 'true')
+        with redirect_stdout(buf):
+            for line in monitor.build_monitor(account, positions, history):
+                print(line)
+        buf.seek(0)
+        buf.truncate()
+    elapsed = time.perf_counter() - t0
+    monitor._grid = grid
+    return elapsed / frames
+
+
+def bench_diff(frames, account, positions, history):
+    buf = io.StringIO()
+    renderer = monitor.TerminalRenderer(max_fps=0, stream=buf)
+    t0 = time.perf_counter()
+    for f in range(frames):
+        tick(positions, f)
+        renderer.render(monitor.build_monitor(account, positions, history))
+        buf.seek(0)
+        buf.truncate()
+    return (time.perf_counter() - t0) / frames
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--positions', type=int, default=20)
+    ap.add_argument('--history', type=int, default=10)
+    ap.add_argument('--frames', type=int, default=200)
+    args = ap.parse_args()
+
+    data = make_data(args.positions, args.history)
+    legacy = bench_legacy(args.frames, *data)
+    data = make_data(args.positions, args.history)
+    diff = bench_diff(args.frames, *data)
+    print(f"legacy (clear + full redraw): {legacy * 1e6:9.1f} us/frame")
+    print(f"diff renderer               : {diff * 1e6:9.1f} us/frame")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,481 @@
+"""
+Benchmark suite for the bot's hot paths.
+
+Runs against the offline simulator (mt5sim) with synthetic candles, so no
+terminal is needed and runs are comparable between machines/commits.
+
+    python benchmarks/bench_suite.py list
+    python benchmarks/bench_suite.py run --out base.json
+    python benchmarks/bench_suite.py run --filter detect_signal --out new.json
+    python benchmarks/bench_suite.py compare base.json new.json --threshold 0.10
+
+``run`` writes a JSON file (per case: median/min/mean/stdev in microseconds
+per call, plus machine/commit info). ``compare`` prints the ratio per case
+and exits with status 1 if any case got slower than the threshold.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime, timezone
+
+# Backend & config untuk benchmark; .env tidak menimpa nilai yang sudah di-set
+_tmp = tempfile.mkdtemp(prefix='mt5bench-')
+for key, value in {
+    'MT5_BACKEND': 'sim', 'MT5_SIM_SPEED': '0', 'RENDER': 'off', 'METRICS': 'off',
+    'HISTORY_DB': os.path.join(_tmp, 'history_{login}.db'),
+    'RISK_PERCENT': '1.0', 'DAILY_LOSS_LIMIT': '1e12', 'MAX_TRADES_PER_DAY': '1000000000',
+    'POLL_INTERVAL': '1', 'MIN_LOT': '0.01', 'SYMBOL': 'BENCH', 'TIMEFRAME': 'M1',
+}.items():
+    os.environ.setdefault(key, value)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from tabulate import tabulate  # noqa: E402
+
+import mt5sim  # noqa: E402
+
+SYMBOL = 'BENCH'
+SEED = 42
+
+CASES = {}
+
+
+def case(name):
+    """Register ``setup() -> fn`` under ``name``; fn() is timed."""
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+# ================================
+# === DATA =======================
+# ================================
+def make_rates(n, seed=SEED, start=1_700_000_000):
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 0.5, n))
+    rates = np.zeros(n, mt5sim.RATES_DTYPE)
+    rates['time'] = start // 60 * 60 + 60 * np.arange(n)
+    rates['open'] = np.r_[close[0], close[:-1]]
+    rates['close'] = close
+    rates['high'] = np.maximum(rates['open'], close) + np.abs(rng.normal(0, 0.3, n))
+    rates['low'] = np.minimum(rates['open'], close) - np.abs(rng.normal(0, 0.3, n))
+    rates['tick_volume'] = rng.integers(1, 200, n)
+    rates['spread'] = 20
+    for k in ('open', 'high', 'low', 'close'):
+        rates[k] = np.round(rates[k], 2)
+    return rates
+
+
+def make_deals(n, symbol=SYMBOL, seed=SEED):
+    """``n`` closed BUY/SELL deals spread over the last 6 days (wall clock)."""
+    rng = np.random.default_rng(seed)
+    now = int(time.time())
+    times = np.sort(rng.integers(now - 6 * 86400, now - 60, n))
+    return [mt5sim.TradeDeal(5_000_000 + i, 0, int(t), int(t) * 1000, int(i % 2), 1, 0, 4_000_000 + i,
+                             3, 0.01, 2000.0, 0.0, 0.0, float(np.round(rng.normal(0, 5), 2)), 0.0,
+                             symbol, '')
+            for i, t in enumerate(times)]
+
+
+def sim(bars=600_000, warmup=5_000):
+    """Fresh simulator with ``bars`` synthetic M1 candles for SYMBOL."""
+    import connector
+    import positions
+    s = mt5sim.configure(data={SYMBOL: make_rates(bars)}, speed=0, warmup=warmup, balance=1e6,
+                         seed=SEED)
+    mt5sim.initialize()
+    # Reset cache modul supaya tiap case mulai bersih
+    connector.invalidate(specs=True)
+    connector._candle_buffers.clear()
+    positions._book = None
+    connector._trade_stats = None
+    if connector._history_store is not None:
+        connector._history_store.close()
+        connector._history_store = None
+    for f in os.listdir(_tmp):
+        os.remove(os.path.join(_tmp, f))
+    return s
+
+
+# ================================
+# === CASES ======================
+# ================================
+def _detect_full(n):
+    from strategy import detect_signal
+
+    def setup():
+        df = pd.DataFrame(make_rates(n))
+        return lambda: detect_signal(df)
+    return setup
+
+
+case('detect_signal[500]')(_detect_full(500))
+case('detect_signal[5k]')(_detect_full(5_000))
+case('detect_signal[500k]')(_detect_full(500_000))
+
+
+@case('detect_signal_incremental[500]')
+def _detect_incremental():
+    from strategy import detect_signal, signal_engine
+    rates = make_rates(600_000)
+    engine = signal_engine()
+    pos = [0]
+
+    def fn():
+        # Satu bar baru per call, window 500 bar (seperti loop live)
+        k = pos[0] = pos[0] + 1
+        if k + 500 > len(rates):
+            pos[0] = k = 0
+            engine.reset()
+        detect_signal(rates[k:k + 500], engine=engine)
+    return fn
+
+
+@case('strategy_set[3 strategies,500]')
+def _strategy_set():
+    from strategy import StrategySet
+    rates = make_rates(600_000)
+    strategies = StrategySet(['macd_rsi', 'macd_trend', 'bb_revert'])
+    pos = [0]
+
+    def fn():
+        # Tiga strategi, satu graph bersama, satu bar baru per call
+        k = pos[0] = pos[0] + 1
+        if k + 500 > len(rates):
+            pos[0] = k = 0
+            strategies.graph.reset()
+        strategies.evaluate(rates[k:k + 500])
+    return fn
+
+
+@case('get_candles[500]')
+def _get_candles():
+    import connector
+    sim()
+    connector.get_candles(SYMBOL, mt5sim.TIMEFRAME_M1, 500)
+    return lambda: connector.get_candles(SYMBOL, mt5sim.TIMEFRAME_M1, 500)
+
+
+@case('get_candle_view[500]')
+def _get_candle_view():
+    import connector
+    sim()
+    connector.get_candle_view(SYMBOL, mt5sim.TIMEFRAME_M1, 500)
+    return lambda: connector.get_candle_view(SYMBOL, mt5sim.TIMEFRAME_M1, 500)
+
+
+def _history(sync):
+    def setup():
+        import connector
+        s = sim()
+        s.deals = make_deals(10_000)
+        connector.sync_history()
+        return lambda: connector.get_history(sync=sync)
+    return setup
+
+
+case('get_history[10k]')(_history(sync=False))
+case('get_history[10k,sync]')(_history(sync=True))
+
+
+@case('trade_stats.add')
+def _trade_stats():
+    from trade_stats import StatsBook
+    book = StatsBook()
+    deals = [dict(zip(('ticket', 'time', 'time_msc', 'type', 'entry', 'symbol', 'volume', 'price',
+                       'profit', 'commission', 'swap'),
+                      (d.ticket, d.time, d.time_msc, d.type, d.entry, d.symbol, d.volume, d.price,
+                       d.profit, d.commission, d.swap)))
+             for d in make_deals(1000)]
+    i = [0]
+
+    def fn():
+        book.add(deals[i[0] % 1000])
+        i[0] += 1
+    return fn
+
+
+@case('print_monitor[200pos,stats]')
+def _print_monitor_stats():
+    import io
+    import connector
+    import monitor
+    s = sim()
+    s.deals = make_deals(10_000)
+    connector.sync_history()
+    stats = connector.get_trade_stats()
+    account = {'balance': 1000.0, 'equity': 1002.5, 'free_margin': 950.0}
+    positions = [{'type': 'BUY' if i % 2 else 'SELL', 'symbol': SYMBOL, 'volume': 0.01,
+                  'price_open': 2000.0 + i, 'sl': 1995.0 + i, 'tp': 2005.0 + i, 'profit': 0.5 * i}
+                 for i in range(200)]
+    buf = io.StringIO()
+    monitor._renderer = monitor.TerminalRenderer(max_fps=0, stream=buf)
+
+    def fn():
+        monitor.print_monitor(account, positions, [], stats=stats)
+        buf.seek(0)
+        buf.truncate()
+    return fn
+
+
+@case('print_monitor[200pos,1k hist]')
+def _print_monitor():
+    import io
+    import monitor
+    account = {'balance': 1000.0, 'equity': 1002.5, 'free_margin': 950.0}
+    positions = [{'type': 'BUY' if i % 2 else 'SELL', 'symbol': SYMBOL, 'volume': 0.01,
+                  'price_open': 2000.0 + i, 'sl': 1995.0 + i, 'tp': 2005.0 + i, 'profit': 0.5 * i}
+                 for i in range(200)]
+    history = [{'type': 'BUY', 'symbol': SYMBOL, 'volume': 0.01, 'price_open': 2000.0,
+                'price_close': 2001.0, 'time_close': 1_700_000_000 + i * 60,
+                'profit': (-1) ** i * 1.0} for i in range(1000)]
+    buf = io.StringIO()
+    monitor._renderer = monitor.TerminalRenderer(max_fps=0, stream=buf)
+    frame = [0]
+
+    def fn():
+        frame[0] += 1
+        positions[0] = dict(positions[0], profit=frame[0] * 0.01)
+        monitor.print_monitor(account, positions, history)
+        buf.seek(0)
+        buf.truncate()
+    return fn
+
+
+@case('get_positions[200pos]')
+def _get_positions():
+    """Position book delta sync with 200 open positions, nothing changed."""
+    from connector import get_positions
+    from trader import send_market_order
+    sim()
+    for i in range(200):
+        send_market_order(SYMBOL, 'BUY' if i % 2 else 'SELL', 0.01, 0, 0)
+    return lambda: get_positions()
+
+
+@case('lot_by_risk')
+def _lot_by_risk():
+    from risk_manager import lot_by_risk
+    sim()
+    return lambda: lot_by_risk(SYMBOL, 2000.0, 1998.5, 1.0)
+
+
+@case('lot_by_risk[equity]')
+def _lot_by_risk_equity():
+    from risk_manager import lot_by_risk
+    sim()
+    return lambda: lot_by_risk(SYMBOL, 2000.0, 1998.5, 1.0, equity=1000.0)
+
+
+@case('run_loop_iteration')
+def _run_loop_iteration():
+    """
+    One poll-loop iteration for one target: new M1 bar on the simulator,
+    candle fetch, account/positions fetch, dashboard publish and main.on_tick
+    (signal, sizing, order). Mirrors monitor._poll_loop without the waits.
+    """
+    import main
+    import monitor
+    from portfolio import RiskLedger
+    s = sim()
+    target = (SYMBOL, mt5sim.TIMEFRAME_M1)
+    main.states.clear()
+    main.states[target] = main.SymbolState(SYMBOL, 'M1')
+    main.start_balance = 1e6
+    main.target_balance = float('inf')
+    main.min_balance = float('-inf')
+    main.ledger = RiskLedger()
+    dashboard = monitor.Dashboard(monitor.TerminalRenderer(headless=True))
+    devnull = open(os.devnull, 'w')
+
+    def fn():
+        s.advance(60)
+        candles = monitor._fetch_candles(*target)
+        account, positions, by_symbol = monitor._fetch_shared()
+        dashboard.publish(account, positions)
+        with contextlib.redirect_stdout(devnull):
+            main.on_tick(target, account, candles, by_symbol.get(SYMBOL, []))
+    return fn
+
+
+def _loop_iteration(use_async):
+    """
+    One pass of the real monitor loop (monitor._poll_loop or
+    monitor._async_loop, trigger=poll) over 3 targets with a 1 ms simulated
+    terminal round-trip per read: candles, account and positions fetched,
+    then ``on_tick`` for every target. The loop stops after the last one.
+    """
+    def setup():
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        import connector
+        import monitor
+        from async_connector import AsyncConnector
+        s = sim()
+        targets = [(SYMBOL, tf) for tf in (mt5sim.TIMEFRAME_M1, mt5sim.TIMEFRAME_M5,
+                                           mt5sim.TIMEFRAME_M15)]
+        for t in targets:
+            connector.get_candle_view(*t, 500)
+        s.read_latency_ms = 1.0
+        dashboard = monitor.Dashboard(monitor.TerminalRenderer(headless=True))
+        seen = []
+
+        def on_tick(target, account, candles, positions, event=None):
+            seen.append(target)
+            if len(seen) == len(targets):
+                monitor.running = False
+
+        pool = ThreadPoolExecutor(max_workers=len(targets))
+        conn = AsyncConnector(len(targets) + 2)
+        loop = asyncio.new_event_loop()
+
+        def fn():
+            seen.clear()
+            monitor.running = True
+            if use_async:
+                loop.run_until_complete(monitor._async_loop(targets, on_tick, conn, dashboard))
+            else:
+                monitor._poll_loop(targets, on_tick, pool, dashboard)
+        return fn
+    return setup
+
+
+case('loop_iteration[sync,3 targets]')(_loop_iteration(False))
+case('loop_iteration[async,3 targets]')(_loop_iteration(True))
+
+
+# ================================
+# === RUN / COMPARE ==============
+# ================================
+def measure(fn, repeat=5, min_time=0.2):
+    """Per-call seconds for ``repeat`` runs, each at least ``min_time`` long."""
+    fn()  # warm-up: lazy import, cache pertama, dll.
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.2))
+    runs = [elapsed / number] + [t / number for t in timer.repeat(repeat - 1, number)]
+    return runs, number
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(pattern=None, repeat=5, min_time=0.2):
+    results = {}
+    for name, setup in CASES.items():
+        if pattern and not re.search(pattern, name):
+            continue
+        fn = setup()
+        runs, number = measure(fn, repeat, min_time)
+        results[name] = {
+            'median_us': statistics.median(runs) * 1e6,
+            'min_us': min(runs) * 1e6,
+            'mean_us': statistics.mean(runs) * 1e6,
+            'stdev_us': statistics.stdev(runs) * 1e6 if len(runs) > 1 else 0.0,
+            'number': number,
+            'repeat': repeat,
+        }
+        print(f"{name:<34} {results[name]['median_us']:>12.2f} us/call "
+              f"(min {results[name]['min_us']:.2f}, x{number})", file=sys.stderr)
+    return {
+        'meta': {
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+
+def compare(old, new, threshold=0.10):
+    """Rows of (case, old us, new us, ratio, verdict); ratio = new / old on the median."""
+    rows, regressions = [], 0
+    for name in sorted(set(old['results']) | set(new['results'])):
+        a, b = old['results'].get(name), new['results'].get(name)
+        if a is None or b is None:
+            rows.append([name, a and f"{a['median_us']:.2f}", b and f"{b['median_us']:.2f}", '', 'missing'])
+            continue
+        ratio = b['median_us'] / a['median_us'] if a['median_us'] else float('inf')
+        if ratio > 1 + threshold:
+            verdict = 'SLOWER'
+            regressions += 1
+        elif ratio < 1 - threshold:
+            verdict = 'faster'
+        else:
+            verdict = ''
+        rows.append([name, f"{a['median_us']:.2f}", f"{b['median_us']:.2f}", f"{ratio:.2f}x", verdict])
+    return rows, regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark suite for the MT5 bot hot paths')
+    sub = ap.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help='list benchmark cases')
+    p_run = sub.add_parser('run', help='run benchmarks')
+    p_run.add_argument('--filter', help='regex on case names')
+    p_run.add_argument('--repeat', type=int, default=5)
+    p_run.add_argument('--min-time', type=float, default=0.2, help='seconds per repeat')
+    p_run.add_argument('--out', help="write JSON results here ('-' = stdout)")
+    p_cmp = sub.add_parser('compare', help='compare two result files')
+    p_cmp.add_argument('old')
+    p_cmp.add_argument('new')
+    p_cmp.add_argument('--threshold', type=float, default=0.10,
+                       help='relative slowdown counted as regression (default 0.10)')
+    args = ap.parse_args()
+
+    if args.command == 'list':
+        print('\n'.join(CASES))
+        return 0
+
+    if args.command == 'run':
+        report = run(args.filter, args.repeat, args.min_time)
+        text = json.dumps(report, indent=2)
+        if args.out == '-':
+            print(text)
+        elif args.out:
+            with open(args.out, 'w') as f:
+                f.write(text + '\n')
+        return 0
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    rows, regressions = compare(old, new, args.threshold)
+    print(f"old: {old['meta'].get('commit')} {old['meta'].get('time')}")
+    print(f"new: {new['meta'].get('commit')} {new['meta'].get('time')}")
+    print(tabulate(rows, headers=['Case', 'Old us', 'New us', 'New/Old', ''], tablefmt='grid'))
+    if regressions:
+        print(f"{regressions} case(s) slower than {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Asyncio front-end for connector.
+
+The MetaTrader5 calls block, so they run on one dedicated thread pool
+(MT5_IO_WORKERS threads) and are awaited from the event loop. Account,
+positions and the candles of every target can then be fetched at the
+same time, and a loop iteration costs about the slowest call instead of
+the sum of all of them.
+
+A request for a resource that is already in flight is merged with it:
+the second caller awaits the first call's future instead of starting
+another round-trip. The key names the resource; the caller that owns
+the fetch (monitor._async_loop) picks it. The caches and the position
+book in connector stay the single source of truth; this module only
+changes who waits.
+
+    conn = AsyncConnector()
+    account, positions = await asyncio.gather(
+        conn.call(('account',), connector.get_account_info),
+        conn.call(('positions', None), connector.get_positions))
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+import connector
+
+load_dotenv()
+
+MT5_IO_WORKERS = int(os.getenv('MT5_IO_WORKERS', '8'))
+
+
+class AsyncConnector:
+
+    def __init__(self, workers=MT5_IO_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mt5')
+        self._inflight = {}     # key -> asyncio.Future dari run_in_executor
+        self.calls = 0
+        self.merged = 0         # request yang menumpang call yang sedang jalan
+
+    def call(self, key, fn, *args):
+        """
+        Awaitable result of ``fn(*args)`` run on the executor. While a call
+        for ``key`` is in flight, further calls with the same key share it.
+        Must be called from the event loop thread.
+        """
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda f: self._inflight.pop(key, None)
+                                  if self._inflight.get(key) is f else None)
+            self.calls += 1
+        else:
+            self.merged += 1
+        # shield: satu pemanggil yang di-cancel tidak membatalkan yang lain
+        return asyncio.shield(fut)
+
+    def tick(self, symbol, max_age=None):
+        return self.call(('tick', symbol), connector.get_tick, symbol, max_age)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,19 @@
+"""
+Pick the MetaTrader5 implementation used by every module.
+
+    MT5_BACKEND=terminal  (default) the MetaTrader5 package / Windows terminal
+    MT5_BACKEND=sim       offline replay from recorded data (mt5sim.py)
+
+Modules import ``mt5`` from here instead of importing MetaTrader5 directly.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MT5_BACKEND = os.getenv('MT5_BACKEND', 'terminal').lower()
+
+if MT5_BACKEND == 'sim':
+    import mt5sim as mt5
+else:
+    import MetaTrader5 as mt5
@@ -0,0 +1,275 @@
+"""
+Vectorized backtest for the MACD/RSI strategy in strategy.detect_signal.
+
+Entry conditions are computed over whole NumPy arrays, exits are found with a
+chunked first-touch search over the high/low arrays, and position sizing uses
+the same rules as risk_manager.lot_by_risk (including the MAX_LOT cap).
+
+Signals are evaluated on closed bars and filled at the bar close. Like the
+live bot, every signal opens a new trade regardless of positions already open.
+When SL and TP are both touched inside the same bar the SL is assumed to have
+been hit first.
+
+Usage:
+    python src/backtest.py candles.csv --mode scalping --equity 1000
+"""
+import argparse
+import heapq
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from strategy import DEFAULT_PARAMS, macd, rsi, mode_pcts
+from risk_manager import MAX_LOT, pip_value_of, volume_limits, size_lots, size_lots_array
+
+# Nilai default untuk XAUUSD (contract 100, tick 0.01 = $1 per lot)
+DEFAULT_SPEC = dict(trade_tick_value=1.0, trade_tick_size=0.01, volume_step=0.01,
+                    volume_min=0.01, volume_max=200.0)
+
+TRADE_DTYPE = np.dtype([
+    ('entry_idx', '<i8'), ('exit_idx', '<i8'), ('entry_time', '<i8'), ('exit_time', '<i8'),
+    ('side', '<i1'), ('entry', '<f8'), ('exit', '<f8'), ('sl', '<f8'), ('tp', '<f8'),
+    ('lots', '<f8'), ('pnl', '<f8'), ('reason', 'U3'),
+])
+
+
+def load_candles(path):
+    """
+    Load candles from ``.npy`` (MT5 rates structured array), a candle store
+    series (``.candles``, mapped without copying) or CSV with
+    time/open/high/low/close columns. Returns a dict of NumPy arrays.
+    """
+    if path.endswith('.candles'):
+        from candle_store import CandleSeries
+        return CandleSeries(path[:-len('.candles')]).columns()
+    if path.endswith('.npy'):
+        rates = np.load(path, mmap_mode='r')
+        return {k: np.asarray(rates[k]) for k in ('time', 'open', 'high', 'low', 'close')}
+    df = pd.read_csv(path)
+    df.columns = [c.strip('<>').lower() for c in df.columns]
+    t = df['time']
+    if not np.issubdtype(t.dtype, np.number):
+        t = pd.to_datetime(t).astype('int64') // 10**9
+    out = {'time': np.asarray(t, dtype=np.int64)}
+    for k in ('open', 'high', 'low', 'close'):
+        out[k] = df[k].to_numpy(dtype=float)
+    return out
+
+
+def compute_signals(close, fast=3, slow=8, signal=3, rsi_period=7, rsi_upper=70, rsi_lower=30,
+                    warmup=30):
+    """Boolean buy/sell arrays, same crossover + RSI rules as detect_signal."""
+    closes = pd.Series(close, dtype=float)
+    macd_line, signal_line, _ = macd(closes, fast=fast, slow=slow, signal=signal)
+    m = macd_line.to_numpy()
+    s = signal_line.to_numpy()
+    r = rsi(closes, period=rsi_period).to_numpy()
+    buy = np.zeros(len(closes), dtype=bool)
+    sell = np.zeros(len(closes), dtype=bool)
+    buy[1:] = (m[:-1] < s[:-1]) & (m[1:] > s[1:]) & (r[1:] < rsi_upper)
+    sell[1:] = (m[:-1] > s[:-1]) & (m[1:] < s[1:]) & (r[1:] > rsi_lower)
+    # detect_signal butuh minimal 30 candle
+    buy[:warmup - 1] = False
+    sell[:warmup - 1] = False
+    return buy, sell
+
+
+def first_touch(high, low, start, side, sl, tp, chunk=8, max_cells=1 << 22):
+    """
+    Index and price of the first bar at or after ``start`` where SL or TP is
+    touched, for many trades at once.
+
+    Trades are scanned ``chunk`` bars at a time as a 2-D (trades x bars)
+    block; the ones still open go to the next round with a doubled window.
+    Trades that never exit are closed at the last close (reason 'end').
+    """
+    n = len(high)
+    m = len(start)
+    exit_idx = np.full(m, n - 1, dtype=np.int64)
+    hit_sl = np.zeros(m, dtype=bool)
+    hit_tp = np.zeros(m, dtype=bool)
+    pending = np.arange(m)
+    pos = start.astype(np.int64).copy()
+    width = chunk
+    while pending.size:
+        rows_per_batch = max(1, max_cells // width)
+        still = []
+        for b in range(0, pending.size, rows_per_batch):
+            rows = pending[b:b + rows_per_batch]
+            idx = pos[rows, None] + np.arange(width)
+            valid = idx < n
+            np.minimum(idx, n - 1, out=idx)
+            h = high[idx]
+            l = low[idx]
+            is_buy = (side[rows] > 0)[:, None]
+            s_hit = np.where(is_buy, l <= sl[rows, None], h >= sl[rows, None]) & valid
+            t_hit = np.where(is_buy, h >= tp[rows, None], l <= tp[rows, None]) & valid
+            any_hit = s_hit | t_hit
+            found = any_hit.any(axis=1)
+            first = any_hit.argmax(axis=1)
+            r = np.nonzero(found)[0]
+            done = rows[r]
+            exit_idx[done] = idx[r, first[r]]
+            hit_sl[done] = s_hit[r, first[r]]
+            hit_tp[done] = ~hit_sl[done]
+            more = ~found & (pos[rows] + width < n)
+            still.append(rows[more])
+        pending = np.concatenate(still) if still else pending[:0]
+        pos[pending] += width
+        width *= 2
+    return exit_idx, hit_sl, hit_tp
+
+
+def _size_trades(entry_idx, exit_idx, pnl_per_lot, stop_dist, equity, risk_percent,
+                 pip_value, lot_step, min_volume, max_volume, min_lot, max_iter=20):
+    """
+    Lots per trade, sized from the realized equity at entry.
+
+    Equity depends on the lots of earlier trades, so sizing is solved as a
+    fixed point: guess lots, derive equity at every entry with a cumsum,
+    resize, repeat. With the MAX_LOT cap this converges in a couple of
+    vectorized passes; the sequential loop is only a fallback.
+    """
+    order = np.argsort(exit_idx, kind='stable')
+    closed_before = np.searchsorted(exit_idx[order], entry_idx, side='right')
+    lots = np.full(len(entry_idx), MAX_LOT)
+    for _ in range(max_iter):
+        realized = equity + np.concatenate(([0.0], np.cumsum((pnl_per_lot * lots)[order])))
+        new_lots = size_lots_array(realized[closed_before], risk_percent, stop_dist, pip_value,
+                                   lot_step, min_volume, max_volume, min_lot)
+        if np.array_equal(new_lots, lots):
+            return lots
+        lots = new_lots
+
+    # Sizing pakai equity saat entry (trade yang sudah close sebelum bar ini)
+    open_heap = []
+    realized = equity
+    for k in range(len(entry_idx)):
+        i = entry_idx[k]
+        while open_heap and open_heap[0][0] <= i:
+            realized += heapq.heappop(open_heap)[1]
+        lots[k] = size_lots(realized, risk_percent, stop_dist[k], pip_value,
+                            lot_step, min_volume, max_volume, min_lot)
+        heapq.heappush(open_heap, (exit_idx[k], pnl_per_lot[k] * lots[k]))
+    return lots
+
+
+def run_backtest(candles, mode='scalping', equity=1000.0, risk_percent=1.0, min_lot=0.01,
+                 spec=None, spread=0.0, params=None, start=0, end=None, trade_from=None):
+    """
+    Backtest over ``candles`` (dict of arrays, see load_candles).
+
+    Bars ``start:end`` are used; with ``trade_from`` the bars before it only
+    warm up the indicators and no trade is opened there. Trades still open
+    at ``end`` are closed at the last close.
+
+    Returns ``(trades, equity_curve, stats)``: a structured trade array, the
+    realized equity per bar and a summary dict.
+    """
+    p = dict(DEFAULT_PARAMS, **(params or {}))
+    tp_pct = p.pop('tp_pct', None)
+    sl_pct = p.pop('sl_pct', None)
+    if tp_pct is None or sl_pct is None:
+        tp_pct, sl_pct = mode_pcts(mode)
+    end = len(candles['close']) if end is None else end
+    close = np.asarray(candles['close'][start:end], dtype=float)
+    high = np.asarray(candles['high'][start:end], dtype=float)
+    low = np.asarray(candles['low'][start:end], dtype=float)
+    times = np.asarray(candles['time'][start:end])
+    n = len(close)
+
+    buy, sell = compute_signals(close, **p)
+    if trade_from is not None:
+        buy[:max(0, trade_from - start)] = False
+        sell[:max(0, trade_from - start)] = False
+    entry_idx = np.nonzero(buy | sell)[0]
+    side = np.where(buy[entry_idx], 1, -1).astype(np.int8)
+    ref = close[entry_idx]
+    sl = ref * (1 - side * sl_pct)
+    tp = ref * (1 + side * tp_pct)
+    entry = ref + side * spread
+
+    exit_idx, hit_sl, hit_tp = first_touch(high, low, entry_idx + 1, side, sl, tp)
+    exit_price = np.where(hit_sl, sl, np.where(hit_tp, tp, close[exit_idx]))
+    reason = np.where(hit_sl, 'sl', np.where(hit_tp, 'tp', 'end'))
+
+    spec = SimpleNamespace(**dict(DEFAULT_SPEC, **(spec or {})))
+    pip_value = pip_value_of(spec)
+    lot_step, min_volume, max_volume = volume_limits(spec, min_lot)
+    pnl_per_lot = (exit_price - entry) * side * pip_value
+    stop_dist = np.abs(entry - sl)
+
+    lots = _size_trades(entry_idx, exit_idx, pnl_per_lot, stop_dist, equity, risk_percent,
+                        pip_value, lot_step, min_volume, max_volume, min_lot)
+
+    trades = np.empty(len(entry_idx), dtype=TRADE_DTYPE)
+    trades['entry_idx'] = entry_idx + start
+    trades['exit_idx'] = exit_idx + start
+    trades['entry_time'] = times[entry_idx]
+    trades['exit_time'] = times[exit_idx]
+    trades['side'] = side
+    trades['entry'] = entry
+    trades['exit'] = exit_price
+    trades['sl'] = sl
+    trades['tp'] = tp
+    trades['lots'] = lots
+    trades['pnl'] = pnl_per_lot * lots
+    trades['reason'] = reason
+
+    equity_curve = equity + np.cumsum(np.bincount(exit_idx, weights=trades['pnl'], minlength=n))
+    return trades, equity_curve, summarize(trades, equity_curve, equity)
+
+
+def summarize(trades, equity_curve, start_equity):
+    pnl = trades['pnl']
+    wins = pnl[pnl > 0].sum()
+    losses = -pnl[pnl < 0].sum()
+    peak = np.maximum.accumulate(np.concatenate(([start_equity], equity_curve)))
+    drawdown = (peak[1:] - equity_curve).max() if len(equity_curve) else 0.0
+    return {
+        'trades': int(len(pnl)),
+        'net_pnl': float(pnl.sum()),
+        'win_rate': float((pnl > 0).mean() * 100) if len(pnl) else 0.0,
+        'profit_factor': float(wins / losses) if losses > 0 else float('inf') if wins > 0 else 0.0,
+        'max_drawdown': float(drawdown),
+        'final_equity': float(equity_curve[-1]) if len(equity_curve) else start_equity,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Backtest MACD/RSI strategy on historical candles')
+    ap.add_argument('candles', help='.csv or .npy candle file')
+    ap.add_argument('--mode', default='scalping')
+    ap.add_argument('--equity', type=float, default=1000.0)
+    ap.add_argument('--risk', type=float, default=1.0, help='risk percent per trade')
+    ap.add_argument('--min-lot', type=float, default=0.01)
+    ap.add_argument('--spread', type=float, default=0.0, help='spread in price units')
+    ap.add_argument('--tick-value', type=float, default=DEFAULT_SPEC['trade_tick_value'])
+    ap.add_argument('--tick-size', type=float, default=DEFAULT_SPEC['trade_tick_size'])
+    ap.add_argument('--trades', help='write trade list to this CSV')
+    ap.add_argument('--equity-out', help='write equity curve to this CSV')
+    args = ap.parse_args()
+
+    candles = load_candles(args.candles)
+    spec = {'trade_tick_value': args.tick_value, 'trade_tick_size': args.tick_size}
+    t0 = time.perf_counter()
+    trades, curve, stats = run_backtest(candles, mode=args.mode, equity=args.equity,
+                                        risk_percent=args.risk, min_lot=args.min_lot,
+                                        spec=spec, spread=args.spread)
+    elapsed = time.perf_counter() - t0
+    n = len(candles['close'])
+
+    for k, v in stats.items():
+        print(f"{k:<14}: {v:.2f}" if isinstance(v, float) else f"{k:<14}: {v}")
+    print(f"{'bars':<14}: {n} ({n / elapsed / 1e6:.2f}M bars/s)")
+
+    if args.trades:
+        pd.DataFrame(trades).to_csv(args.trades, index=False)
+    if args.equity_out:
+        pd.DataFrame({'time': candles['time'], 'equity': curve}).to_csv(args.equity_out, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,355 @@
+"""
+Memory-mapped candle store shared between processes.
+
+One pair of files per (symbol, timeframe) in CANDLE_STORE:
+
+    XAUUSDm_M1.candles   64-byte header + fixed-width MT5 rate records
+    XAUUSDm_M1.index     int64 open times, same order (timestamp index)
+
+Records are appended in time order and only closed bars are stored, so the
+index is sorted and a time range is two binary searches over the mapped
+index followed by a zero-copy slice of the mapped records. Any number of
+processes can map the files read-only; one process at a time holds the
+writer lock (released by the OS if it dies). The writer writes the new
+records and index entries first and bumps the header count last, so
+readers never see a half-written bar.
+
+Files grow by CANDLE_STORE_GROW records at a time. The writer drops its
+own maps before resizing (Windows refuses to change the size of a file
+with a mapped view) and writes the new capacity into the header; readers
+remap when that header capacity changes. On Windows a grow therefore
+fails while another process still has the series mapped: import history
+before starting readers, or set CANDLE_STORE_GROW large enough that the
+live delta never needs a grow.
+
+Usage:
+    python src/candle_store.py import data/XAUUSDm_M1.csv --symbol XAUUSDm --timeframe M1
+    python src/candle_store.py sync --symbols XAUUSDm,EURUSDm --timeframes M1,M5 --bars 100000
+    python src/candle_store.py info
+"""
+import argparse
+import os
+import struct
+import time
+
+import numpy as np
+
+CANDLE_STORE = os.getenv('CANDLE_STORE', '')            # folder store; kosong = nonaktif
+CANDLE_STORE_GROW = int(os.getenv('CANDLE_STORE_GROW', str(1 << 16)))  # record per perbesaran file
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8'),
+])
+
+MAGIC = b'MT5CNDL1'
+HEADER_SIZE = 64
+# magic, record size, capacity, count
+_HEADER = struct.Struct('<8sQQQ')
+_COUNT_OFFSET = 24
+
+
+class StoreLocked(RuntimeError):
+    """Another process holds the writer lock."""
+
+
+def _lock(f):
+    """Non-blocking exclusive lock on an open file (fcntl or msvcrt)."""
+    try:
+        import fcntl
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            raise StoreLocked(f.name)
+    except ImportError:
+        import msvcrt
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            raise StoreLocked(f.name)
+
+
+def timeframe_name(timeframe):
+    from backend import mt5
+    for name in dir(mt5):
+        if name.startswith('TIMEFRAME_') and getattr(mt5, name) == timeframe:
+            return name[len('TIMEFRAME_'):]
+    return str(timeframe)
+
+
+class CandleSeries:
+    """
+    Mapped candles of one (symbol, timeframe).
+
+    ``writable=True`` takes the writer lock (raises StoreLocked if taken).
+    Readers call ``refresh()`` (done by every accessor) to pick up bars
+    appended by the writer, and remap when the header capacity changed.
+    """
+
+    def __init__(self, base, writable=False):
+        self.base = base
+        self.writable = writable
+        self._lock_file = None
+        self.capacity = 0
+        self.records = None
+        self.index = None
+        if writable:
+            os.makedirs(os.path.dirname(base) or '.', exist_ok=True)
+            self._lock_file = open(base + '.lock', 'a+b')
+            _lock(self._lock_file)
+            if not os.path.exists(base + '.candles'):
+                self._create()
+        self._map_header()
+        magic, size, _, _ = _HEADER.unpack(bytes(self._header[:_HEADER.size]))
+        if magic != MAGIC or size != RATES_DTYPE.itemsize:
+            raise ValueError(f'{base}.candles is not a candle store file')
+        self._map()
+
+    def _create(self):
+        with open(self.base + '.candles', 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, RATES_DTYPE.itemsize, 0, 0).ljust(HEADER_SIZE, b'\0'))
+        open(self.base + '.index', 'wb').close()
+        self._resize(CANDLE_STORE_GROW)
+
+    def _resize(self, capacity):
+        with open(self.base + '.index', 'r+b') as f:
+            f.truncate(capacity * 8)
+        with open(self.base + '.candles', 'r+b') as f:
+            f.truncate(HEADER_SIZE + capacity * RATES_DTYPE.itemsize)
+            # Capacity di header terakhir: reader baru map ulang setelah kedua file besar
+            f.seek(16)
+            f.write(struct.pack('<Q', capacity))
+
+    def _map_header(self):
+        self._header = np.memmap(self.base + '.candles', dtype=np.uint8,
+                                 mode='r+' if self.writable else 'r', shape=(HEADER_SIZE,))
+        self._capacity = self._header[16:24].view('<u8')
+        self._count = self._header[_COUNT_OFFSET:_COUNT_OFFSET + 8].view('<u8')
+
+    def _unmap(self):
+        """Drop every map of this process (Windows cannot resize a mapped file)."""
+        if self.writable:
+            self.flush()
+        self.records = self.index = self._header = self._capacity = self._count = None
+        self.capacity = 0
+
+    def _map(self):
+        capacity = int(self._capacity[0])
+        if capacity == self.capacity:
+            return
+        mode = 'r+' if self.writable else 'r'
+        self.records = np.memmap(self.base + '.candles', dtype=RATES_DTYPE, mode=mode,
+                                 offset=HEADER_SIZE, shape=(capacity,))
+        self.index = np.memmap(self.base + '.index', dtype='<i8', mode=mode, shape=(capacity,))
+        self.capacity = capacity
+
+    def close(self):
+        self.records = self.index = self._header = self._capacity = self._count = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    # --- baca ---
+    def refresh(self):
+        n = int(self._count[0])
+        if self._capacity[0] != self.capacity:
+            self._map()
+        return n
+
+    def __len__(self):
+        return self.refresh()
+
+    @property
+    def last_time(self):
+        n = self.refresh()
+        return int(self.index[n - 1]) if n else None
+
+    def times(self):
+        """Sorted open times of all stored bars (mapped, no copy)."""
+        return self.index[:self.refresh()]
+
+    def view(self, start=0, stop=None):
+        n = self.refresh()
+        stop = n if stop is None else min(stop, n)
+        v = self.records[start:stop]
+        v.flags.writeable = False
+        return v
+
+    def last(self, n):
+        count = self.refresh()
+        return self.view(max(0, count - n), count)
+
+    def range(self, t0=None, t1=None):
+        """Bars with open time in [t0, t1] (two binary searches, zero copy)."""
+        n = self.refresh()
+        idx = self.index[:n]
+        lo = 0 if t0 is None else int(np.searchsorted(idx, np.int64(t0)))
+        hi = n if t1 is None else int(np.searchsorted(idx, np.int64(t1), 'right'))
+        return self.view(lo, hi)
+
+    def columns(self, fields=('time', 'open', 'high', 'low', 'close')):
+        """Dict of per-field views, the shape backtest.load_candles returns."""
+        v = self.view()
+        return {k: v[k] for k in fields}
+
+    # --- tulis (writer saja) ---
+    def append(self, rates):
+        """Append closed bars newer than the last stored one; returns rows added."""
+        if not self.writable:
+            raise PermissionError('candle series opened read-only')
+        rates = np.asarray(rates)
+        if len(rates) == 0:
+            return 0
+        n = int(self._count[0])
+        if n:
+            rates = rates[rates['time'] > self.index[n - 1]]
+        if len(rates) == 0:
+            return 0
+        if np.any(np.diff(rates['time']) <= 0):
+            rates = rates[np.unique(rates['time'], return_index=True)[1]]
+        if n + len(rates) > self.capacity:
+            capacity = self.capacity + max(CANDLE_STORE_GROW, n + len(rates) - self.capacity)
+            self._unmap()
+            try:
+                self._resize(capacity)
+            finally:
+                # Gagal (file masih di-map proses lain di Windows): map lagi ukuran lama
+                self._map_header()
+                self._map()
+        new = self.records[n:n + len(rates)]
+        for name in RATES_DTYPE.names:
+            if name in rates.dtype.names:
+                new[name] = rates[name]
+        self.index[n:n + len(rates)] = rates['time']
+        # Count terakhir: reader hanya melihat bar yang sudah lengkap
+        self._count[0] = n + len(rates)
+        return len(rates)
+
+    def flush(self):
+        if self.writable:
+            self.records.flush()
+            self.index.flush()
+            self._header.flush()
+
+
+class CandleStore:
+    """Folder of CandleSeries files."""
+
+    def __init__(self, root=CANDLE_STORE):
+        self.root = root
+        self.series = {}
+
+    def path(self, symbol, timeframe):
+        return os.path.join(self.root, f'{symbol}_{timeframe_name(timeframe)}')
+
+    def open(self, symbol, timeframe, writable=False):
+        """Cached series; None if read-only and nothing stored yet."""
+        key = (symbol, timeframe, writable)
+        series = self.series.get(key)
+        if series is None:
+            base = self.path(symbol, timeframe)
+            if not writable and not os.path.exists(base + '.candles'):
+                return None
+            series = self.series[key] = CandleSeries(base, writable)
+        return series
+
+    def writer(self, symbol, timeframe):
+        """The writable series if this process can take the lock, else None."""
+        try:
+            return self.open(symbol, timeframe, writable=True)
+        except StoreLocked:
+            return None
+
+    def close(self):
+        for series in self.series.values():
+            series.flush()
+            series.close()
+        self.series.clear()
+
+
+def sync_series(series, symbol, timeframe, bars):
+    """Append closed bars from the terminal (delta since the last stored bar)."""
+    from backend import mt5
+    from connector import timeframe_seconds
+    last = series.last_time
+    if last is None:
+        count = bars
+    else:
+        tick = mt5.symbol_info_tick(symbol)
+        now = int(tick.time) if tick is not None else int(time.time())
+        count = min(bars, max(2, (now - last) // timeframe_seconds(timeframe) + 2))
+    rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, int(count) + 1)
+    if rates is None or len(rates) < 2:
+        return 0
+    return series.append(rates[:-1])   # bar terakhir masih berjalan
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Shared memory-mapped candle store')
+    ap.add_argument('--dir', default=CANDLE_STORE or 'data/candles')
+    sub = ap.add_subparsers(dest='command', required=True)
+    p_imp = sub.add_parser('import', help='append a .csv/.npy candle file')
+    p_imp.add_argument('file')
+    p_imp.add_argument('--symbol', required=True)
+    p_imp.add_argument('--timeframe', default='M1')
+    p_sync = sub.add_parser('sync', help='keep series up to date from the terminal')
+    p_sync.add_argument('--symbols', default=os.getenv('SYMBOLS') or os.getenv('SYMBOL'))
+    p_sync.add_argument('--timeframes', default='M1')
+    p_sync.add_argument('--bars', type=int, default=100000, help='history for a new series')
+    p_sync.add_argument('--interval', type=float, default=1.0)
+    p_sync.add_argument('--once', action='store_true')
+    sub.add_parser('info', help='list stored series')
+    args = ap.parse_args()
+
+    if args.command == 'info':
+        for name in sorted(os.listdir(args.dir)) if os.path.isdir(args.dir) else []:
+            if name.endswith('.candles'):
+                series = CandleSeries(os.path.join(args.dir, name[:-len('.candles')]))
+                n = len(series)
+                span = f"{series.index[0]} .. {series.index[n - 1]}" if n else '-'
+                print(f"{name[:-len('.candles')]}: {n} bars ({span})")
+        return
+
+    if args.command == 'import':
+        from backtest import load_candles
+        candles = load_candles(args.file)
+        rates = np.zeros(len(candles['time']), RATES_DTYPE)
+        for k, v in candles.items():
+            rates[k] = v
+        series = CandleSeries(os.path.join(args.dir, f'{args.symbol}_{args.timeframe.upper()}'),
+                              writable=True)
+        print(f'{series.append(rates)} bars added, {len(series)} stored')
+        series.flush()
+        series.close()
+        return
+
+    from backend import mt5
+    from connector import initialize, shutdown
+    store = CandleStore(args.dir)
+    initialize(path=os.getenv('MT5_PATH'), login=os.getenv('MT5_LOGIN'),
+               password=os.getenv('MT5_PASSWORD'), server=os.getenv('MT5_SERVER'))
+    targets = []
+    for symbol in [s.split(':')[0].strip() for s in (args.symbols or '').split(',') if s.strip()]:
+        mt5.symbol_select(symbol, True)
+        for tf in args.timeframes.split(','):
+            timeframe = getattr(mt5, 'TIMEFRAME_' + tf.strip().upper())
+            targets.append((symbol, timeframe, store.open(symbol, timeframe, writable=True)))
+    try:
+        while True:
+            for symbol, timeframe, series in targets:
+                added = sync_series(series, symbol, timeframe, args.bars)
+                if added:
+                    series.flush()
+                    print(f'{symbol} {timeframe_name(timeframe)}: +{added} ({len(series)} bars)')
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+        shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,46 @@
 import os
-import MetaTrader5 as mt5
+import threading
+import time
+import numpy as np
+from backend import mt5
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from positions import position_book
 
 
 load_dotenv()
 
+# TTL cache (detik) untuk data yang sering dibaca di jalur sinyal -> order
+ACCOUNT_TTL = float(os.getenv('ACCOUNT_TTL', '0.5'))
+TICK_TTL = float(os.getenv('TICK_TTL', '0.05'))
+
+_cache = {}          # key -> (expires_at, value)
+_symbol_specs = {}   # symbol -> symbol_info, berlaku satu sesi
+
+def _cached(key, ttl, fetch):
+    now = time.monotonic()
+    hit = _cache.get(key)
+    if hit is not None and hit[0] > now:
+        return hit[1]
+    value = fetch()
+    if value is not None and ttl > 0:
+        _cache[key] = (now + ttl, value)
+    return value
+
+def invalidate(symbol=None, specs=False):
+    """
+    Drop cached account data (and the tick of ``symbol``, or all ticks).
+    Call after a trade so the next read sees the new balance/margin.
+    """
+    _cache.pop('account', None)
+    for key in list(_cache):
+        if key != 'account' and (symbol is None or key == ('tick', symbol)):
+            _cache.pop(key, None)
+    if specs:
+        if symbol is None:
+            _symbol_specs.clear()
+        else:
+            _symbol_specs.pop(symbol, None)
+
 def initialize(path=None, login=None, password=None, server=None):
     if path:
         ok = mt5.initialize(path)
@@ -22,73 +57,338 @@ def initialize(path=None, login=None, password=None, server=None):
 def shutdown():
     mt5.shutdown()
 
-def get_account_info():
+def _account_info():
     info = mt5.account_info()
     if info is None:
-        return {}
+        return None
     return {
         'login': info.login,
         'balance': info.balance,
         'equity': info.equity,
         'margin': info.margin,
-        'free_margin': info.margin_free
+        'free_margin': info.margin_free,
+        'leverage': info.leverage,
+        'currency': info.currency
     }
 
+def get_account_info(max_age=None):
+    """Account dict, reused for ``max_age`` seconds (default ACCOUNT_TTL)."""
+    ttl = ACCOUNT_TTL if max_age is None else max_age
+    return _cached('account', ttl, _account_info) or {}
+
 def get_positions(symbol=None):
-    positions = mt5.positions_get(symbol=symbol) if symbol else mt5.positions_get()
-    if positions is None:
-        return []
-    # Konversi ke dict agar mudah diakses
-    result = []
-    for p in positions:
-        result.append({
-            'type': 'BUY' if p.type == mt5.ORDER_TYPE_BUY else 'SELL',
-            'symbol': p.symbol,
-            'volume': p.volume,
-            'price_open': p.price_open,
-            'sl': p.sl,
-            'tp': p.tp,
-            'profit': p.profit
-        })
-    return result
+    """
+    Open positions as positions.Position records (``pos['profit']`` still
+    works). The book is synced by delta; see positions.PositionBook.
+    """
+    book = position_book()
+    book.sync(symbol)
+    return book.list(symbol)
 
 def symbol_select(symbol):
     return mt5.symbol_select(symbol, True)
 
+def get_symbol_spec(symbol):
+    """
+    symbol_info cached for the whole session. Only the static contract
+    fields (tick_value/tick_size, volume step/min/max, contract size,
+    filling mode) should be read from it; use get_tick for prices.
+    """
+    spec = _symbol_specs.get(symbol)
+    if spec is None:
+        spec = mt5.symbol_info(symbol)
+        if spec is not None:
+            _symbol_specs[symbol] = spec
+    return spec
+
 def get_symbol_info(symbol):
-    return mt5.symbol_info(symbol)
+    return get_symbol_spec(symbol)
 
-def get_tick(symbol):
-    return mt5.symbol_info_tick(symbol)
+def get_tick(symbol, max_age=None):
+    """Latest tick, reused for ``max_age`` seconds (default TICK_TTL)."""
+    ttl = TICK_TTL if max_age is None else max_age
+    return _cached(('tick', symbol), ttl, lambda: mt5.symbol_info_tick(symbol))
 
-def get_candles(symbol, timeframe, n=500):
-    import pandas as pd
-    rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, n)
+def timeframe_seconds(timeframe):
+    """Bar length in seconds for an MT5 TIMEFRAME_* constant."""
+    if timeframe & 0xC000 == 0xC000:   # MN1
+        return 30 * 86400
+    if timeframe & 0x8000:             # W1
+        return 7 * 86400
+    if timeframe & 0x4000:             # H1..D1
+        return (timeframe & 0x3FFF) * 3600
+    return timeframe * 60              # M1..M30
+
+def copy_rates(symbol, timeframe, count):
+    """Latest ``count`` bars from the terminal; RuntimeError if it returns nothing."""
+    rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
     if rates is None:
         raise RuntimeError('Failed to get rates for ' + symbol)
-    df = pd.DataFrame(rates)
+    return rates
+
+class CandleBuffer:
+    """
+    Fixed-size ring buffer of MT5 rates for one (symbol, timeframe).
+
+    Every record is written twice (at ``i`` and ``i + capacity``) so the
+    newest ``n`` bars are always one contiguous slice of the backing array
+    and can be handed out as a zero-copy view. After the first full load
+    only the bars since the last stored timestamp are requested; the
+    still-forming bar is overwritten in place.
+    """
+
+    def __init__(self, symbol, timeframe, capacity=500):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.capacity = capacity
+        self.data = None
+        self.head = 0
+        self.count = 0
+        # refresh/push vs pembaca di thread lain (mis. snapshot)
+        self.lock = threading.Lock()
+
+    @property
+    def last_time(self):
+        if self.count == 0:
+            return None
+        return int(self.data['time'][self.head + self.count - 1])
+
+    def _fetch(self, count):
+        return copy_rates(self.symbol, self.timeframe, count)
+
+    def _load(self, rates):
+        rates = rates[-self.capacity:]
+        self.data = np.zeros(2 * self.capacity, dtype=rates.dtype)
+        n = len(rates)
+        self.data[:n] = rates
+        self.data[self.capacity:self.capacity + n] = rates
+        self.head = 0
+        self.count = n
+
+    def _put(self, pos, row):
+        pos %= self.capacity
+        self.data[pos] = row
+        self.data[pos + self.capacity] = row
+
+    def _merge(self, rates):
+        last = self.last_time
+        i = int(np.searchsorted(rates['time'], last))
+        if i < len(rates) and rates['time'][i] == last:
+            # Bar yang masih berjalan: update di tempat
+            self._put(self.head + self.count - 1, rates[i])
+            i += 1
+        for row in rates[i:]:
+            if self.count < self.capacity:
+                self._put(self.head + self.count, row)
+                self.count += 1
+            else:
+                self._put(self.head, row)
+                self.head = (self.head + 1) % self.capacity
+
+    def push(self, rates):
+        """Merge locally built bars (no fetch); same rules as refresh."""
+        with self.lock:
+            if self.count == 0:
+                self._load(rates)
+            else:
+                self._merge(rates)
+
+    def _store_closed(self, rates):
+        """Writer process: append the closed bars just fetched to the shared store."""
+        series = _store_writer(self.symbol, self.timeframe)
+        if series is not None and len(rates) > 1:
+            series.append(rates[:-1])
+
+    def refresh(self, delta=2):
+        """Fetch the bars since the last stored one (full load when empty)."""
+        with self.lock:
+            self._refresh(delta)
+
+    def _refresh(self, delta):
+        if self.count == 0:
+            # History dari candle store bersama (kalau ada), lalu delta dari broker
+            series = _store_series(self.symbol, self.timeframe)
+            if series is not None and len(series):
+                self._load(np.array(series.last(self.capacity)))
+            else:
+                rates = self._fetch(self.capacity)
+                self._store_closed(rates)
+                self._load(rates)
+                return
+        last = self.last_time
+        count = delta
+        while True:
+            rates = self._fetch(count)
+            if len(rates) and rates['time'][0] <= last:
+                self._store_closed(rates)
+                self._merge(rates)
+                return
+            if count >= self.capacity or len(rates) < count:
+                # Gap lebih besar dari buffer (atau history berubah): load ulang
+                rates = self._fetch(self.capacity)
+                self._store_closed(rates)
+                self._load(rates)
+                return
+            count = min(count * 4, self.capacity)
+
+    def view(self, n=None):
+        """Newest ``n`` bars (oldest first) as a read-only view, no copy."""
+        n = self.count if n is None else min(n, self.count)
+        end = self.head + self.count
+        v = self.data[end - n:end]
+        v.flags.writeable = False
+        return v
+
+    def copy(self):
+        """
+        Consistent copy of all stored bars (None when empty), safe while
+        another thread refreshes.
+        """
+        with self.lock:
+            return self.view().copy() if self.count else None
+
+
+# Candle store bersama antar proses (lihat candle_store.py). Proses pertama
+# yang dapat lock jadi writer, sisanya hanya membaca.
+CANDLE_STORE = os.getenv('CANDLE_STORE', '')
+CANDLE_STORE_WRITE = os.getenv('CANDLE_STORE_WRITE', 'auto').lower()   # auto | on | off
+_candle_store = None
+_store_writers = {}
+
+def _get_candle_store():
+    global _candle_store
+    if _candle_store is None and CANDLE_STORE:
+        from candle_store import CandleStore
+        _candle_store = CandleStore(CANDLE_STORE)
+    return _candle_store
+
+def _store_writer(symbol, timeframe):
+    key = (symbol, timeframe)
+    if key not in _store_writers:
+        store = _get_candle_store()
+        if store is None or CANDLE_STORE_WRITE == 'off':
+            _store_writers[key] = None
+        elif CANDLE_STORE_WRITE == 'on':
+            _store_writers[key] = store.open(symbol, timeframe, writable=True)
+        else:
+            _store_writers[key] = store.writer(symbol, timeframe)
+    return _store_writers[key]
+
+def _store_series(symbol, timeframe):
+    """Series to read history from: our writer if we hold it, else a reader."""
+    writer = _store_writer(symbol, timeframe)
+    if writer is not None:
+        return writer
+    store = _get_candle_store()
+    return store.open(symbol, timeframe) if store is not None else None
+
+_candle_buffers = {}
+
+def get_candle_buffer(symbol, timeframe, n=500):
+    buf = _candle_buffers.get((symbol, timeframe))
+    if buf is None or buf.capacity < n:
+        buf = CandleBuffer(symbol, timeframe, capacity=n)
+        _candle_buffers[(symbol, timeframe)] = buf
+    return buf
+
+def get_candle_view(symbol, timeframe, n=500):
+    """Candles as a NumPy structured array view (``time`` in epoch seconds)."""
+    buf = get_candle_buffer(symbol, timeframe, n)
+    buf.refresh()
+    return buf.view(n)
+
+_resamplers = {}
+_resample_lock = threading.Lock()
+
+def get_mtf_views(symbol, timeframes, n=500, base=mt5.TIMEFRAME_M1):
+    """
+    Views for several timeframes of ``symbol`` from one ``base`` (M1) fetch.
+    Each higher timeframe is seeded once from the broker, then built
+    locally by resample.Resampler. Returns {timeframe: view}.
+    """
+    from resample import Resampler
+    with _resample_lock:
+        res = _resamplers.get(symbol)
+        if res is None:
+            res = _resamplers[symbol] = Resampler(symbol, [], capacity=n)
+    with res.lock:
+        missing = [tf for tf in timeframes if tf != base and tf not in res.frames]
+        m1 = get_candle_view(symbol, base, n)
+        # Seed dengan bar M1 yang sedang berjalan supaya volumenya tidak dobel / hilang
+        for tf in missing:
+            res.add(tf)
+            if len(m1):
+                res.seed(tf, copy_rates(symbol, tf, res.capacity), m1[-1])
+        res.update(m1)
+        views = {tf: res.view(tf, n) for tf in timeframes if tf != base}
+    if base in timeframes:
+        views[base] = m1
+    return views
+
+def get_candles(symbol, timeframe, n=500):
+    import pandas as pd
+    df = pd.DataFrame(get_candle_view(symbol, timeframe, n))
     df['time'] = pd.to_datetime(df['time'], unit='s')
     return df
 
-def get_history(symbol=None, days=7):
-    """Ambil closed trade history X hari terakhir (default 7 hari)"""
-    utc_from = datetime.now() - timedelta(days=days)
-    utc_to = datetime.now()
-    deals = mt5.history_deals_get(utc_from, utc_to, group=symbol if symbol else None)
-    if deals is None:
-        return []
-    history = []
-    for d in deals:
-        # Pastikan field sesuai dengan yang dibutuhkan monitor.py
-        history.append({
-            'type': 'BUY' if d.type == mt5.ORDER_TYPE_BUY else 'SELL',
-            'symbol': d.symbol,
-            'volume': d.volume,
-            'price_open': d.price,
-            'price_close': d.price,  # Atau gunakan price_close jika ada
-            'time_close': d.time,    # Pastikan ini UNIX timestamp
-            'profit': d.profit
-        })
-    # Urutkan dari terbaru ke terlama
-    history.sort(key=lambda h: h['time_close'], reverse=True)
-    return history
+# Deal history disimpan lokal (SQLite), di-sync incremental
+HISTORY_DB = os.getenv('HISTORY_DB', 'history_{login}.db')
+_history_store = None
+
+def get_history_store():
+    global _history_store
+    if _history_store is None:
+        from history_store import HistoryStore
+        login = get_account_info().get('login', 'default')
+        _history_store = HistoryStore(HISTORY_DB.format(login=login))
+    return _history_store
+
+def sync_history():
+    """Fetch only deals newer than the last stored one."""
+    return get_history_store().sync()
+
+def get_history(symbol=None, days=7, limit=None, sync=True):
+    """Ambil closed trade history X hari terakhir (default 7 hari), terbaru dulu"""
+    store = get_history_store()
+    if sync:
+        store.sync()
+    return store.since(int(time.time()) - days * 86400, symbol, limit)
+
+def server_time(symbol=None):
+    """
+    Latest known broker (server) time: the tick of ``symbol``, else the
+    trade stats' broker clock, else the local clock.
+    """
+    if symbol:
+        tick = get_tick(symbol)
+        if tick is not None and tick.time:
+            return int(tick.time)
+    if _trade_stats is not None and _trade_stats.now is not None:
+        return int(_trade_stats.now)
+    return int(time.time())
+
+def get_daily_summary(symbol=None):
+    """P/L hari ini (hari broker, sama dengan trade_stats) dari history store."""
+    from trade_stats import broker_day
+    return get_history_store().daily_summary(symbol, broker_day(server_time(symbol)))
+
+_trade_stats = None
+
+def get_trade_stats(symbol=None):
+    """
+    Streaming trade statistics (trade_stats.TradeStats) for ``symbol`` or
+    all symbols. The history store is replayed once; after that every
+    sync_history() feeds only the new deals.
+    """
+    global _trade_stats
+    if _trade_stats is None:
+        from trade_stats import StatsBook
+        book = StatsBook()
+        get_history_store().subscribe(book.add)
+        _trade_stats = book
+    return _trade_stats.get(symbol)
+
+def roll_trade_stats(now):
+    """Advance the stats' broker clock (server time, e.g. tick.time)."""
+    if _trade_stats is not None:
+        _trade_stats.roll(now)
@@ -0,0 +1,166 @@
+"""
+Low-latency market order execution.
+
+- Filling mode per symbol is picked from symbol_info.filling_mode and cached;
+  if the broker answers "invalid fill" the next mode is tried and remembered.
+- Request dicts are pre-built per (symbol, action) so a send only fills in
+  volume/price/SL/TP.
+- Requotes and price changes are retried with a fresh tick as long as the
+  new price stays within a deviation budget from the signal price.
+- Every attempt's latency and the slippage between signal price and fill
+  are recorded in an ExecutionReport.
+"""
+from collections import deque
+
+from backend import mt5
+import metrics
+from connector import get_symbol_spec, get_tick, invalidate
+
+MAGIC = 234000
+
+_t_order = metrics.stage('order_send')
+
+# Retcode yang layak di-retry dengan harga baru
+RETRY_RETCODES = {
+    mt5.TRADE_RETCODE_REQUOTE,
+    mt5.TRADE_RETCODE_PRICE_CHANGED,
+    mt5.TRADE_RETCODE_PRICE_OFF,
+}
+
+
+class ExecutionReport:
+    """Hasil satu order: tiap attempt (retcode, latency ms, harga request) + slippage."""
+    __slots__ = ('symbol', 'action', 'signal_price', 'attempts', 'result', 'fill_price',
+                 'slippage_points')
+
+    def __init__(self, symbol, action, signal_price):
+        self.symbol = symbol
+        self.action = action
+        self.signal_price = signal_price
+        self.attempts = []
+        self.result = None
+        self.fill_price = None
+        self.slippage_points = None
+
+    @property
+    def retcode(self):
+        return getattr(self.result, 'retcode', None)
+
+    @property
+    def total_ms(self):
+        return sum(a[1] for a in self.attempts)
+
+    def summary(self):
+        tries = ", ".join(f"{rc}@{ms:.1f}ms" for rc, ms, _ in self.attempts)
+        slip = f"{self.slippage_points:+.1f} pts" if self.slippage_points is not None else "n/a"
+        return f"{self.symbol} {self.action}: {len(self.attempts)} attempt(s) [{tries}] slippage {slip}"
+
+
+class Executor:
+
+    def __init__(self, deviation=20, max_retries=3, deviation_budget=None, history=1000):
+        self.deviation = deviation
+        self.max_retries = max_retries
+        # Batas total pergerakan harga (points) dari harga sinyal saat retry
+        self.deviation_budget = deviation * 2 if deviation_budget is None else deviation_budget
+        self.filling = {}      # symbol -> list mode filling, yang terdepan dipakai
+        self.templates = {}    # (symbol, action, comment, deviation) -> request dict dasar
+        self.reports = deque(maxlen=history)
+
+    def filling_modes(self, symbol):
+        modes = self.filling.get(symbol)
+        if modes is None:
+            spec = get_symbol_spec(symbol)
+            flags = getattr(spec, 'filling_mode', 0) or 0
+            modes = []
+            if flags & mt5.SYMBOL_FILLING_FOK:
+                modes.append(mt5.ORDER_FILLING_FOK)
+            if flags & mt5.SYMBOL_FILLING_IOC:
+                modes.append(mt5.ORDER_FILLING_IOC)
+            modes.append(mt5.ORDER_FILLING_RETURN)
+            self.filling[symbol] = modes
+        return modes
+
+    def template(self, symbol, action, comment, deviation):
+        key = (symbol, action, comment, deviation)
+        tpl = self.templates.get(key)
+        if tpl is None:
+            tpl = {
+                'action': mt5.TRADE_ACTION_DEAL,
+                'symbol': symbol,
+                'type': mt5.ORDER_TYPE_BUY if action == 'BUY' else mt5.ORDER_TYPE_SELL,
+                'deviation': deviation,
+                'magic': MAGIC,
+                'comment': comment,
+                'type_filling': self.filling_modes(symbol)[0],
+            }
+            self.templates[key] = tpl
+        return tpl
+
+    def _demote_filling(self, symbol):
+        """Broker menolak mode filling ini: pakai mode berikutnya & rebuild template."""
+        modes = self.filling_modes(symbol)
+        if len(modes) > 1:
+            modes.pop(0)
+        for key in [k for k in self.templates if k[0] == symbol]:
+            del self.templates[key]
+
+    def send(self, symbol, action, volume, sl, tp, signal_price=None, comment='python-mt5-bot',
+             deviation=None):
+        deviation = self.deviation if deviation is None else deviation
+        tick = get_tick(symbol)
+        if tick is None:
+            raise RuntimeError('No tick for ' + symbol)
+        price = tick.ask if action == 'BUY' else tick.bid
+        if signal_price is None:
+            signal_price = price
+        spec = get_symbol_spec(symbol)
+        point = getattr(spec, 'point', None) or 0.00001
+        report = ExecutionReport(symbol, action, signal_price)
+
+        fill_retries = len(self.filling_modes(symbol)) - 1
+        retries = self.max_retries
+        while True:
+            request = dict(self.template(symbol, action, comment, deviation))
+            request['volume'] = float(volume)
+            request['price'] = float(price)
+            request['sl'] = float(sl) if sl else 0.0
+            request['tp'] = float(tp) if tp else 0.0
+
+            t0 = metrics.now()
+            result = mt5.order_send(request)
+            latency_ns = metrics.now() - t0
+            _t_order.record_value(latency_ns)
+            latency_ms = latency_ns / 1e6
+            retcode = getattr(result, 'retcode', None)
+            report.attempts.append((retcode, latency_ms, price))
+            report.result = result
+
+            if retcode == mt5.TRADE_RETCODE_INVALID_FILL and fill_retries > 0:
+                fill_retries -= 1
+                self._demote_filling(symbol)
+                continue
+            if retcode not in RETRY_RETCODES or retries <= 0:
+                break
+            retries -= 1
+            tick = get_tick(symbol, max_age=0)
+            if tick is None:
+                break
+            price = tick.ask if action == 'BUY' else tick.bid
+            if abs(price - signal_price) / point > self.deviation_budget:
+                break
+
+        invalidate(symbol)
+        if retcode == mt5.TRADE_RETCODE_DONE:
+            report.fill_price = getattr(result, 'price', None) or price
+            direction = 1 if action == 'BUY' else -1
+            # Positif = lebih buruk dari harga sinyal
+            report.slippage_points = (report.fill_price - signal_price) * direction / point
+        self.reports.append(report)
+        return report
+
+
+executor = Executor()
+
+def last_report():
+    return executor.reports[-1] if executor.reports else None
@@ -0,0 +1,189 @@
+"""
+Local append-only store for MT5 deal history (SQLite).
+
+get_history used to download every deal of the last 7 days on each poll.
+HistoryStore keeps the deals on disk instead and only asks the terminal for
+deals newer than the last one it has seen. Queries for "last N" and "today"
+go through the (symbol, time) index, so they do not scan the whole history.
+
+Listeners registered with ``subscribe`` get every stored deal once (a
+replay in (time_msc, ticket) order) and after that only the deals each
+``sync`` adds, e.g. the streaming accumulators in trade_stats.
+"""
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from backend import mt5
+from trade_stats import broker_day
+
+# Overlap saat sync supaya deal dengan detik yang sama tidak terlewat
+SYNC_OVERLAP = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deals (
+    ticket      INTEGER PRIMARY KEY,
+    time        INTEGER NOT NULL,
+    time_msc    INTEGER NOT NULL,
+    symbol      TEXT NOT NULL,
+    type        INTEGER NOT NULL,
+    entry       INTEGER NOT NULL,
+    volume      REAL NOT NULL,
+    price       REAL NOT NULL,
+    profit      REAL NOT NULL,
+    commission  REAL NOT NULL,
+    swap        REAL NOT NULL,
+    position_id INTEGER NOT NULL,
+    reason      INTEGER NOT NULL,
+    magic       INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deals_symbol_time ON deals(symbol, time);
+CREATE INDEX IF NOT EXISTS deals_time ON deals(time);
+"""
+
+_COLUMNS = ('ticket', 'time', 'time_msc', 'symbol', 'type', 'entry', 'volume', 'price',
+            'profit', 'commission', 'swap', 'position_id', 'reason', 'magic')
+
+# Hanya deal BUY/SELL (bukan balance/credit dsb.)
+_TRADE_TYPES = "type IN (0, 1)"
+
+
+def _day_start(day_start=None):
+    return broker_day(time.time()) if day_start is None else day_start
+
+
+def _row_to_dict(row):
+    ticket, t, symbol, typ, volume, price, profit = row
+    return {
+        'ticket': ticket,
+        'type': 'BUY' if typ == mt5.ORDER_TYPE_BUY else 'SELL',
+        'symbol': symbol,
+        'volume': volume,
+        'price_open': price,
+        'price_close': price,
+        'time_close': t,
+        'profit': profit,
+    }
+
+
+class HistoryStore:
+
+    def __init__(self, path, days=7):
+        self.path = path
+        self.days = days
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(_SCHEMA)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self._listeners = []
+        row = self.db.execute(
+            "SELECT time_msc, ticket FROM deals ORDER BY time_msc DESC, ticket DESC LIMIT 1").fetchone()
+        self._last_key = tuple(row) if row else (-1, -1)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def last_time(self):
+        with self.lock:
+            row = self.db.execute("SELECT MAX(time) FROM deals").fetchone()
+        return row[0]
+
+    def subscribe(self, callback, replay=True):
+        """
+        Call ``callback(deal)`` (dict of all columns) for each new deal;
+        with ``replay`` the stored deals are passed first, oldest first.
+        """
+        with self.lock:
+            if replay:
+                cur = self.db.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM deals ORDER BY time_msc, ticket")
+                for row in cur:
+                    callback(dict(zip(_COLUMNS, row)))
+            self._listeners.append(callback)
+
+    def sync(self):
+        """Pull deals newer than the last stored one; returns the number added."""
+        last = self.last_time()
+        now = datetime.now(timezone.utc)
+        if last is None:
+            date_from = now - timedelta(days=self.days)
+        else:
+            date_from = datetime.fromtimestamp(last - SYNC_OVERLAP, tz=timezone.utc)
+        # Waktu server broker bisa di depan UTC
+        deals = mt5.history_deals_get(date_from, now + timedelta(days=1))
+        if not deals:
+            return 0
+        rows = [tuple(getattr(d, c) for c in _COLUMNS) for d in deals]
+        with self.lock:
+            before = self.db.total_changes
+            self.db.executemany(
+                f"INSERT OR IGNORE INTO deals ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_COLUMNS))})", rows)
+            self.db.commit()
+            added = self.db.total_changes - before
+            if added:
+                self._notify(rows)
+            return added
+
+    def _notify(self, rows):
+        # Hanya deal sesudah yang terakhir dikirim (overlap sync tidak dobel)
+        i_msc, i_ticket = _COLUMNS.index('time_msc'), _COLUMNS.index('ticket')
+        fresh = sorted((r for r in rows if (r[i_msc], r[i_ticket]) > self._last_key),
+                       key=lambda r: (r[i_msc], r[i_ticket]))
+        for row in fresh if self._listeners else ():
+            deal = dict(zip(_COLUMNS, row))
+            for callback in self._listeners:
+                try:
+                    callback(deal)
+                except Exception as e:
+                    print(f'History listener error: {e}')
+        if fresh:
+            self._last_key = (fresh[-1][i_msc], fresh[-1][i_ticket])
+
+    def _query(self, where, params, limit=None):
+        sql = ("SELECT ticket, time, symbol, type, volume, price, profit FROM deals "
+               f"WHERE {_TRADE_TYPES}{where} ORDER BY time DESC, ticket DESC")
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self.lock:
+            rows = self.db.execute(sql, params).fetchall()
+        return [_row_to_dict(r) for r in rows]
+
+    def last_n(self, n=10, symbol=None):
+        """Newest ``n`` deals (newest first)."""
+        if symbol:
+            return self._query(" AND symbol = ?", (symbol,), n)
+        return self._query("", (), n)
+
+    def since(self, t, symbol=None, limit=None):
+        """Deals with time >= ``t`` (newest first)."""
+        if symbol:
+            return self._query(" AND symbol = ? AND time >= ?", (symbol, t), limit)
+        return self._query(" AND time >= ?", (t,), limit)
+
+    def today(self, symbol=None, day_start=None):
+        return self.since(_day_start(day_start), symbol)
+
+    def daily_summary(self, symbol=None, day_start=None):
+        """
+        Net / win / loss P&L and closing-deal count since ``day_start``, the
+        broker day start (trade_stats.broker_day of the server time).
+        Without it, the broker day of the local clock.
+        """
+        t = _day_start(day_start)
+        # Net (termasuk commission & swap) dan count deal penutup, sama seperti trade_stats
+        net = "(profit + commission + swap)"
+        sql = (f"SELECT COALESCE(SUM({net}), 0), COALESCE(SUM(CASE WHEN {net} > 0 THEN {net} END), 0), "
+               f"COALESCE(SUM(CASE WHEN {net} < 0 THEN {net} END), 0), "
+               "COUNT(CASE WHEN entry != 0 THEN 1 END) FROM deals "
+               f"WHERE {_TRADE_TYPES} AND time >= ?")
+        params = (t,)
+        if symbol:
+            sql += " AND symbol = ?"
+            params = (t, symbol)
+        with self.lock:
+            profit, win, loss, count = self.db.execute(sql, params).fetchone()
+        return {'profit': profit, 'win': win, 'loss': loss, 'count': count}
@@ -0,0 +1,390 @@
+"""
+Incremental indicator engine.
+
+The functions in strategy.py recompute every indicator over the whole candle
+Series on each poll. The classes here keep the recursive state instead: they
+are seeded once from history and then advanced one bar at a time, so each
+poll costs O(1) regardless of how many candles are loaded.
+
+The update formulas mirror pandas' ``ewm(adjust=False)`` step for step so the
+results match the full recomputation in strategy.py.
+"""
+import math
+from collections import deque, namedtuple
+
+
+def _catch_up(ind, times, closes):
+    """
+    Shared part of the ``sync`` methods: commit (``ind._commit``) the bars
+    that closed since ``ind.forming_time``, or reseed (``ind.seed``) when
+    the history no longer lines up.
+    """
+    n = len(closes)
+    if ind.forming_time is None:
+        ind.seed(times, closes)
+    elif times[-1] != ind.forming_time:
+        # Find where the previously forming bar is now; usually at n-2.
+        k = n - 2
+        while k >= 0 and times[k] != ind.forming_time:
+            if times[k] < ind.forming_time:
+                k = -1
+                break
+            k -= 1
+        if k < 0:
+            ind.seed(times, closes)
+        else:
+            for i in range(k, n - 1):
+                ind._commit(float(closes[i]))
+            ind.forming_time = times[-1]
+
+
+IndicatorValues = namedtuple('IndicatorValues', [
+    'macd', 'signal', 'hist', 'rsi', 'bb_upper', 'bb_mid', 'bb_lower',
+    'macd_prev', 'signal_prev', 'hist_prev', 'rsi_prev',
+])
+
+
+class EMA:
+    """Exponential moving average, same recurrence as ``ewm(adjust=False)``."""
+    __slots__ = ('alpha', 'value')
+
+    def __init__(self, span=None, alpha=None):
+        if alpha is None:
+            alpha = 2.0 / (span + 1.0)
+        self.alpha = alpha
+        self.value = None
+
+    def peek(self, x):
+        """Value after ``x`` without advancing the state."""
+        y = self.value
+        if y is None or y == x:
+            return x
+        old_wt = 1.0 - self.alpha
+        return (old_wt * y + self.alpha * x) / (old_wt + self.alpha)
+
+    def update(self, x):
+        self.value = self.peek(x)
+        return self.value
+
+
+class RSI:
+    """Wilder RSI (EMA of gains/losses with alpha=1/period)."""
+    __slots__ = ('up', 'down', 'last_close')
+
+    def __init__(self, period=14):
+        self.up = EMA(alpha=1.0 / period)
+        self.down = EMA(alpha=1.0 / period)
+        self.last_close = None
+
+    def _step(self, x, commit):
+        if self.last_close is None:
+            if commit:
+                self.last_close = x
+            return math.nan
+        delta = x - self.last_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if commit:
+            ma_up, ma_down = self.up.update(gain), self.down.update(loss)
+            self.last_close = x
+        else:
+            ma_up, ma_down = self.up.peek(gain), self.down.peek(loss)
+        rs = ma_up / (ma_down + 1e-9)
+        return 100 - (100 / (1 + rs))
+
+    def peek(self, x):
+        return self._step(x, False)
+
+    def update(self, x):
+        return self._step(x, True)
+
+
+class RollingStats:
+    """
+    Rolling mean / population std (ddof=0) over a fixed window.
+
+    Sums are kept relative to the first value seen so the sum of squares does
+    not lose precision at price levels like XAUUSD.
+    """
+    __slots__ = ('period', 'window', 'total', 'total_sq', 'offset')
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.offset = None
+
+    def _stats(self, total, total_sq, n):
+        mean = total / n
+        var = total_sq / n - mean * mean
+        return mean + self.offset, math.sqrt(var) if var > 0 else 0.0
+
+    def peek(self, x):
+        if self.offset is None:
+            return x, 0.0
+        x -= self.offset
+        total, total_sq, n = self.total + x, self.total_sq + x * x, len(self.window) + 1
+        if n > self.period:
+            old = self.window[0]
+            total, total_sq, n = total - old, total_sq - old * old, n - 1
+        return self._stats(total, total_sq, n)
+
+    def update(self, x):
+        if self.offset is None:
+            self.offset = x
+        x -= self.offset
+        self.window.append(x)
+        self.total += x
+        self.total_sq += x * x
+        if len(self.window) > self.period:
+            old = self.window.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+        return self._stats(self.total, self.total_sq, len(self.window))
+
+
+class IndicatorEngine:
+    """
+    MACD / RSI / Bollinger state for one symbol and timeframe.
+
+    The last candle returned by MT5 is the still-forming bar. Everything up to
+    the bar before it is committed into the recursive state; the forming bar
+    is only evaluated with ``peek`` so repeated polls of the same bar do not
+    move the state. When a new bar shows up the previous one is committed with
+    its final close.
+    """
+
+    def __init__(self, fast=3, slow=8, signal=3, rsi_period=7, bb_period=10, bb_dev=1.8):
+        self.params = dict(fast=fast, slow=slow, signal=signal, rsi_period=rsi_period,
+                           bb_period=bb_period, bb_dev=bb_dev)
+        self.reset()
+
+    def reset(self):
+        p = self.params
+        self.fast = EMA(p['fast'])
+        self.slow = EMA(p['slow'])
+        self.signal = EMA(p['signal'])
+        self.rsi = RSI(p['rsi_period'])
+        self.bb = RollingStats(p['bb_period'])
+        self.bb_dev = p['bb_dev']
+        self.forming_time = None
+        self.prev = (math.nan, math.nan, math.nan, math.nan)
+
+    def state(self):
+        """Recursive state as plain data (for warm-start snapshots)."""
+        return {
+            'params': self.params,
+            'fast': self.fast.value, 'slow': self.slow.value, 'signal': self.signal.value,
+            'rsi': [self.rsi.up.value, self.rsi.down.value, self.rsi.last_close],
+            'bb': [list(self.bb.window), self.bb.total, self.bb.total_sq, self.bb.offset],
+            'forming_time': None if self.forming_time is None else int(self.forming_time),
+            'prev': list(self.prev),
+        }
+
+    def restore(self, state):
+        """Load a ``state()`` dict; False (state untouched) if the params differ."""
+        if state.get('params') != self.params:
+            return False
+        self.reset()
+        self.fast.value, self.slow.value, self.signal.value = state['fast'], state['slow'], state['signal']
+        self.rsi.up.value, self.rsi.down.value, self.rsi.last_close = state['rsi']
+        window, self.bb.total, self.bb.total_sq, self.bb.offset = state['bb']
+        self.bb.window.extend(window)
+        self.forming_time = state['forming_time']
+        self.prev = tuple(state['prev'])
+        return True
+
+    def _commit(self, close):
+        macd_line = self.fast.update(close) - self.slow.update(close)
+        signal_line = self.signal.update(macd_line)
+        rsi_val = self.rsi.update(close)
+        self.bb.update(close)
+        self.prev = (macd_line, signal_line, macd_line - signal_line, rsi_val)
+
+    def seed(self, times, closes):
+        """Rebuild the state from full history (O(n), done once)."""
+        self.reset()
+        for i in range(len(closes) - 1):
+            self._commit(float(closes[i]))
+        self.forming_time = times[-1]
+
+    def sync(self, times, closes):
+        """
+        Bring the state up to date with the latest candles and return the
+        indicator values for the last two bars.
+
+        ``times`` / ``closes`` are array-likes aligned with the candle rows
+        (oldest first). Only the bars that closed since the previous call are
+        processed; if the history no longer lines up the state is reseeded.
+        """
+        _catch_up(self, times, closes)
+        return self.values(float(closes[-1]))
+
+    def values(self, close):
+        """Indicator values with ``close`` as the forming bar's price."""
+        macd_line = self.fast.peek(close) - self.slow.peek(close)
+        signal_line = self.signal.peek(macd_line)
+        mid, std = self.bb.peek(close)
+        macd_prev, signal_prev, hist_prev, rsi_prev = self.prev
+        return IndicatorValues(
+            macd_line, signal_line, macd_line - signal_line, self.rsi.peek(close),
+            mid + self.bb_dev * std, mid, mid - self.bb_dev * std,
+            macd_prev, signal_prev, hist_prev, rsi_prev,
+        )
+
+
+class _Node:
+    """One graph node: its inputs, incremental state and last two values."""
+    __slots__ = ('key', 'inputs', 'make', 'impl', 'fn', 'committed', 'now')
+
+    def __init__(self, key, inputs, make=None, fn=None):
+        self.key = key
+        self.inputs = inputs
+        self.make = make        # factory EMA / RSI / RollingStats (stateful) atau None
+        self.impl = make() if make is not None else None
+        self.fn = fn            # fungsi stateless dari nilai input
+        self.committed = math.nan
+        self.now = math.nan
+
+
+def _impl_state(impl):
+    if isinstance(impl, EMA):
+        return impl.value
+    if isinstance(impl, RSI):
+        return [impl.up.value, impl.down.value, impl.last_close]
+    if isinstance(impl, RollingStats):
+        return [list(impl.window), impl.total, impl.total_sq, impl.offset]
+    return None
+
+
+def _impl_restore(impl, state):
+    if isinstance(impl, EMA):
+        impl.value = state
+    elif isinstance(impl, RSI):
+        impl.up.value, impl.down.value, impl.last_close = state
+    elif isinstance(impl, RollingStats):
+        window, impl.total, impl.total_sq, impl.offset = state
+        impl.window.clear()
+        impl.window.extend(window)
+
+
+class IndicatorGraph:
+    """
+    Shared incremental indicators for several strategies on one
+    (symbol, timeframe).
+
+    Nodes are keyed by what they compute, e.g. ``('ema', 'close', 8)``, so
+    a node requested twice (the slow EMA of a MACD and an EMA trend filter
+    with the same span) is created and updated once. ``sync`` commits the
+    closed bars and evaluates every node once for the forming bar; a second
+    ``sync`` on the same bar and price returns the memoized values.
+    """
+
+    def __init__(self):
+        self.nodes = {}         # key -> _Node, urutan insert = urutan topologis
+        self.requested = 0
+        self.forming_time = None
+        self._memo = None
+        self.add(('close',), ())
+
+    def add(self, key, inputs, make=None, fn=None):
+        """Node ``key`` (created only the first time it is requested)."""
+        self.requested += 1
+        if key not in self.nodes:
+            self.nodes[key] = _Node(key, tuple(self.nodes[k] for k in inputs), make, fn)
+        return key
+
+    # --- node yang tersedia ---
+    def ema(self, span, src=('close',)):
+        return self.add(('ema', src, span), (src,), make=lambda: EMA(span))
+
+    def diff(self, a, b):
+        return self.add(('sub', a, b), (a, b), fn=lambda x, y: x - y)
+
+    def rsi(self, period, src=('close',)):
+        return self.add(('rsi', src, period), (src,), make=lambda: RSI(period))
+
+    def macd(self, fast, slow, signal, src=('close',)):
+        """Keys of (macd, signal, hist), built from shared EMA nodes."""
+        line = self.diff(self.ema(fast, src), self.ema(slow, src))
+        sig = self.add(('ema', line, signal), (line,), make=lambda: EMA(signal))
+        return line, sig, self.diff(line, sig)
+
+    def bollinger(self, period, dev, src=('close',)):
+        """Keys of (upper, mid, lower) over one shared rolling window."""
+        stats = self.add(('stats', src, period), (src,), make=lambda: RollingStats(period))
+        mid = self.add(('mid', stats), (stats,), fn=lambda s: s[0])
+        upper = self.add(('bb_upper', stats, dev), (stats,), fn=lambda s: s[0] + dev * s[1])
+        lower = self.add(('bb_lower', stats, dev), (stats,), fn=lambda s: s[0] - dev * s[1])
+        return upper, mid, lower
+
+    # --- evaluasi ---
+    def _eval(self, close, commit):
+        for node in self.nodes.values():
+            if not node.inputs:
+                value = close
+            else:
+                args = [n.committed if commit else n.now for n in node.inputs]
+                if node.impl is not None:
+                    value = node.impl.update(*args) if commit else node.impl.peek(*args)
+                else:
+                    value = node.fn(*args)
+            if commit:
+                node.committed = value
+            else:
+                node.now = value
+
+    def reset(self):
+        for node in self.nodes.values():
+            if node.make is not None:
+                node.impl = node.make()
+            node.committed = node.now = math.nan
+        self.forming_time = None
+        self._memo = None
+
+    def _commit(self, close):
+        self._eval(close, True)
+
+    def seed(self, times, closes):
+        self.reset()
+        for i in range(len(closes) - 1):
+            self._commit(float(closes[i]))
+        self.forming_time = times[-1]
+
+    def sync(self, times, closes):
+        """Same contract as IndicatorEngine.sync; values via ``now``/``prev``."""
+        _catch_up(self, times, closes)
+        close = float(closes[-1])
+        memo = (self.forming_time, close)
+        if memo != self._memo:
+            self._eval(close, False)
+            self._memo = memo
+        return self
+
+    def now(self, key):
+        """Value with the forming bar."""
+        return self.nodes[key].now
+
+    def prev(self, key):
+        """Value at the last closed bar."""
+        return self.nodes[key].committed
+
+    def state(self):
+        return {
+            'keys': [repr(k) for k in self.nodes],
+            'nodes': [[_impl_state(n.impl), n.committed] for n in self.nodes.values()],
+            'forming_time': None if self.forming_time is None else int(self.forming_time),
+        }
+
+    def restore(self, state):
+        if state.get('keys') != [repr(k) for k in self.nodes]:
+            return False
+        for node, (impl_state, committed) in zip(self.nodes.values(), state['nodes']):
+            if node.impl is not None:
+                _impl_restore(node.impl, impl_state)
+            node.committed = committed
+        self.forming_time = state['forming_time']
+        self._memo = None
+        return True
+
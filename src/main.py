@@ -1,33 +1,60 @@
 import os
+import sys
+import json
 import time
+import argparse
 from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
 
-import MetaTrader5 as mt5
-from connector import initialize, shutdown, get_account_info, get_positions, symbol_select, get_candles
-from strategy import detect_signal
+from backend import mt5
+from connector import (initialize, shutdown, get_account_info, get_tick, sync_history,
+                       get_trade_stats, roll_trade_stats)
+from strategy import detect_signal, signal_engine, StrategySet
 from trader import send_market_order
+from execution import last_report
 from risk_manager import lot_by_risk
+from portfolio import RiskLedger
+from positions import position_book
+from trailing import TrailingStop
+from snapshot import SNAPSHOT_FILE, Snapshotter, load as load_snapshot
 from notifier import notify_console, notify_signal
 from monitor import run_loop, running, CYAN, RESET
+import metrics
 
 # ================================
 # === CONFIG DARI .env ===========
 # ================================
 SYMBOL = os.getenv('SYMBOL')
 TIMEFRAME = os.getenv('TIMEFRAME')
+# Multi simbol: "XAUUSDm:M1,EURUSDm:M5" (kosong = pakai SYMBOL/TIMEFRAME)
+SYMBOLS = os.getenv('SYMBOLS')
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS') or 0) or None
+# poll = tiap POLL_INTERVAL, bar = saat bar close, tick = tiap tick baru
+TRIGGER = (os.getenv('TRIGGER') or 'poll').lower()
 RISK_PERCENT = float(os.getenv('RISK_PERCENT'))
 DAILY_LOSS_LIMIT = float(os.getenv('DAILY_LOSS_LIMIT'))
 MAX_TRADES_PER_DAY = int(os.getenv('MAX_TRADES_PER_DAY'))
 POLL_INTERVAL = int(os.getenv('POLL_INTERVAL'))
 MIN_LOT = float(os.getenv('MIN_LOT'))
+# Batas saldo; kosong = ditanya saat start (kalau ada terminal) atau tanpa batas
+TARGET_BALANCE = os.getenv('TARGET_BALANCE')
+MIN_BALANCE = os.getenv('MIN_BALANCE')
 
 MT5_LOGIN = os.getenv('MT5_LOGIN')
 MT5_PASSWORD = os.getenv('MT5_PASSWORD')
 MT5_SERVER = os.getenv('MT5_SERVER')
 MT5_PATH = os.getenv('MT5_PATH')
 
+# File JSON parameter strategi (mis. hasil `sweep.py --save`), opsional
+STRATEGY_PARAMS_FILE = os.getenv('STRATEGY_PARAMS')
+STRATEGY_PARAMS = None
+if STRATEGY_PARAMS_FILE:
+    with open(STRATEGY_PARAMS_FILE) as f:
+        STRATEGY_PARAMS = json.load(f)
+# Beberapa strategi plugin sekaligus, mis. "macd_rsi,macd_trend" (kosong = detect_signal)
+STRATEGY_NAMES = [s.strip() for s in (os.getenv('STRATEGIES') or '').split(',') if s.strip()]
+
 TIMEFRAMES = {
     "M1": mt5.TIMEFRAME_M1,
     "M5": mt5.TIMEFRAME_M5,
@@ -41,50 +68,91 @@ def map_timeframe(tf):
     return TIMEFRAMES.get(tf.upper(), mt5.TIMEFRAME_M5)
 
 
+def parse_targets(spec, default_symbol, default_tf):
+    """"SYM:TF,SYM2" -> [(symbol, tf_name), ...]"""
+    if not spec:
+        return [(default_symbol, default_tf)]
+    targets = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        symbol, _, tf = item.partition(':')
+        targets.append((symbol.strip(), (tf or default_tf).strip().upper()))
+    return targets
+
+
 # ================================
 # === STATE CONTROL ==============
 # ================================
-trades_today = 0
-loss_today = 0.0
+class SymbolState:
+    """Counter harian & state indikator per (symbol, timeframe)."""
+
+    def __init__(self, symbol, timeframe):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.trades_today = 0
+        self.loss_today = 0.0
+        self.active = True
+        # State indikator incremental (seed sekali, update per bar)
+        self.engine = signal_engine(STRATEGY_PARAMS)
+        # Strategi plugin berbagi satu graph indikator
+        self.strategies = StrategySet(STRATEGY_NAMES, STRATEGY_PARAMS) if STRATEGY_NAMES else None
+
+
+states = {}
 start_balance = None
 target_balance = None
 min_balance = None
 start_time = None
+ledger = None
+# Latency bar close -> order send (ms), hanya di TRIGGER=bar
+bar_latencies = []
 
 
 # ================================
 # === CALLBACK ==================
 # ================================
-def on_tick(account_info, candles, positions):
-    global trades_today, loss_today, running
+_t_detect = metrics.stage('detect_signal')
+_t_lot = metrics.stage('lot_by_risk')
+
+def on_tick(target, account_info, candles, positions, event=None):
+    global running
 
     # Jika bot sudah stop, jangan proses lagi
     if not running:
         return
 
-    # Double check untuk memastikan loop berhenti segera
-    if not running:
+    state = states[target]
+    if not state.active:
         return
 
     balance = account_info.get("balance", 0)
     equity = account_info.get("equity", 0)
 
     notify_console(
+        f"{state.symbol} "
         f"Balance={balance} "
         f"Equity={equity} "
         f"OpenPositions={len(positions)}"
     )
 
-    # stop jika sudah loss melebihi limit harian
-    if loss_today <= -abs(DAILY_LOSS_LIMIT):
-        notify_console(f"🛑 Daily loss limit reached, stopping new entries.")
-        running = False
+    # P/L hari ini untuk simbol ini dari accumulator trade_stats (hari broker)
+    tick = get_tick(state.symbol)
+    if tick is not None:
+        roll_trade_stats(tick.time)
+    state.loss_today = get_trade_stats(state.symbol).daily_profit
+
+    # stop simbol ini jika sudah loss melebihi limit harian
+    if state.loss_today <= -abs(DAILY_LOSS_LIMIT):
+        notify_console(f"🛑 {state.symbol}: daily loss limit reached, stopping new entries.")
+        state.active = False
         return
 
-    # stop jika sudah mencapai max trade per hari
-    if trades_today >= MAX_TRADES_PER_DAY:
-        notify_console(f"🛑 Max trades per day reached, skipping entries.")
-        running = False
+    # stop simbol ini jika sudah mencapai max trade per hari
+    if state.trades_today >= MAX_TRADES_PER_DAY:
+        notify_console(f"🛑 {state.symbol}: max trades per day reached, skipping entries.")
+        state.active = False
         return
 
     # stop jika sudah mencapai target balance
@@ -100,30 +168,79 @@ def on_tick(account_info, candles, positions):
         return
 
     # cari sinyal baru hanya kalau masih running
-    if running:
-        sig = detect_signal(candles)
-        if sig:
-            entry = sig["price"]
-            stop_loss = sig["sl_band"]
-            take_profit = sig["tp_band"]
-
-            lot = lot_by_risk(SYMBOL, entry, stop_loss, RISK_PERCENT, min_lot=MIN_LOT)
-            notify_signal(sig['action'], SYMBOL, entry, stop_loss, take_profit, lot)
-
-            res = send_market_order(SYMBOL, sig["action"], lot, stop_loss, take_profit)
-            notify_console(f"Order send result: {getattr(res,'retcode',None)} {getattr(res,'comment',None)}")
-
-            if getattr(res, "retcode", None) == mt5.TRADE_RETCODE_DONE:
-                trades_today += 1
+    t0 = metrics.now()
+    if state.strategies is not None:
+        # Sinyal pertama (urutan STRATEGIES) yang dipakai
+        signals = state.strategies.evaluate(candles)
+        sig = signals[0] if signals else None
+    else:
+        sig = detect_signal(candles, engine=state.engine, params=STRATEGY_PARAMS)
+    _t_detect.record(t0)
+    if sig:
+        metrics.incr('signals')
+        symbol = state.symbol
+        entry = sig["price"]
+        stop_loss = sig["sl_band"]
+        take_profit = sig["tp_band"]
+
+        t0 = metrics.now()
+        lot = lot_by_risk(symbol, entry, stop_loss, RISK_PERCENT, min_lot=MIN_LOT, equity=equity)
+        _t_lot.record(t0)
+        ok, reason = ledger.check(symbol, sig['action'], lot, entry, stop_loss, equity)
+        if not ok:
+            notify_console(f"🛑 {symbol}: portfolio limit, skip entry ({reason})")
+            metrics.incr('risk_blocks')
+            return
+        notify_signal(sig['action'], symbol, entry, stop_loss, take_profit, lot)
+
+        res = send_market_order(symbol, sig["action"], lot, stop_loss, take_profit, signal_price=entry)
+        notify_console(f"Order send result: {getattr(res,'retcode',None)} {getattr(res,'comment',None)}")
+        report = last_report()
+        if report is not None:
+            notify_console(f"Execution: {report.summary()}")
+        if event is not None and event.bar_close_local is not None:
+            latency_ms = (time.time() - event.bar_close_local) * 1000
+            bar_latencies.append(latency_ms)
+            notify_console(f"⏱️ Bar close -> order: {latency_ms:.1f} ms "
+                           f"(detect {(event.detected - event.bar_close_local) * 1000:.1f} ms)")
+
+        if getattr(res, "retcode", None) == mt5.TRADE_RETCODE_DONE:
+            state.trades_today += 1
+            metrics.incr('orders')
+            # Sync book sekarang: event 'opened' mengisi ledger dengan ticket posisi
+            # (juga di akun netting), sebelum target berikutnya cek limit
+            position_book().sync(symbol)
+        else:
+            metrics.incr('rejects')
 
 
 
 # ================================
 # === MAIN LOOP =================
 # ================================
-def main():
-    global start_balance, target_balance, min_balance, start_time, running
+def balance_bound(cli, env, prompt, default):
+    """CLI > .env > input() (hanya kalau interaktif) > ``default``."""
+    for value in (cli, env):
+        if value not in (None, ''):
+            return float(value)
+    if sys.stdin.isatty():
+        return float(input(prompt))
+    return default
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description='MT5 Python Autobot')
+    ap.add_argument('--target-balance', type=float, help='stop when balance >= this (default TARGET_BALANCE)')
+    ap.add_argument('--min-balance', type=float, help='stop when balance <= this (default MIN_BALANCE)')
+    ap.add_argument('--snapshot', default=None, help='warm-start snapshot file (default SNAPSHOT_FILE)')
+    ap.add_argument('--no-restore', action='store_true', help='ignore an existing snapshot')
+    return ap.parse_args(argv)
 
+
+def main(argv=None):
+    global start_balance, target_balance, min_balance, start_time, running, ledger
+
+    args = parse_args(argv)
     print("🚀 Starting MT5 Python Autobot")
 
     initialize(path=MT5_PATH, login=MT5_LOGIN, password=MT5_PASSWORD, server=MT5_SERVER)
@@ -131,17 +248,61 @@ def main():
     # Ambil saldo awal dari akun
     acc = get_account_info()
     start_balance = acc.get("balance", 0)
+    ledger = RiskLedger(acc.get('currency') or 'USD', acc.get('leverage') or 100)
+    # Ledger mengikuti event position book (di-sync tiap poll oleh monitor)
+    book = position_book()
+    for event in ('opened', 'modified'):
+        book.subscribe(event, lambda pos, deal: ledger.open(pos.ticket, pos.symbol, pos.type, pos.volume,
+                                                            pos.price_open, pos.sl))
+    book.subscribe('closed', lambda pos, deal: ledger.close(pos.ticket))
+    book.subscribe('sl_hit', lambda pos, deal: notify_console(f"🛑 {pos.symbol} #{pos.ticket} SL hit"))
+    book.subscribe('tp_hit', lambda pos, deal: notify_console(f"🎯 {pos.symbol} #{pos.ticket} TP hit"))
     print(f"Saldo awal dari akun MT5: {start_balance}")
-
-    # Input target saldo atas & bawah
-    target_balance = float(input("Masukkan target saldo atas: "))
-    min_balance = float(input("Masukkan batas saldo bawah: "))
+    sync_history()
+    get_trade_stats()
+
+    # Target saldo atas & bawah dari CLI / .env (input() hanya sebagai fallback)
+    target_balance = balance_bound(args.target_balance, TARGET_BALANCE,
+                                   "Masukkan target saldo atas: ", float('inf'))
+    min_balance = balance_bound(args.min_balance, MIN_BALANCE,
+                                "Masukkan batas saldo bawah: ", float('-inf'))
     start_time = datetime.now()
 
+    targets = []
+    for symbol, tf_name in parse_targets(SYMBOLS, SYMBOL, TIMEFRAME):
+        target = (symbol, map_timeframe(tf_name))
+        states[target] = SymbolState(symbol, tf_name)
+        targets.append(target)
+
+    # Warm start: candle buffer, state indikator & counter harian dari snapshot
+    snapshot_path = (args.snapshot if args.snapshot is not None else SNAPSHOT_FILE).format(
+        login=acc.get('login', 'default'))
+    if snapshot_path and not args.no_restore:
+        restored = load_snapshot(snapshot_path, states)
+        if restored:
+            print(f"♻️  Restored from {snapshot_path}: {restored}")
+    snapshots = Snapshotter(snapshot_path, states)
+
+    last_balance = [start_balance]
+
+    def on_positions(account, positions):
+        # Balance berubah = ada deal penutup baru -> sync history ke trade_stats
+        if account.get('balance') != last_balance[0]:
+            last_balance[0] = account.get('balance')
+            sync_history()
+        trailer.update(positions)
+        snapshots.maybe_save()
+
+    trailer = TrailingStop()
+    exporter = metrics.Exporter()
+    if metrics.METRICS:
+        exporter.start()
+
     try:
-        tf = map_timeframe(TIMEFRAME)
-        run_loop(SYMBOL, tf, on_tick)
+        run_loop(targets, on_tick, workers=FETCH_WORKERS, trigger=TRIGGER, on_positions=on_positions)
     finally:
+        snapshots.save()
+        exporter.stop()
         shutdown()
         # === Summary ===
         end_time = datetime.now()
@@ -157,8 +318,20 @@ def main():
             print(f"💚 Profit/Loss   : +{profit}")
         else:
             print(f"❤️ Profit/Loss   : {profit}")
-        print(f"📈 Total Trades  : {trades_today}")
+        print(f"📈 Total Trades  : {sum(st.trades_today for st in states.values())}")
         print(f"⏱️  Runtime       : {duration}")
+        stats = get_trade_stats()
+        if stats.count:
+            print(f"🏁 Closed Trades : {stats.count} | win rate {stats.win_rate:.1f}% | "
+                  f"PF {stats.profit_factor:.2f} | max DD {stats.max_drawdown:.2f} | "
+                  f"Sharpe({len(stats.returns)}) {stats.sharpe:.2f}")
+        if trailer.distance:
+            t = trailer.summary()
+            print(f"🪜 Trailing SL   : {t['sent']} sent | {t['suppressed']} suppressed (< step) | "
+                  f"{t['throttled']} throttled | {t['failed']} failed")
+        if bar_latencies:
+            lat = sorted(bar_latencies)
+            print(f"⏱️  Bar->Order    : p50 {lat[len(lat) // 2]:.1f} ms | max {lat[-1]:.1f} ms")
         print(f"{CYAN}========================{RESET}")
 
 
@@ -0,0 +1,203 @@
+"""
+Per-stage latency histograms and counters for the bot loop.
+
+Usage on the hot path:
+
+    _candles_timer = metrics.stage('get_candles')   # sekali, saat import
+    ...
+    t0 = metrics.now()
+    candles = get_candle_view(...)
+    _candles_timer.record(t0)
+    metrics.incr('signals')
+
+Histograms are HDR-style (log-linear buckets, ~3% relative error) over
+nanoseconds, so a record is a few integer ops and one list increment. A
+background exporter writes a Prometheus text file and a JSON snapshot every
+METRICS_INTERVAL seconds. With METRICS=off stage() hands out a no-op histogram
+and incr does nothing.
+"""
+import json
+import os
+import threading
+import time
+
+METRICS = os.getenv('METRICS', 'on').lower() != 'off'
+METRICS_INTERVAL = float(os.getenv('METRICS_INTERVAL', '10'))
+METRICS_PROM = os.getenv('METRICS_PROM', 'metrics.prom')
+METRICS_JSON = os.getenv('METRICS_JSON', 'metrics.json')
+
+# 2^SUB_BITS sub-bucket per oktaf -> error relatif <= 2^-(SUB_BITS-1)
+SUB_BITS = 6
+_SUB = 1 << SUB_BITS
+_HALF = _SUB >> 1
+_MAX_EXP = 42  # bucket sampai 2^48 ns (~78 jam); nilai lebih besar masuk bucket terakhir
+_LAST = _SUB + _HALF * _MAX_EXP - 1
+
+now = time.perf_counter_ns
+
+
+def _bucket_low(idx):
+    """Smallest value that falls into bucket ``idx``."""
+    if idx < _SUB:
+        return idx
+    e, m = divmod(idx - _SUB, _HALF)
+    return (m + _HALF) << (e + 1)
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (_LAST + 1)
+        self.total = 0
+        self.max = 0
+
+    def record(self, t0):
+        """Record ``now() - t0`` (inlined record_value, this is the hot path)."""
+        v = now() - t0
+        if v < _SUB:
+            idx = v if v > 0 else 0
+        else:
+            e = v.bit_length() - SUB_BITS
+            idx = min(e * _HALF + (v >> e), _LAST)
+        self.counts[idx] += 1
+        self.total += v
+        if v > self.max:
+            self.max = v
+
+    def record_value(self, v):
+        if v < _SUB:
+            idx = v if v > 0 else 0
+        else:
+            e = v.bit_length() - SUB_BITS
+            idx = min(e * _HALF + (v >> e), _LAST)
+        self.counts[idx] += 1
+        self.total += v
+        if v > self.max:
+            self.max = v
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def quantile(self, q, count=None):
+        count = self.count if count is None else count
+        if count == 0:
+            return 0
+        target = q * count
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            if c:
+                seen += c
+                if seen >= target:
+                    return min(_bucket_low(idx), self.max)
+        return self.max
+
+    def summary(self):
+        count = self.count
+        return {
+            'count': count,
+            'mean_us': self.total / count / 1000 if count else 0.0,
+            'p50_us': self.quantile(0.5, count) / 1000,
+            'p99_us': self.quantile(0.99, count) / 1000,
+            'max_us': self.max / 1000,
+        }
+
+
+_stages = {}
+_counters = {}
+
+
+class _NullHistogram:
+    __slots__ = ()
+
+    def record(self, t0):
+        pass
+
+    def record_value(self, v):
+        pass
+
+
+def stage(name):
+    """
+    Histogram for ``name``. Bind it once at import time and call
+    ``.record(t0)`` on the hot path to skip the name lookup.
+    """
+    if not METRICS:
+        return _NullHistogram()
+    h = _stages.get(name)
+    if h is None:
+        h = _stages[name] = Histogram()
+    return h
+
+
+def _incr(name, n=1):
+    _counters[name] = _counters.get(name, 0) + n
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+incr = _incr if METRICS else _noop
+
+
+def snapshot():
+    return {
+        'time': time.time(),
+        'stages': {name: h.summary() for name, h in list(_stages.items())},
+        'counters': dict(_counters),
+    }
+
+
+def to_prometheus(snap):
+    lines = [
+        '# HELP mt5bot_stage_seconds Latency per bot loop stage.',
+        '# TYPE mt5bot_stage_seconds summary',
+    ]
+    for name, s in sorted(snap['stages'].items()):
+        for q, key in (('0.5', 'p50_us'), ('0.99', 'p99_us'), ('1', 'max_us')):
+            lines.append(f'mt5bot_stage_seconds{{stage="{name}",quantile="{q}"}} {s[key] / 1e6:.9f}')
+        lines.append(f'mt5bot_stage_seconds_sum{{stage="{name}"}} {s["mean_us"] * s["count"] / 1e6:.9f}')
+        lines.append(f'mt5bot_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+    for name, value in sorted(snap['counters'].items()):
+        lines.append(f'# TYPE mt5bot_{name}_total counter')
+        lines.append(f'mt5bot_{name}_total {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _write_atomic(path, text):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def export(prom_path=METRICS_PROM, json_path=METRICS_JSON):
+    snap = snapshot()
+    if prom_path:
+        _write_atomic(prom_path, to_prometheus(snap))
+    if json_path:
+        _write_atomic(json_path, json.dumps(snap, indent=2))
+    return snap
+
+
+class Exporter(threading.Thread):
+    """Tulis metrics ke file tiap ``interval`` detik (dan sekali lagi saat stop)."""
+
+    def __init__(self, interval=METRICS_INTERVAL):
+        super().__init__(name='metrics', daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                export()
+            except OSError as e:
+                print(f'Metrics export error: {e}')
+
+    def stop(self):
+        self._stop_event.set()
+        if METRICS:
+            export()
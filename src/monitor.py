@@ -1,16 +1,43 @@
+import asyncio
 import time
 import os
 import signal
+import re
 import sys
-from connector import get_candles, get_account_info, symbol_select, get_positions, get_history
-from tabulate import tabulate
-from datetime import datetime, date
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from connector import (get_candle_view, get_account_info, symbol_select, get_positions,
+                       sync_history, get_trade_stats, get_tick, timeframe_seconds, get_mtf_views,
+                       server_time)
+from trade_stats import broker_day
+import metrics
+# Lebar kolom emoji di tabel (requirements.txt); tanpa wcwidth lebar = len()
+try:
+    from wcwidth import wcswidth
+except ImportError:
+    wcswidth = None
+from datetime import datetime
+from functools import lru_cache
 
 POLL_INTERVAL = int(os.getenv('POLL_INTERVAL', '30'))  # Match main.py setting
+TICK_POLL_MS = float(os.getenv('TICK_POLL_MS', '10'))  # interval cek tick di mode bar/tick
+MAX_FPS = float(os.getenv('MAX_FPS', '2'))  # batas frame rate dashboard
+RENDER = os.getenv('RENDER', 'on').lower()  # 'off' = headless, tanpa dashboard
+# on = timeframe > M1 dibangun lokal dari M1 (satu fetch per simbol, lihat resample.py)
+RESAMPLE = os.getenv('RESAMPLE', 'off').lower() == 'on'
+# Fetch MT5 lewat asyncio (async_connector): account, posisi & candle bersamaan
+ASYNC_FETCH = os.getenv('ASYNC_FETCH', 'off').lower() == 'on'
 
 # Global flag untuk kontrol running state
 running = True
 
+# Timer per stage (lihat metrics.py)
+_t_account = metrics.stage('get_account_info')
+_t_positions = metrics.stage('get_positions')
+_t_candles = metrics.stage('get_candles')
+_t_history = metrics.stage('get_history')
+_t_render = metrics.stage('print_monitor')
+
 def signal_handler(signum, frame):
     """Handle Ctrl+C signal"""
     global running
@@ -63,14 +90,135 @@ def format_percentage(value, total):
     percentage = (value / total) * 100
     return f"{percentage:.2f}%"
 
-def print_monitor(account, positions, history):
-    os.system('cls' if os.name == 'nt' else 'clear')
+_ANSI_RE = re.compile(r'\x1b\[[0-9;]*m')
+
+@lru_cache(maxsize=8192)
+def _cell_width(text):
+    plain = _ANSI_RE.sub('', text)
+    width = wcswidth(plain) if wcswidth else -1
+    return width if width >= 0 else len(plain)
+
+def _cell_text(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float):
+        return format(value, 'g')
+    return str(value)
+
+@lru_cache(maxsize=8192)
+def _grid_row(cells, widths, colalign):
+    parts = []
+    for text, width, align in zip(cells, widths, colalign):
+        pad = " " * (width - _cell_width(text))
+        parts.append(f" {pad}{text} " if align == "right" else f" {text}{pad} ")
+    return "|" + "|".join(parts) + "|"
+
+def _grid(rows, headers=(), tablefmt="grid", colalign=None):
+    """
+    Tabel format "grid" seperti tabulate, tapi tiap baris di-cache: kalau
+    lebar kolom tidak berubah, baris yang isinya sama tidak diformat ulang.
+    """
+    rows = [tuple(_cell_text(c) for c in r) for r in rows]
+    headers = tuple(_cell_text(h) for h in headers)
+    all_rows = rows + [headers] if headers else rows
+    ncols = max(len(r) for r in all_rows)
+    colalign = tuple(colalign or ("left",) * ncols)
+    widths = tuple(max(_cell_width(r[i]) for r in all_rows if i < len(r)) for i in range(ncols))
+    if headers:
+        # Sama seperti tabulate: header dapat padding minimal 2
+        widths = tuple(max(w, _cell_width(h) + 2) for w, h in zip(widths, headers))
+    sep = "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+    lines = [sep]
+    if headers:
+        lines.append(_grid_row(headers, widths, colalign))
+        lines.append(sep.replace("-", "="))
+    for r in rows:
+        lines.append(_grid_row(r, widths, colalign))
+        lines.append(sep)
+    return "\n".join(lines)
+
+
+class TerminalRenderer:
+    """
+    Render dashboard dengan ANSI escape code, hanya menulis baris yang berubah.
+
+    Frame pertama (dan full repaint berkala) menggambar semua baris dari
+    pojok kiri atas; frame berikutnya memindahkan kursor ke baris yang
+    berbeda saja. Frame rate dibatasi ``max_fps`` terlepas dari poll rate,
+    frame yang datang terlalu cepat di-drop. ``headless`` mematikan render.
+    """
+
+    def __init__(self, max_fps=2.0, headless=False, stream=None, full_redraw_every=10.0):
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.headless = headless
+        self.stream = stream or sys.stdout
+        self.full_redraw_every = full_redraw_every
+        self.prev = []
+        self.last_frame = 0.0
+        self.last_full = 0.0
+        if os.name == 'nt' and not headless:
+            _enable_windows_ansi()
+
+    def render(self, lines, force=False):
+        """Tulis frame; return False jika di-skip (headless / frame rate cap)."""
+        if self.headless:
+            return False
+        now = time.monotonic()
+        if not force and now - self.last_frame < self.min_interval:
+            return False
+        self.last_frame = now
+
+        out = []
+        if not self.prev or now - self.last_full >= self.full_redraw_every:
+            out.append("\033[H")
+            out.extend(f"{line}\033[K\n" for line in lines)
+            self.last_full = now
+        else:
+            prev = self.prev
+            for i, line in enumerate(lines):
+                if i >= len(prev) or prev[i] != line:
+                    out.append(f"\033[{i + 1};1H{line}\033[K")
+            out.append(f"\033[{len(lines) + 1};1H")
+        # Bersihkan sisa frame lama & output notifikasi di bawah dashboard
+        out.append("\033[J")
+        self.stream.write("".join(out))
+        self.stream.flush()
+        self.prev = lines
+        return True
+
+
+def _enable_windows_ansi():
+    """Aktifkan VT processing di console Windows (tanpa spawn shell)."""
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)
+        mode = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            kernel32.SetConsoleMode(handle, mode.value | 0x0004)
+    except Exception:
+        pass
+
+
+_renderer = TerminalRenderer(max_fps=MAX_FPS, headless=RENDER == 'off')
+
+def build_monitor(account, positions, history, daily=None, stats=None):
+    """
+    Susun dashboard sebagai list baris (tanpa menulis ke terminal).
+    Dengan ``stats`` (trade_stats.TradeStats) history, ringkasan & P/L hari
+    ini dibaca dari accumulator, tanpa sort / scan ulang.
+    """
+    lines = []
+
+    def out(text=""):
+        lines.extend(str(text).split("\n"))
+
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"{CYAN}{EMOJI_CHART} === TRADING MONITOR [{current_time}] ==={RESET}")
-    print()
+    out(f"{CYAN}{EMOJI_CHART} === TRADING MONITOR [{current_time}] ==={RESET}")
+    out()
 
     # Account Information - Tabel
-    print(f"{BLUE}{EMOJI_MONEY} === ACCOUNT INFORMATION ==={RESET}")
+    out(f"{BLUE}{EMOJI_MONEY} === ACCOUNT INFORMATION ==={RESET}")
     account_data = [
         ["Balance", format_currency(account['balance'])],
         ["Equity", format_currency(account['equity'])],
@@ -78,11 +226,11 @@ def print_monitor(account, positions, history):
         ["Margin Used", format_currency(account['balance'] - account['free_margin'])],
         ["Margin Level", format_percentage(account['equity'], account['balance'] - account['free_margin']) if account['balance'] - account['free_margin'] > 0 else "N/A"]
     ]
-    print(tabulate(account_data, tablefmt="grid", colalign=("left", "right")))
-    print()
+    out(_grid(account_data, tablefmt="grid", colalign=("left", "right")))
+    out()
     
     # Open Positions - Tabel dengan ringkasan
-    print(f"{BLUE}{EMOJI_ROCKET} === OPEN POSITIONS ==={RESET}")
+    out(f"{BLUE}{EMOJI_ROCKET} === OPEN POSITIONS ==={RESET}")
     if positions:
         # Ringkasan posisi
         total_profit = sum(pos['profit'] for pos in positions)
@@ -113,30 +261,44 @@ def print_monitor(account, positions, history):
         
         # Header tabel dengan lebar kolom yang disesuaikan
         headers = ["Type    ", "Symbol", "Volume", "Open Price", "SL", "TP", "Profit"]
-        print(tabulate(positions_data, headers=headers, tablefmt="grid", colalign=("left", "left", "right", "right", "right", "right", "right")))
+        out(_grid(positions_data, headers=headers, tablefmt="grid", colalign=("left", "left", "right", "right", "right", "right", "right")))
         
         # Ringkasan
-        print(f"\n{YELLOW}Summary:{RESET}")
-        print(f"Total Positions: {len(positions)}")
-        print(f"Total Volume: {format_currency(total_volume)}")
-        print(f"Total Profit/Loss: {format_profit(total_profit)}")
+        out(f"\n{YELLOW}Summary:{RESET}")
+        out(f"Total Positions: {len(positions)}")
+        out(f"Total Volume: {format_currency(total_volume)}")
+        out(f"Total Profit/Loss: {format_profit(total_profit)}")
     else:
-        print("No open positions.")
-    print()
+        out("No open positions.")
+    out()
     
     # Trading History - Tabel dengan ringkasan
-    print(f"{BLUE}{EMOJI_HISTORY} === TRADING HISTORY (Last 10) ==={RESET}")
-    if history:
+    last_n = stats.window.n if stats is not None else 10
+    out(f"{BLUE}{EMOJI_HISTORY} === TRADING HISTORY (Last {last_n}) ==={RESET}")
+    if stats is not None:
+        history = stats.recent()
+    if history and stats is not None:
+        recent_history = history
+        daily_profit, daily_win, daily_loss = stats.daily_profit, stats.daily_win, stats.daily_loss
+        total_history_profit = stats.window.total
+        winning_trades = stats.window.wins
+        losing_trades = len(stats.window) - winning_trades
+        win_rate = winning_trades / len(stats.window) * 100
+    elif history:
         # Urutkan history dari terbaru ke terlama (pastikan history sudah diurutkan)
         sorted_history = sorted(history, key=lambda h: h.get('time_close', 0), reverse=True)
         recent_history = sorted_history[:10]
 
         # Hitung total profit/loss hari ini
-        today = date.today()
-        daily_trades = [h for h in history if 'time_close' in h and datetime.fromtimestamp(h['time_close']).date() == today]
-        daily_profit = sum(h['profit'] for h in daily_trades)
-        daily_loss = sum(h['profit'] for h in daily_trades if h['profit'] < 0)
-        daily_win = sum(h['profit'] for h in daily_trades if h['profit'] > 0)
+        if daily is not None:
+            daily_profit, daily_win, daily_loss = daily['profit'], daily['win'], daily['loss']
+        else:
+            # Hari broker (waktu server), sama seperti trade_stats
+            today = broker_day(server_time())
+            daily_trades = [h for h in history if 'time_close' in h and broker_day(h['time_close']) == today]
+            daily_profit = sum(h['profit'] for h in daily_trades)
+            daily_loss = sum(h['profit'] for h in daily_trades if h['profit'] < 0)
+            daily_win = sum(h['profit'] for h in daily_trades if h['profit'] > 0)
 
         # Ringkasan history
         total_history_profit = sum(h['profit'] for h in recent_history)
@@ -144,6 +306,7 @@ def print_monitor(account, positions, history):
         losing_trades = sum(1 for h in recent_history if h['profit'] < 0)
         win_rate = (winning_trades / len(recent_history)) * 100 if recent_history else 0
 
+    if history:
         # Data untuk tabel
         history_data = []
         for h in recent_history:
@@ -170,56 +333,397 @@ def print_monitor(account, positions, history):
             ])
 
         headers = ["Type    ", "Symbol", "Volume", "Open Price", "Close Price", "Close Time", "Profit"]
-        print(tabulate(history_data, headers=headers, tablefmt="grid", colalign=("left", "left", "right", "right", "right", "left", "right")))
+        out(_grid(history_data, headers=headers, tablefmt="grid", colalign=("left", "left", "right", "right", "right", "left", "right")))
 
         # Ringkasan
-        print(f"\n{YELLOW}Summary (Last 10 Trades):{RESET}")
-        print(f"Total Trades: {len(recent_history)}")
-        print(f"Winning Trades: {winning_trades}")
-        print(f"Losing Trades: {losing_trades}")
-        print(f"Win Rate: {win_rate:.2f}%")
-        print(f"Total Profit/Loss: {format_profit(total_history_profit)}")
-        print(f"Average Profit/Trade: {format_profit(total_history_profit/len(recent_history)) if recent_history else 0}")
+        out(f"\n{YELLOW}Summary (Last {last_n} Trades):{RESET}")
+        out(f"Total Trades: {len(recent_history)}")
+        out(f"Winning Trades: {winning_trades}")
+        out(f"Losing Trades: {losing_trades}")
+        out(f"Win Rate: {win_rate:.2f}%")
+        out(f"Total Profit/Loss: {format_profit(total_history_profit)}")
+        out(f"Average Profit/Trade: {format_profit(total_history_profit/len(recent_history)) if recent_history else 0}")
 
         # Tambahan: Ringkasan harian
-        print(f"\n{MAGENTA}Today's P/L: {format_profit(daily_profit)} | Win: {format_profit(daily_win)} | Loss: {format_profit(daily_loss)}{RESET}")
+        out(f"\n{MAGENTA}Today's P/L: {format_profit(daily_profit)} | Win: {format_profit(daily_win)} | Loss: {format_profit(daily_loss)}{RESET}")
+        if stats is not None:
+            pf = f"{stats.profit_factor:.2f}" if stats.gross_loss else "∞"
+            out(f"{MAGENTA}All trades: {stats.count} | Win Rate: {stats.win_rate:.2f}% | Profit Factor: {pf} | "
+                f"Max DD: {format_currency(stats.max_drawdown)} | Sharpe({len(stats.returns)}): {stats.sharpe:.2f}{RESET}")
 
     else:
-        print("No history yet.")
-    print()
+        out("No history yet.")
+    out()
     
     # System Information
-    print(f"{BLUE}{EMOJI_SETTINGS} === SYSTEM INFORMATION ==={RESET}")
+    out(f"{BLUE}{EMOJI_SETTINGS} === SYSTEM INFORMATION ==={RESET}")
     system_data = [
         ["Poll Interval", f"{POLL_INTERVAL} seconds"],
         ["Next Update", f"in {POLL_INTERVAL} seconds"]
     ]
-    print(tabulate(system_data, tablefmt="grid", colalign=("left", "left")))
-    print()
+    out(_grid(system_data, tablefmt="grid", colalign=("left", "left")))
+    out()
+    return lines
+
+def print_monitor(account, positions, history, daily=None, stats=None):
+    _renderer.render(build_monitor(account, positions, history, daily, stats))
+
+class BarEvent:
+    """Info trigger dari BarWatcher: jenis event & waktu close bar (epoch lokal)."""
+    __slots__ = ('kind', 'bar_start', 'bar_close_local', 'detected')
+
+    def __init__(self, kind, bar_start, bar_close_local):
+        self.kind = kind
+        self.bar_start = bar_start
+        self.bar_close_local = bar_close_local
+        self.detected = time.time()
+
+
+class BarWatcher:
+    """
+    Deteksi tick baru / bar baru dari symbol_info_tick (murah, tanpa copy rates).
+
+    Waktu tick MT5 adalah waktu server broker, jadi selisih ke jam lokal
+    (kelipatan 30 menit untuk zona waktu) diestimasi dari tick pertama agar
+    waktu close bar bisa dibandingkan dengan time.time() saat order dikirim.
+    """
+
+    def __init__(self, symbol, timeframe):
+        self.symbol = symbol
+        self.period = timeframe_seconds(timeframe)
+        self.last_msc = None
+        self.bar_start = None
+        self.server_offset = None
+
+    def poll(self, every_tick=False):
+        return self.feed(get_tick(self.symbol, max_age=0), every_tick)
+
+    def feed(self, tick, every_tick=False):
+        """Same as ``poll`` with a tick fetched by the caller."""
+        if tick is None or tick.time_msc == self.last_msc:
+            return None
+        self.last_msc = tick.time_msc
+        server_now = tick.time_msc / 1000.0
+        if self.server_offset is None:
+            self.server_offset = round((server_now - time.time()) / 1800) * 1800
+        bar_start = int(server_now) - int(server_now) % self.period
+        if self.bar_start is None:
+            self.bar_start = bar_start
+            return None
+        if bar_start > self.bar_start:
+            self.bar_start = bar_start
+            return BarEvent('bar', bar_start, bar_start - self.server_offset)
+        if every_tick:
+            return BarEvent('tick', bar_start, None)
+        return None
+
+
+class Dashboard(threading.Thread):
+    """
+    Thread render dashboard, terpisah dari jalur trading.
 
-def run_loop(symbol, timeframe, on_tick):
+    Loop trading hanya memanggil ``publish`` (satu assignment referensi ke
+    snapshot immutable, tanpa lock). Thread ini membaca snapshot terbaru
+    sesuai frame rate renderer, dan sync history (store + trade_stats) sendiri
+    tiap ``history_interval`` detik, jadi ukuran history tidak menambah
+    latency order.
+    """
+
+    def __init__(self, renderer, history_interval=POLL_INTERVAL):
+        super().__init__(name='dashboard', daemon=True)
+        self.renderer = renderer
+        self.history_interval = history_interval
+        self.snapshot = None
+        self._stop_event = threading.Event()
+
+    def publish(self, account, positions):
+        self.snapshot = (account, tuple(positions))
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        stats = None
+        last_history = float('-inf')
+        interval = self.renderer.min_interval or 0.5
+        while not self._stop_event.wait(interval):
+            snapshot = self.snapshot
+            if snapshot is None:
+                continue
+            now = time.monotonic()
+            if now - last_history >= self.history_interval:
+                try:
+                    # Sync incremental store lokal; deal baru masuk ke accumulator trade_stats
+                    t0 = metrics.now()
+                    sync_history()
+                    stats = get_trade_stats()
+                    _t_history.record(t0)
+                except Exception as e:
+                    print(f'{RED}Dashboard history error: {e}{RESET}')
+                last_history = now
+            account, positions = snapshot
+            t0 = metrics.now()
+            self.renderer.render(build_monitor(account, list(positions), [], stats=stats))
+            _t_render.record(t0)
+
+def _fetch_group(symbol, timeframes):
+    """
+    Candles of ``timeframes`` of one symbol as {timeframe: candles}. With
+    RESAMPLE satu fetch M1 melayani semua timeframe simbol itu.
+    """
+    t0 = metrics.now()
+    if RESAMPLE and any(timeframe_seconds(tf) > 60 for tf in timeframes):
+        views = get_mtf_views(symbol, timeframes, n=500)
+    else:
+        views = {tf: get_candle_view(symbol, tf, n=500) for tf in timeframes}
+    _t_candles.record(t0)
+    return views
+
+def _fetch_candles(symbol, timeframe):
+    return _fetch_group(symbol, [timeframe])[timeframe]
+
+def _groups(targets):
+    """
+    Fetch jobs for ``targets`` as (symbol, timeframes): one per target, or
+    one per symbol with RESAMPLE (timeframe tinggi dibangun dari M1 yang sama).
+    """
+    if not RESAMPLE:
+        return [(symbol, (tf,)) for symbol, tf in targets]
+    by_symbol = {}
+    for symbol, tf in targets:
+        by_symbol.setdefault(symbol, []).append(tf)
+    return [(symbol, tuple(tfs)) for symbol, tfs in by_symbol.items()]
+
+def _fetch_account():
+    t0 = metrics.now()
+    account = get_account_info()
+    _t_account.record(t0)
+    return account
+
+def _fetch_positions():
+    t0 = metrics.now()
+    positions = get_positions()
+    _t_positions.record(t0)
+    return positions
+
+def _group(positions):
+    by_symbol = {}
+    for pos in positions:
+        by_symbol.setdefault(pos['symbol'], []).append(pos)
+    return by_symbol
+
+def _fetch_shared():
+    account = _fetch_account()
+    positions = _fetch_positions()
+    return account, positions, _group(positions)
+
+def _poll_loop(targets, on_tick, pool, dashboard, on_positions=None):
+    """Mode poll: fetch ulang tiap POLL_INTERVAL per target."""
+    in_flight = {}
+    next_due = {t: 0.0 for t in targets}
+
+    while running:
+        now = time.monotonic()
+        due = [t for t in targets if t not in in_flight and now >= next_due[t]]
+        for symbol, tfs in _groups(due):
+            fut = pool.submit(_fetch_group, symbol, tfs)
+            for tf in tfs:
+                next_due[(symbol, tf)] = now + POLL_INTERVAL
+                in_flight[(symbol, tf)] = fut
+
+        wait_for = max(0.0, min(next_due.values()) - now) if len(in_flight) < len(targets) else POLL_INTERVAL
+        if not in_flight:
+            time.sleep(wait_for)
+            continue
+        done, _ = wait(in_flight.values(), timeout=wait_for, return_when=FIRST_COMPLETED)
+        if not done:
+            continue
+
+        account, positions, by_symbol = _fetch_shared()
+        dashboard.publish(account, positions)
+        if on_positions is not None:
+            on_positions(account, positions)
+
+        for target, fut in list(in_flight.items()):
+            if fut not in done:
+                continue
+            del in_flight[target]
+            try:
+                candles = fut.result()[target[1]]
+            except Exception as e:
+                print(f'{RED}Fetch error for {target[0]}: {e}{RESET}')
+                continue
+            on_tick(target, account, candles, by_symbol.get(target[0], []))
+
+def _event_loop(targets, on_tick, pool, dashboard, every_tick=False, on_positions=None):
+    """
+    Mode event: cek tick tiap TICK_POLL_MS dan jalankan strategi hanya saat
+    bar close (atau tiap tick baru jika ``every_tick``). Pada bar close
+    strategi hanya melihat candle yang sudah close.
+    """
+    watchers = {t: BarWatcher(*t) for t in targets}
+    last_publish = 0.0
+
+    while running:
+        fired = {}
+        for target, watcher in watchers.items():
+            ev = watcher.poll(every_tick)
+            if ev is not None:
+                fired[target] = ev
+        if not fired:
+            now = time.monotonic()
+            if now - last_publish >= POLL_INTERVAL:
+                account, positions, _ = _fetch_shared()
+                dashboard.publish(account, positions)
+                if on_positions is not None:
+                    on_positions(account, positions)
+                last_publish = now
+            time.sleep(TICK_POLL_MS / 1000.0)
+            continue
+
+        futures = {pool.submit(_fetch_group, symbol, tfs): (symbol, tfs)
+                   for symbol, tfs in _groups(fired)}
+        account, positions, by_symbol = _fetch_shared()
+        dashboard.publish(account, positions)
+        if on_positions is not None:
+            on_positions(account, positions)
+        for fut in as_completed(futures):
+            symbol, tfs = futures[fut]
+            try:
+                views = fut.result()
+            except Exception as e:
+                print(f'{RED}Fetch error for {symbol}: {e}{RESET}')
+                continue
+            for tf in tfs:
+                target = (symbol, tf)
+                ev = fired[target]
+                candles = views[tf]
+                if ev.kind == 'bar' and len(candles) and candles['time'][-1] >= ev.bar_start:
+                    candles = candles[:-1]
+                on_tick(target, account, candles, by_symbol.get(symbol, []), event=ev)
+
+async def _async_loop(targets, on_tick, conn, dashboard, trigger='poll', on_positions=None):
+    """
+    Mode ASYNC_FETCH: semua call MT5 lewat AsyncConnector. Account, posisi
+    dan candle target yang jatuh tempo di-fetch bersamaan (request yang
+    sama digabung), jadi satu iterasi kira-kira selama call paling lambat.
+    ``on_tick`` tetap dipanggil satu per satu di thread event loop.
+    """
+    every_tick = trigger == 'tick'
+    watchers = {t: BarWatcher(*t) for t in targets} if trigger != 'poll' else {}
+    next_due = {t: 0.0 for t in targets}
+    last_publish = 0.0
+
+    def shared():
+        return asyncio.gather(conn.call(('account',), _fetch_account),
+                              conn.call(('positions', None), _fetch_positions))
+
+    async def candles_of(symbol, tfs):
+        try:
+            return symbol, tfs, await conn.call(('candles', symbol, tfs), _fetch_group, symbol, tfs)
+        except Exception as e:
+            return symbol, tfs, e
+
+    def publish(account, positions):
+        dashboard.publish(account, positions)
+        if on_positions is not None:
+            on_positions(account, positions)
+
+    while running:
+        now = time.monotonic()
+        if watchers:
+            ticks = await asyncio.gather(*(conn.tick(symbol, 0) for symbol, _ in watchers))
+            fired = {}
+            for (target, watcher), tick in zip(watchers.items(), ticks):
+                ev = watcher.feed(tick, every_tick)
+                if ev is not None:
+                    fired[target] = ev
+        else:
+            fired = {t: None for t in targets if now >= next_due[t]}
+            for target in fired:
+                next_due[target] = now + POLL_INTERVAL
+
+        if not fired:
+            if watchers and now - last_publish >= POLL_INTERVAL:
+                publish(*await shared())
+                last_publish = now
+            wait_for = TICK_POLL_MS / 1000.0 if watchers else max(0.0, min(next_due.values()) - now)
+            await asyncio.sleep(wait_for)
+            continue
+
+        # Task dijadwalkan sekarang supaya candle jalan bersamaan dengan account/posisi
+        jobs = [asyncio.create_task(candles_of(symbol, tfs)) for symbol, tfs in _groups(fired)]
+        account, positions = await shared()
+        by_symbol = _group(positions)
+        publish(account, positions)
+        for job in asyncio.as_completed(jobs):
+            symbol, tfs, views = await job
+            if isinstance(views, Exception):
+                print(f'{RED}Fetch error for {symbol}: {views}{RESET}')
+                continue
+            for tf in tfs:
+                target = (symbol, tf)
+                ev = fired[target]
+                candles = views[tf]
+                if ev is None:
+                    on_tick(target, account, candles, by_symbol.get(symbol, []))
+                    continue
+                if ev.kind == 'bar' and len(candles) and candles['time'][-1] >= ev.bar_start:
+                    candles = candles[:-1]
+                on_tick(target, account, candles, by_symbol.get(symbol, []), event=ev)
+
+def run_loop(targets, on_tick, workers=None, trigger='poll', on_positions=None):
+    """
+    Pantau beberapa (symbol, timeframe) sekaligus dalam satu proses.
+
+    Candle tiap target di-fetch di thread pool, jadi satu simbol yang lambat
+    tidak menahan yang lain; dengan ASYNC_FETCH=on account dan
+    posisi juga di-fetch bersamaan lewat async_connector.
+    ``on_tick(target, account, candles, positions)`` dipanggil di thread
+    utama, jadi state per simbol tidak perlu lock.
+
+    ``trigger``: 'poll' (tiap POLL_INTERVAL), 'bar' (saat bar close) atau
+    'tick' (tiap tick baru). Di mode bar/tick ``on_tick`` juga menerima
+    ``event=BarEvent``. ``on_positions(account, positions)`` (opsional)
+    dipanggil tiap kali posisi di-fetch, mis. untuk trailing stop.
+    """
     global running
 
-    if not symbol_select(symbol):
-        print(f'Warning: cannot select symbol {symbol} in MarketWatch. Make sure symbol available in terminal.')
+    for symbol in {s for s, _ in targets}:
+        if not symbol_select(symbol):
+            print(f'Warning: cannot select symbol {symbol} in MarketWatch. Make sure symbol available in terminal.')
 
     # Register signal handler untuk graceful shutdown
     signal.signal(signal.SIGINT, signal_handler)
 
-    print(f"{YELLOW}Starting monitoring for {symbol} on {timeframe} timeframe...{RESET}")
+    names = ", ".join(f"{s} ({tf})" for s, tf in targets)
+    print(f"{YELLOW}Starting monitoring for {names} [trigger={trigger}]...{RESET}")
     print(f"{YELLOW}Press Ctrl+C to stop monitoring.{RESET}")
-    time.sleep(2)
+    if not _renderer.headless:
+        time.sleep(2)   # beri waktu membaca pesan sebelum dashboard menimpa layar
+
+    workers = workers or min(32, len(targets))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fetch')
+    dashboard = Dashboard(_renderer)
+    if not _renderer.headless:
+        dashboard.start()
+    conn = None
 
     try:
-        while running:
-            account = get_account_info()
-            candles = get_candles(symbol, timeframe, n=500)
-            positions = get_positions(symbol)
-            history = get_history(symbol)
-            print_monitor(account, positions, history)
-            on_tick(account, candles, positions)
-            time.sleep(POLL_INTERVAL)
+        if ASYNC_FETCH:
+            from async_connector import AsyncConnector, MT5_IO_WORKERS
+            conn = AsyncConnector(max(MT5_IO_WORKERS, workers + 2))
+            asyncio.run(_async_loop(targets, on_tick, conn, dashboard, trigger, on_positions))
+        elif trigger == 'poll':
+            _poll_loop(targets, on_tick, pool, dashboard, on_positions)
+        else:
+            _event_loop(targets, on_tick, pool, dashboard, every_tick=(trigger == 'tick'),
+                        on_positions=on_positions)
     except Exception as e:
         print(f'{RED}Monitor loop error: {e}{RESET}')
     finally:
+        dashboard.stop()
+        pool.shutdown(wait=False, cancel_futures=True)
+        if conn is not None:
+            conn.close()
         print(f"\n{YELLOW}Monitoring stopped.{RESET}")
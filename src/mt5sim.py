@@ -0,0 +1,848 @@
+"""
+Offline stand-in for the MetaTrader5 package.
+
+Implements the part of the API the bot uses (initialize/login,
+copy_rates_from_pos, copy_rates_range, copy_ticks_range, symbol_info,
+symbol_info_tick, account_info, positions_get, history_deals_get,
+order_send) on top of recorded data, so
+the bot, backtests and benchmarks can run on Linux without a terminal.
+
+Data per symbol comes from ``MT5_SIM_DATA`` (a path with ``{symbol}``, e.g.
+``data/{symbol}_M1.csv``), either candles (time/open/high/low/close, CSV or
+an ``.npy`` rates array) or ticks (time_msc/bid/ask). Higher timeframes are
+aggregated from the file's own bar size.
+
+The server clock starts ``MT5_SIM_WARMUP`` bars into the data and runs
+``MT5_SIM_SPEED`` times faster than real time (0 = only moves when
+``simulator().advance()`` is called). Inside a candle the price walks
+open -> low -> high -> close (bearish: open -> high -> low -> close); the
+forming bar, ticks and SL/TP fills all follow that path. If SL and TP are
+hit in the same bar the SL wins, like backtest.py.
+
+Select it with ``MT5_BACKEND=sim`` (see backend.py).
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+# ================================
+# === KONSTANTA (nilai = MT5) ====
+# ================================
+TIMEFRAME_M1, TIMEFRAME_M2, TIMEFRAME_M3, TIMEFRAME_M4, TIMEFRAME_M5 = 1, 2, 3, 4, 5
+TIMEFRAME_M6, TIMEFRAME_M10, TIMEFRAME_M12, TIMEFRAME_M15 = 6, 10, 12, 15
+TIMEFRAME_M20, TIMEFRAME_M30 = 20, 30
+TIMEFRAME_H1, TIMEFRAME_H2, TIMEFRAME_H3, TIMEFRAME_H4 = 16385, 16386, 16387, 16388
+TIMEFRAME_H6, TIMEFRAME_H8, TIMEFRAME_H12, TIMEFRAME_D1 = 16390, 16392, 16396, 16408
+TIMEFRAME_W1, TIMEFRAME_MN1 = 32769, 49153
+
+ORDER_TYPE_BUY, ORDER_TYPE_SELL = 0, 1
+POSITION_TYPE_BUY, POSITION_TYPE_SELL = 0, 1
+ORDER_FILLING_FOK, ORDER_FILLING_IOC, ORDER_FILLING_RETURN = 0, 1, 2
+SYMBOL_FILLING_FOK, SYMBOL_FILLING_IOC = 1, 2
+TRADE_ACTION_DEAL, TRADE_ACTION_SLTP = 1, 6
+COPY_TICKS_ALL, COPY_TICKS_INFO, COPY_TICKS_TRADE = -1, 1, 2
+
+DEAL_TYPE_BUY, DEAL_TYPE_SELL, DEAL_TYPE_BALANCE = 0, 1, 2
+DEAL_ENTRY_IN, DEAL_ENTRY_OUT = 0, 1
+DEAL_REASON_EXPERT, DEAL_REASON_SL, DEAL_REASON_TP = 3, 4, 5
+
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_INVALID_STOPS = 10016
+TRADE_RETCODE_MARKET_CLOSED = 10018
+TRADE_RETCODE_NO_MONEY = 10019
+TRADE_RETCODE_PRICE_CHANGED = 10020
+TRADE_RETCODE_PRICE_OFF = 10021
+TRADE_RETCODE_INVALID_FILL = 10030
+TRADE_RETCODE_POSITION_CLOSED = 10036
+
+RES_S_OK = 1
+RES_E_INVALID_PARAMS = -2
+RES_E_NOT_FOUND = -4
+RES_E_INTERNAL_FAIL_INIT = -10004
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8'),
+])
+
+TICK_DTYPE = np.dtype([
+    ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+    ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8'),
+])
+
+Tick = namedtuple('Tick', 'time bid ask last volume time_msc flags volume_real')
+AccountInfo = namedtuple('AccountInfo', 'login leverage balance credit profit equity margin '
+                                        'margin_free margin_level currency server name')
+SymbolInfo = namedtuple('SymbolInfo', 'name visible select digits point spread trade_contract_size '
+                                      'trade_tick_value trade_tick_size volume_min volume_max '
+                                      'volume_step filling_mode currency_base currency_profit '
+                                      'currency_margin')
+TradePosition = namedtuple('TradePosition', 'ticket time time_msc time_update type magic identifier '
+                                            'reason volume price_open sl tp price_current swap '
+                                            'profit symbol comment')
+TradeDeal = namedtuple('TradeDeal', 'ticket order time time_msc type entry magic position_id reason '
+                                    'volume price commission swap profit fee symbol comment')
+OrderSendResult = namedtuple('OrderSendResult', 'retcode deal order volume price bid ask comment '
+                                                'request_id retcode_external request')
+
+MT5_SIM_DATA = os.getenv('MT5_SIM_DATA', 'data/{symbol}_M1.csv')
+MT5_SIM_SPEED = float(os.getenv('MT5_SIM_SPEED', '60'))
+MT5_SIM_WARMUP = int(os.getenv('MT5_SIM_WARMUP', '500'))
+MT5_SIM_BALANCE = float(os.getenv('MT5_SIM_BALANCE', '1000'))
+MT5_SIM_LEVERAGE = int(os.getenv('MT5_SIM_LEVERAGE', '100'))
+MT5_SIM_SPREAD = int(os.getenv('MT5_SIM_SPREAD', '20'))          # points, kalau data tanpa spread
+MT5_SIM_LATENCY_MS = float(os.getenv('MT5_SIM_LATENCY_MS', '0'))  # delay order_send
+MT5_SIM_READ_LATENCY_MS = float(os.getenv('MT5_SIM_READ_LATENCY_MS', '0'))  # delay per call baca (IPC terminal)
+MT5_SIM_REQUOTE = float(os.getenv('MT5_SIM_REQUOTE', '0'))        # peluang requote per order
+MT5_SIM_SPECS = os.getenv('MT5_SIM_SPECS', '')                    # JSON {symbol: {field: value}}
+
+
+def timeframe_seconds(timeframe):
+    if timeframe & 0xC000 == 0xC000:
+        return 30 * 86400
+    if timeframe & 0x8000:
+        return 7 * 86400
+    if timeframe & 0x4000:
+        return (timeframe & 0x3FFF) * 3600
+    return timeframe * 60
+
+
+def _epoch(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+# ================================
+# === DATA =======================
+# ================================
+def _read_columns(path):
+    """
+    Structured array (.npy), CSV, or a recorder.py chunk directory -> dict of
+    column arrays, lower-case names.
+    """
+    if os.path.isdir(path):
+        from recorder import read_chunks
+        data = read_chunks(path)
+        if data is None:
+            raise ValueError(f'No recorded chunks in {path}')
+        return {name: data[name] for name in data.dtype.names}
+    if path.endswith('.npy'):
+        data = np.load(path)
+        return {name.lower(): np.asarray(data[name]) for name in data.dtype.names}
+    import pandas as pd
+    df = pd.read_csv(path)
+    df.columns = [c.strip('<>').lower() for c in df.columns]
+    cols = {c: df[c].to_numpy() for c in df.columns}
+    for key in ('time', 'time_msc'):
+        if key in cols and not np.issubdtype(cols[key].dtype, np.number):
+            ns = pd.to_datetime(df[key]).astype('int64').to_numpy()
+            cols[key] = ns // (10**9 if key == 'time' else 10**6)
+    return cols
+
+
+def _aggregate(rates, seconds):
+    """Group rates into ``seconds`` buckets (bucket time = floor(time / seconds))."""
+    if len(rates) == 0:
+        return rates.copy()
+    bucket = rates['time'] // seconds * seconds
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(rates)] - 1
+    out = np.zeros(len(starts), RATES_DTYPE)
+    out['time'] = bucket[starts]
+    out['open'] = rates['open'][starts]
+    out['close'] = rates['close'][ends]
+    out['high'] = np.maximum.reduceat(rates['high'], starts)
+    out['low'] = np.minimum.reduceat(rates['low'], starts)
+    out['tick_volume'] = np.add.reduceat(rates['tick_volume'], starts)
+    out['real_volume'] = np.add.reduceat(rates['real_volume'], starts)
+    out['spread'] = rates['spread'][ends]
+    return out
+
+
+def _guess_spec(symbol, price):
+    """Default contract spec from the price level; override with MT5_SIM_SPECS."""
+    if price >= 1000:
+        point, contract = 0.01, 100           # emas / indeks
+    elif price >= 20:
+        point, contract = 0.001, 100000       # pair JPY
+    else:
+        point, contract = 0.00001, 100000
+    return {
+        'name': symbol, 'visible': True, 'select': True,
+        'digits': int(round(-np.log10(point))), 'point': point, 'spread': MT5_SIM_SPREAD,
+        'trade_contract_size': contract, 'trade_tick_value': contract * point,
+        'trade_tick_size': point, 'volume_min': 0.01, 'volume_max': 100.0, 'volume_step': 0.01,
+        'filling_mode': SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC,
+        'currency_base': symbol[:3], 'currency_profit': 'USD', 'currency_margin': 'USD',
+    }
+
+
+class Feed:
+    """Recorded candles or ticks for one symbol."""
+
+    def __init__(self, symbol, columns, spec=None):
+        self.symbol = symbol
+        self.ticks = None
+        if 'bid' in columns:
+            if 'time_msc' in columns:
+                msc = np.asarray(columns['time_msc'], dtype=np.int64)
+            else:
+                msc = np.asarray(columns['time'], dtype=np.int64) * 1000
+            bid = np.asarray(columns['bid'], dtype=float)
+            ask = np.asarray(columns['ask'], dtype=float) if 'ask' in columns else None
+            order = np.argsort(msc, kind='stable')
+            self.ticks = {'time_msc': msc[order], 'bid': bid[order]}
+            self.spec = dict(_guess_spec(symbol, float(bid[0])), **(spec or {}))
+            if ask is None:
+                ask = bid + self.spec['spread'] * self.spec['point']
+            self.ticks['ask'] = ask[order]
+            self.rates = self._rates_from_ticks()
+            self.bar_seconds = 60
+        else:
+            rates = np.zeros(len(columns['time']), RATES_DTYPE)
+            for name in RATES_DTYPE.names:
+                if name in columns:
+                    rates[name] = columns[name]
+            rates.sort(order='time', kind='stable')
+            self.rates = rates
+            self.spec = dict(_guess_spec(symbol, float(rates['close'][0])), **(spec or {}))
+            if not np.any(rates['spread']):
+                rates['spread'] = self.spec['spread']
+            diffs = np.diff(rates['time'][:1000])
+            self.bar_seconds = int(diffs[diffs > 0].min()) if np.any(diffs > 0) else 60
+        self.point = self.spec['point']
+        # Kontigu & float: searchsorted dengan key float tidak perlu copy array
+        self.times = self.rates['time'].astype(float)
+        self._tf_cache = {}
+
+    def _rates_from_ticks(self):
+        msc, bid = self.ticks['time_msc'], self.ticks['bid']
+        minute = msc // 60000 * 60
+        starts = np.flatnonzero(np.r_[True, minute[1:] != minute[:-1]])
+        ends = np.r_[starts[1:], len(msc)] - 1
+        rates = np.zeros(len(starts), RATES_DTYPE)
+        rates['time'] = minute[starts]
+        rates['open'] = bid[starts]
+        rates['close'] = bid[ends]
+        rates['high'] = np.maximum.reduceat(bid, starts)
+        rates['low'] = np.minimum.reduceat(bid, starts)
+        rates['tick_volume'] = ends - starts + 1
+        spread = (self.ticks['ask'][ends] - bid[ends]) / self.spec['point']
+        rates['spread'] = np.round(spread)
+        return rates
+
+    @property
+    def start(self):
+        return float(self.times[0])
+
+    @property
+    def end(self):
+        if self.ticks is not None:
+            return self.ticks['time_msc'][-1] / 1000.0
+        return float(self.times[-1] + self.bar_seconds)
+
+    # --- harga di dalam bar ---
+    def bar_index(self, t):
+        return int(np.searchsorted(self.times, t, 'right')) - 1
+
+    def _frac(self, i, t):
+        return min(max((t - self.times[i]) / self.bar_seconds, 0.0), 1.0)
+
+    def _path(self, i):
+        r = self.rates[i]
+        if r['close'] >= r['open']:
+            return (r['open'], r['low'], r['high'], r['close'])
+        return (r['open'], r['high'], r['low'], r['close'])
+
+    @staticmethod
+    def _at(path, f):
+        s = min(f * 3.0, 2.999999999)
+        k = int(s)
+        return path[k] + (path[k + 1] - path[k]) * (s - k)
+
+    def _extremes(self, i, f0, f1):
+        path = self._path(i)
+        pts = [self._at(path, f0), self._at(path, f1)]
+        pts += [path[k] for k in (1, 2) if f0 < k / 3.0 < f1]
+        return min(pts), max(pts)
+
+    def quote(self, t):
+        """(bid, ask, time_msc) at server time ``t``."""
+        if self.ticks is not None:
+            j = max(int(np.searchsorted(self.ticks['time_msc'], int(t * 1000), 'right')) - 1, 0)
+            return (float(self.ticks['bid'][j]), float(self.ticks['ask'][j]),
+                    int(self.ticks['time_msc'][j]))
+        i = max(self.bar_index(t), 0)
+        bid = round(float(self._at(self._path(i), self._frac(i, t))), self.spec['digits'])
+        ask = round(bid + int(self.rates['spread'][i]) * self.point, self.spec['digits'])
+        return bid, ask, int(t * 1000)
+
+    def forming(self, t):
+        """Index of the current bar and its OHLC as seen at ``t``."""
+        if self.ticks is not None:
+            # Bar berjalan = bar dari tick terakhir yang sudah terjadi
+            msc = self.ticks['time_msc']
+            j1 = int(np.searchsorted(msc, int(t * 1000), 'right'))
+            if j1 == 0:
+                return -1, None
+            i = self.bar_index(msc[j1 - 1] / 1000.0)
+            bar = self.rates[i].copy()
+            j0 = int(np.searchsorted(msc, int(self.times[i]) * 1000))
+            bids = self.ticks['bid'][j0:j1]
+            bar['high'], bar['low'], bar['close'] = bids.max(), bids.min(), bids[-1]
+            bar['tick_volume'] = len(bids)
+        else:
+            i = self.bar_index(t)
+            if i < 0:
+                return i, None
+            bar = self.rates[i].copy()
+            f = self._frac(i, t)
+            lo, hi = self._extremes(i, 0.0, f)
+            bar['high'], bar['low'] = hi, lo
+            bar['close'] = round(float(self._at(self._path(i), f)), self.spec['digits'])
+            bar['tick_volume'] = max(int(bar['tick_volume'] * f), 1)
+        return i, bar
+
+    def _timeframe(self, seconds):
+        """(rates, float times) for a timeframe, aggregated once and cached."""
+        if seconds == self.bar_seconds:
+            return self.rates, self.times
+        cached = self._tf_cache.get(seconds)
+        if cached is None:
+            agg = _aggregate(self.rates, seconds)
+            cached = self._tf_cache[seconds] = (agg, agg['time'].astype(float))
+        return cached
+
+    def rates_at(self, timeframe, t, start_pos, count):
+        """copy_rates_from_pos at server time ``t`` (index 0 = forming bar)."""
+        seconds = timeframe_seconds(timeframe)
+        if seconds < self.bar_seconds or seconds % self.bar_seconds:
+            return None
+        i, bar = self.forming(t)
+        if bar is None:
+            return np.zeros(0, RATES_DTYPE)
+        need = start_pos + count
+        if seconds == self.bar_seconds:
+            done = self.rates[max(0, i - need + 1):i]
+        else:
+            agg, agg_times = self._timeframe(seconds)
+            k = int(np.searchsorted(agg_times, self.times[i], 'right')) - 1
+            first = int(np.searchsorted(self.times, agg_times[k]))
+            part = np.concatenate([self.rates[first:i], bar[None]])
+            bar = _aggregate(part, seconds)[0]
+            done = agg[max(0, k - need + 1):k]
+        out = np.concatenate([done, bar[None]])
+        end = len(out) - start_pos
+        return out[max(0, end - count):max(end, 0)]
+
+    def rates_range(self, timeframe, t0, t1, now):
+        """copy_rates_range: bars opened in [t0, t1], nothing after ``now``."""
+        seconds = timeframe_seconds(timeframe)
+        if seconds < self.bar_seconds or seconds % self.bar_seconds:
+            return None
+        rates, times = self._timeframe(seconds)
+        lo = int(np.searchsorted(times, t0))
+        hi = int(np.searchsorted(times, min(t1, now), 'right'))
+        out = rates[lo:hi].copy()
+        if len(out) and times[hi - 1] + seconds > now:
+            out[-1] = self.rates_at(timeframe, now, 0, 1)[0]
+        return out
+
+    def ticks_range(self, t0, t1):
+        """
+        Ticks in [t0, t1]. Candle data gets four synthetic ticks per bar at
+        the open -> low/high -> high/low -> close path points.
+        """
+        if self.ticks is not None:
+            msc = self.ticks['time_msc']
+            j0 = int(np.searchsorted(msc, int(t0 * 1000)))
+            j1 = int(np.searchsorted(msc, int(t1 * 1000), 'right'))
+            out = np.zeros(j1 - j0, TICK_DTYPE)
+            out['time_msc'] = msc[j0:j1]
+            out['bid'] = self.ticks['bid'][j0:j1]
+            out['ask'] = self.ticks['ask'][j0:j1]
+        else:
+            i0 = max(int(np.searchsorted(self.times, t0, 'right')) - 1, 0)
+            i1 = int(np.searchsorted(self.times, t1, 'right'))
+            r = self.rates[i0:i1]
+            bull = (r['close'] >= r['open'])[:, None]
+            prices = np.stack([r['open'], r['low'], r['high'], r['close']], axis=1)
+            prices = np.where(bull, prices, prices[:, [0, 2, 1, 3]])
+            offsets = np.array([0.0, 1 / 3.0, 2 / 3.0, 1.0]) * self.bar_seconds
+            offsets[-1] -= 0.001
+            msc = ((self.times[i0:i1, None] + offsets) * 1000).astype(np.int64)
+            spread = (r['spread'] * self.point)[:, None]
+            keep = (msc >= int(t0 * 1000)) & (msc <= int(t1 * 1000))
+            out = np.zeros(int(keep.sum()), TICK_DTYPE)
+            out['time_msc'] = msc[keep]
+            out['bid'] = prices[keep]
+            out['ask'] = np.round((prices + spread)[keep], self.spec['digits'])
+        out['time'] = out['time_msc'] // 1000
+        out['flags'] = 6
+        return out
+
+    def first_hit(self, t0, t1, side, sl, tp):
+        """
+        First SL/TP touch in (t0, t1] for a position on ``side`` (+1 buy,
+        -1 sell). Returns (time, price, reason) or None.
+        """
+        if self.ticks is not None:
+            msc = self.ticks['time_msc']
+            j0 = int(np.searchsorted(msc, int(t0 * 1000), 'right'))
+            j1 = int(np.searchsorted(msc, int(t1 * 1000), 'right'))
+            if j1 <= j0:
+                return None
+            px = self.ticks['bid' if side > 0 else 'ask'][j0:j1]
+            lo = hi = px
+            times = msc[j0:j1] / 1000.0
+        else:
+            i0, i1 = max(self.bar_index(t0), 0), self.bar_index(t1)
+            if i1 < i0:
+                return None
+            lo = self.rates['low'][i0:i1 + 1].astype(float)
+            hi = self.rates['high'][i0:i1 + 1].astype(float)
+            lo[0], hi[0] = self._extremes(i0, self._frac(i0, t0), self._frac(i0, t1) if i1 == i0 else 1.0)
+            if i1 > i0:
+                lo[-1], hi[-1] = self._extremes(i1, 0.0, self._frac(i1, t1))
+            if side < 0:
+                spread = self.rates['spread'][i0:i1 + 1] * self.point
+                lo, hi = lo + spread, hi + spread
+            times = np.maximum(self.times[i0:i1 + 1], t0)
+        if side > 0:
+            sl_hit = lo <= sl if sl else np.zeros(len(lo), bool)
+            tp_hit = hi >= tp if tp else np.zeros(len(lo), bool)
+        else:
+            sl_hit = hi >= sl if sl else np.zeros(len(lo), bool)
+            tp_hit = lo <= tp if tp else np.zeros(len(lo), bool)
+        hit = sl_hit | tp_hit
+        if not hit.any():
+            return None
+        k = int(np.argmax(hit))
+        if sl_hit[k]:
+            return float(times[k]), sl, DEAL_REASON_SL
+        return float(times[k]), tp, DEAL_REASON_TP
+
+
+# ================================
+# === SIMULATOR ==================
+# ================================
+class Simulator:
+
+    def __init__(self, data=MT5_SIM_DATA, speed=MT5_SIM_SPEED, warmup=MT5_SIM_WARMUP,
+                 balance=MT5_SIM_BALANCE, leverage=MT5_SIM_LEVERAGE, latency_ms=MT5_SIM_LATENCY_MS,
+                 read_latency_ms=MT5_SIM_READ_LATENCY_MS, requote=MT5_SIM_REQUOTE, specs=None, start=None, login=1, seed=None):
+        """
+        ``data`` is a path pattern with ``{symbol}`` or a dict
+        ``{symbol: path | column dict | rates array}``.
+        """
+        self.data = data
+        self.speed = speed
+        self.warmup = warmup
+        self.balance = balance
+        self.leverage = leverage
+        self.latency_ms = latency_ms
+        self.read_latency_ms = read_latency_ms
+        self.requote = requote
+        self.specs = specs or {}
+        self.login = login
+        self.rng = random.Random(seed)
+        self.lock = threading.RLock()
+        self.feeds = {}
+        self.positions = {}   # ticket -> dict
+        self.deals = []
+        self._ticket = 1000000
+        self._t0 = start
+        self._wall0 = None
+        self._offset = 0.0
+        self._end = None
+        self._checked = None
+
+    # --- clock ---
+    def now(self):
+        if self._t0 is None:
+            return 0.0
+        t = self._t0 + self._offset
+        if self.speed > 0:
+            t += (time.monotonic() - self._wall0) * self.speed
+        return min(t, self._end) if self._end is not None else t
+
+    def advance(self, seconds):
+        """Move the server clock forward (use with speed=0 for step-by-step replay)."""
+        with self.lock:
+            self._offset += seconds
+            self._process(self.now())
+
+    @property
+    def finished(self):
+        return self._end is not None and self.now() >= self._end
+
+    # --- data ---
+    def feed(self, symbol):
+        feed = self.feeds.get(symbol)
+        if feed is not None:
+            return feed
+        source = self.data.get(symbol) if isinstance(self.data, dict) else self.data.format(symbol=symbol)
+        if source is None:
+            return None
+        if isinstance(source, str):
+            if not os.path.exists(source):
+                return None
+            source = _read_columns(source)
+        elif isinstance(source, np.ndarray):
+            source = {name: source[name] for name in source.dtype.names}
+        feed = Feed(symbol, source, self.specs.get(symbol))
+        self.feeds[symbol] = feed
+        if self._t0 is None:
+            self._t0 = float(feed.times[min(self.warmup, len(feed.times) - 1)])
+        if self._wall0 is None:
+            self._wall0 = time.monotonic()
+            self._checked = self._t0
+        self._end = max(self._end or feed.end, feed.end)
+        return feed
+
+    def _next_ticket(self):
+        self._ticket += 1
+        return self._ticket
+
+    # --- posisi & deal ---
+    def _profit(self, feed, pos, price):
+        spec = feed.spec
+        return round((price - pos['price_open']) * pos['side'] * pos['volume']
+                     * spec['trade_tick_value'] / spec['trade_tick_size'], 2)
+
+    def _close_price(self, feed, pos, t):
+        bid, ask, _ = feed.quote(t)
+        return bid if pos['side'] > 0 else ask
+
+    def _deal(self, pos, order, t, entry, volume, price, profit, reason):
+        ticket = self._next_ticket()
+        typ = pos['type'] if entry == DEAL_ENTRY_IN else 1 - pos['type']
+        self.deals.append(TradeDeal(
+            ticket, order, int(t), int(t * 1000), typ, entry, pos['magic'], pos['ticket'], reason,
+            volume, price, 0.0, 0.0, profit, 0.0, pos['symbol'], pos['comment']))
+        return ticket
+
+    def _close(self, pos, volume, price, t, reason, order=0):
+        feed = self.feeds[pos['symbol']]
+        part = dict(pos, volume=volume)
+        profit = self._profit(feed, part, price)
+        deal = self._deal(pos, order, t, DEAL_ENTRY_OUT, volume, price, profit, reason)
+        self.balance = round(self.balance + profit, 2)
+        pos['volume'] = round(pos['volume'] - volume, 2)
+        if pos['volume'] <= 0:
+            del self.positions[pos['ticket']]
+        return deal
+
+    def _process(self, now):
+        """Fill SL/TP for every position between the last check and ``now``."""
+        if self._checked is None or now <= self._checked:
+            return
+        t0 = self._checked
+        for pos in list(self.positions.values()):
+            if not (pos['sl'] or pos['tp']):
+                continue
+            feed = self.feeds[pos['symbol']]
+            hit = feed.first_hit(max(t0, pos['time']), now, pos['side'], pos['sl'], pos['tp'])
+            if hit is not None:
+                t, price, reason = hit
+                self._close(pos, pos['volume'], price, t, reason)
+        self._checked = now
+
+    def _sync(self):
+        now = self.now()
+        self._process(now)
+        return now
+
+    def _margin(self, feed, volume, price):
+        return volume * feed.spec['trade_contract_size'] * price / self.leverage
+
+    def account(self):
+        with self.lock:
+            now = self._sync()
+            profit = margin = 0.0
+            for pos in self.positions.values():
+                feed = self.feeds[pos['symbol']]
+                profit += self._profit(feed, pos, self._close_price(feed, pos, now))
+                margin += self._margin(feed, pos['volume'], pos['price_open'])
+            equity = round(self.balance + profit, 2)
+            margin = round(margin, 2)
+            level = equity / margin * 100 if margin else 0.0
+            return AccountInfo(self.login, self.leverage, self.balance, 0.0, round(profit, 2), equity,
+                               margin, round(equity - margin, 2), level, 'USD', 'Simulator',
+                               'mt5sim')
+
+    def position_list(self, symbol=None, ticket=None):
+        with self.lock:
+            now = self._sync()
+            out = []
+            for pos in self.positions.values():
+                if symbol is not None and pos['symbol'] != symbol:
+                    continue
+                if ticket is not None and pos['ticket'] != ticket:
+                    continue
+                feed = self.feeds[pos['symbol']]
+                price = self._close_price(feed, pos, now)
+                out.append(TradePosition(
+                    pos['ticket'], int(pos['time']), int(pos['time'] * 1000), int(pos['updated']),
+                    pos['type'], pos['magic'], pos['ticket'], DEAL_REASON_EXPERT, pos['volume'],
+                    pos['price_open'], pos['sl'], pos['tp'], price, 0.0,
+                    self._profit(feed, pos, price), pos['symbol'], pos['comment']))
+            return tuple(out)
+
+    def deal_list(self, date_from=None, date_to=None, position=None):
+        with self.lock:
+            self._sync()
+            if position is not None:
+                return tuple(d for d in self.deals if d.position_id == position)
+            t0, t1 = _epoch(date_from), _epoch(date_to)
+            return tuple(d for d in self.deals if t0 <= d.time <= t1)
+
+    # --- order ---
+    def _stops_ok(self, side, bid, ask, sl, tp):
+        price = bid if side > 0 else ask
+        if sl and (sl - price) * side >= 0:
+            return False
+        if tp and (tp - price) * side <= 0:
+            return False
+        return True
+
+    def _result(self, request, retcode, comment, bid=0.0, ask=0.0, deal=0, order=0, volume=0.0,
+                price=0.0):
+        return OrderSendResult(retcode, deal, order, volume, price, bid, ask, comment, 0, 0, request)
+
+    def send(self, request):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        with self.lock:
+            now = self._sync()
+            symbol = request.get('symbol')
+            feed = self.feed(symbol) if symbol else None
+            if feed is None:
+                return self._result(request, TRADE_RETCODE_INVALID, 'Unknown symbol')
+            bid, ask, _ = feed.quote(now)
+            if now >= self._end:
+                return self._result(request, TRADE_RETCODE_MARKET_CLOSED, 'Market closed', bid, ask)
+            spec = feed.spec
+            action = request.get('action')
+
+            if action == TRADE_ACTION_SLTP:
+                pos = self.positions.get(request.get('position'))
+                if pos is None:
+                    return self._result(request, TRADE_RETCODE_POSITION_CLOSED, 'Position closed',
+                                        bid, ask)
+                sl, tp = request.get('sl') or 0.0, request.get('tp') or 0.0
+                if not self._stops_ok(pos['side'], bid, ask, sl, tp):
+                    return self._result(request, TRADE_RETCODE_INVALID_STOPS, 'Invalid stops', bid, ask)
+                pos['sl'], pos['tp'], pos['updated'] = sl, tp, now
+                return self._result(request, TRADE_RETCODE_DONE, 'Request executed', bid, ask)
+
+            if action != TRADE_ACTION_DEAL:
+                return self._result(request, TRADE_RETCODE_INVALID, 'Unsupported action', bid, ask)
+
+            filling = request.get('type_filling', ORDER_FILLING_FOK)
+            flags = spec['filling_mode']
+            allowed = {m for m, bit in ((ORDER_FILLING_FOK, SYMBOL_FILLING_FOK),
+                                        (ORDER_FILLING_IOC, SYMBOL_FILLING_IOC)) if flags & bit}
+            if filling not in (allowed or {ORDER_FILLING_RETURN}):
+                return self._result(request, TRADE_RETCODE_INVALID_FILL, 'Unsupported filling mode',
+                                    bid, ask)
+
+            volume = round(float(request.get('volume', 0.0)), 8)
+            step = spec['volume_step']
+            if (volume < spec['volume_min'] or volume > spec['volume_max']
+                    or abs(round(volume / step) * step - volume) > 1e-9):
+                return self._result(request, TRADE_RETCODE_INVALID_VOLUME, 'Invalid volume', bid, ask)
+
+            typ = request.get('type')
+            side = 1 if typ == ORDER_TYPE_BUY else -1
+            price = ask if side > 0 else bid
+            wanted = request.get('price') or price
+            deviation = request.get('deviation', 0) * feed.point
+            if abs(wanted - price) > deviation + 1e-12 or (self.requote and self.rng.random() < self.requote):
+                return self._result(request, TRADE_RETCODE_REQUOTE, 'Requote', bid, ask)
+
+            order = self._next_ticket()
+            ticket = request.get('position')
+            if ticket:
+                pos = self.positions.get(ticket)
+                if pos is None or pos['side'] == side:
+                    return self._result(request, TRADE_RETCODE_POSITION_CLOSED, 'Position closed',
+                                        bid, ask)
+                volume = min(volume, pos['volume'])
+                deal = self._close(pos, volume, price, now, DEAL_REASON_EXPERT, order)
+                return self._result(request, TRADE_RETCODE_DONE, 'Request executed', bid, ask, deal,
+                                    order, volume, price)
+
+            sl, tp = request.get('sl') or 0.0, request.get('tp') or 0.0
+            if not self._stops_ok(side, bid, ask, sl, tp):
+                return self._result(request, TRADE_RETCODE_INVALID_STOPS, 'Invalid stops', bid, ask)
+            margin_free = self.account().margin_free
+            if self._margin(feed, volume, price) > margin_free:
+                return self._result(request, TRADE_RETCODE_NO_MONEY, 'No money', bid, ask)
+            pos = {
+                'ticket': order, 'symbol': symbol, 'type': typ, 'side': side, 'volume': volume,
+                'price_open': price, 'sl': sl, 'tp': tp, 'time': now, 'updated': now,
+                'magic': request.get('magic', 0), 'comment': request.get('comment', ''),
+            }
+            self.positions[order] = pos
+            deal = self._deal(pos, order, now, DEAL_ENTRY_IN, volume, price, 0.0, DEAL_REASON_EXPERT)
+            return self._result(request, TRADE_RETCODE_DONE, 'Request executed', bid, ask, deal,
+                                order, volume, price)
+
+
+# ================================
+# === API MetaTrader5 ============
+# ================================
+_sim = None
+
+
+def configure(**kwargs):
+    """Replace the simulator (benchmarks / scripts); kwargs go to Simulator."""
+    global _sim
+    _sim = Simulator(**kwargs)
+    return _sim
+
+
+def simulator():
+    return _sim
+
+
+def _specs_from_env():
+    if not MT5_SIM_SPECS:
+        return None
+    with open(MT5_SIM_SPECS) as f:
+        return json.load(f)
+
+
+def initialize(path=None, login=None, password=None, server=None, timeout=None, portable=False):
+    global _sim
+    if _sim is None:
+        try:
+            _sim = Simulator(specs=_specs_from_env())
+        except (OSError, ValueError) as e:
+            _sim = None
+            _set_error(RES_E_INTERNAL_FAIL_INIT, str(e))
+            return False
+    if login:
+        _sim.login = int(login)
+    return True
+
+
+def login(login, password=None, server=None, timeout=None):
+    if _sim is None:
+        return False
+    _sim.login = int(login)
+    return True
+
+
+def shutdown():
+    return True
+
+
+_last_error = (RES_S_OK, 'Success')
+
+
+def _set_error(code, message):
+    global _last_error
+    _last_error = (code, message)
+
+
+def last_error():
+    return _last_error
+
+
+def symbol_select(symbol, enable=True):
+    return _sim is not None and _sim.feed(symbol) is not None
+
+
+def symbol_info(symbol):
+    feed = _sim.feed(symbol) if _sim else None
+    if feed is None:
+        _set_error(RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+        return None
+    return SymbolInfo(**{k: feed.spec[k] for k in SymbolInfo._fields})
+
+
+def _round_trip():
+    """Simulated terminal round-trip of a read call (outside the lock, so calls overlap)."""
+    if _sim is not None and _sim.read_latency_ms:
+        time.sleep(_sim.read_latency_ms / 1000.0)
+
+
+def symbol_info_tick(symbol):
+    _round_trip()
+    feed = _sim.feed(symbol) if _sim else None
+    if feed is None:
+        _set_error(RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+        return None
+    bid, ask, msc = feed.quote(_sim.now())
+    return Tick(msc // 1000, bid, ask, 0.0, 0, msc, 6, 0.0)
+
+
+def copy_rates_from_pos(symbol, timeframe, start_pos, count):
+    _round_trip()
+    feed = _sim.feed(symbol) if _sim else None
+    if feed is None:
+        _set_error(RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+        return None
+    rates = feed.rates_at(timeframe, _sim.now(), start_pos, count)
+    if rates is None:
+        _set_error(RES_E_INVALID_PARAMS, f'Timeframe {timeframe} below data resolution')
+    return rates
+
+
+def copy_rates_range(symbol, timeframe, date_from, date_to):
+    _round_trip()
+    feed = _sim.feed(symbol) if _sim else None
+    if feed is None:
+        _set_error(RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+        return None
+    rates = feed.rates_range(timeframe, _epoch(date_from), _epoch(date_to), _sim.now())
+    if rates is None:
+        _set_error(RES_E_INVALID_PARAMS, f'Timeframe {timeframe} below data resolution')
+    return rates
+
+
+def copy_ticks_range(symbol, date_from, date_to, flags=COPY_TICKS_ALL):
+    _round_trip()
+    feed = _sim.feed(symbol) if _sim else None
+    if feed is None:
+        _set_error(RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+        return None
+    return feed.ticks_range(_epoch(date_from), min(_epoch(date_to), _sim.now()))
+
+
+def account_info():
+    _round_trip()
+    return _sim.account() if _sim else None
+
+
+def positions_get(symbol=None, group=None, ticket=None):
+    _round_trip()
+    return _sim.position_list(symbol, ticket) if _sim else None
+
+
+def positions_total():
+    return len(_sim.positions) if _sim else 0
+
+
+def history_deals_get(date_from=None, date_to=None, group=None, position=None):
+    _round_trip()
+    return _sim.deal_list(date_from, date_to, position) if _sim else None
+
+
+def order_send(request):
+    if _sim is None:
+        _set_error(RES_E_INTERNAL_FAIL_INIT, 'Not initialized')
+        return None
+    return _sim.send(request)
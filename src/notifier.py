@@ -9,7 +9,8 @@ EMOJI_PROFIT = "💚"
 EMOJI_LOSS = "❤️"
 
 def notify_console(message):
-    print('[NOTIFY]', message)
+    # Satu kali write supaya tidak terpotong frame dari thread dashboard
+    print(f'[NOTIFY] {message}\n', end='', flush=True)
 
 def notify_signal(action, symbol, price, sl, tp, lot):
     """Notifikasi khusus untuk signal dengan emoji"""
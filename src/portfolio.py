@@ -0,0 +1,201 @@
+"""
+Portfolio exposure & risk ledger.
+
+Keeps, per symbol and per currency, the running totals of every open
+position: net volume, notional exposure, margin and money at risk to the
+stop loss (all in account currency). Totals are adjusted by the delta of
+each open / modify / close instead of being recomputed from
+positions_get, so a pre-trade check only touches the two currencies and
+the totals affected by the new order.
+
+Exposure of a position is ``volume * price * pip_value`` (pip_value =
+account value of a 1.0 price move for 1 lot, see risk_manager), booked
+long on the base currency and short on the profit currency. Margin is
+notional / account leverage, an approximation of the broker's margin
+formula that is good enough for a limit.
+"""
+import os
+import threading
+from dotenv import load_dotenv
+
+from risk_manager import pip_value_of
+
+load_dotenv()
+
+# 0 = limit nonaktif
+MAX_CURRENCY_EXPOSURE = float(os.getenv('MAX_CURRENCY_EXPOSURE') or 0)   # x equity per mata uang
+MAX_TOTAL_RISK_PERCENT = float(os.getenv('MAX_TOTAL_RISK_PERCENT') or 0)  # % equity risk ke SL
+MAX_MARGIN_PERCENT = float(os.getenv('MAX_MARGIN_PERCENT') or 0)         # % equity untuk margin
+
+
+class SymbolSpec:
+    """Static per-symbol numbers the ledger needs (read once per session)."""
+    __slots__ = ('pip_value', 'base', 'quote')
+
+    def __init__(self, pip_value, base, quote):
+        self.pip_value = pip_value
+        self.base = base
+        self.quote = quote
+
+    @classmethod
+    def from_info(cls, info, symbol=''):
+        base = getattr(info, 'currency_base', None) or symbol[:3]
+        quote = getattr(info, 'currency_profit', None) or symbol[3:6]
+        return cls(pip_value_of(info), base, quote)
+
+
+class Entry:
+    """Contribution of one position to the totals."""
+    __slots__ = ('symbol', 'sign', 'volume', 'price', 'sl', 'exposure', 'margin', 'risk')
+
+
+class SymbolRisk:
+    __slots__ = ('net_volume', 'exposure', 'margin', 'risk', 'count')
+
+    def __init__(self):
+        self.net_volume = 0.0
+        self.exposure = 0.0     # signed notional
+        self.margin = 0.0
+        self.risk = 0.0
+        self.count = 0
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class RiskLedger:
+    """
+    Running exposure / margin / risk totals keyed by position ticket.
+
+    Feed it with ``open`` (new or changed position) and ``close``, e.g.
+    from the positions.PositionBook events, and ask ``check`` before
+    sending an order.
+    """
+
+    def __init__(self, account_currency='USD', leverage=100, spec_of=None,
+                 max_currency_exposure=MAX_CURRENCY_EXPOSURE,
+                 max_total_risk_percent=MAX_TOTAL_RISK_PERCENT,
+                 max_margin_percent=MAX_MARGIN_PERCENT):
+        self.account_currency = account_currency
+        self.leverage = leverage or 100
+        self.spec_of = spec_of or _spec_from_terminal
+        self.max_currency_exposure = max_currency_exposure
+        self.max_total_risk_percent = max_total_risk_percent
+        self.max_margin_percent = max_margin_percent
+        self.entries = {}       # ticket -> Entry
+        self.symbols = {}       # symbol -> SymbolRisk
+        self.currencies = {}    # currency -> signed exposure
+        self.total_risk = 0.0
+        self.total_margin = 0.0
+        self._specs = {}
+        self.lock = threading.Lock()
+
+    def spec(self, symbol):
+        spec = self._specs.get(symbol)
+        if spec is None:
+            spec = self._specs[symbol] = self.spec_of(symbol)
+        return spec
+
+    # --- kontribusi satu posisi ---
+    def _values(self, symbol, sign, volume, price, sl):
+        spec = self.spec(symbol)
+        exposure = volume * price * spec.pip_value
+        if sl:
+            # SL yang sudah melewati entry (trailing) = tidak ada risk
+            risk = max(0.0, (price - sl) * sign) * volume * spec.pip_value
+        else:
+            risk = exposure     # tanpa SL: anggap seluruh notional
+        return spec, sign * exposure, exposure / self.leverage, risk
+
+    def _book(self, entry, k):
+        """Add (k=1) or remove (k=-1) an entry from the totals."""
+        spec = self.spec(entry.symbol)
+        s = self.symbols.get(entry.symbol)
+        if s is None:
+            s = self.symbols[entry.symbol] = SymbolRisk()
+        s.net_volume += k * entry.sign * entry.volume
+        s.exposure += k * entry.exposure
+        s.margin += k * entry.margin
+        s.risk += k * entry.risk
+        s.count += k
+        if s.count == 0:
+            s.net_volume = s.exposure = s.margin = s.risk = 0.0    # buang sisa pembulatan
+        ccy = self.currencies
+        ccy[spec.base] = ccy.get(spec.base, 0.0) + k * entry.exposure
+        ccy[spec.quote] = ccy.get(spec.quote, 0.0) - k * entry.exposure
+        self.total_margin += k * entry.margin
+        self.total_risk += k * entry.risk
+
+    def _set(self, ticket, symbol, sign, volume, price, sl):
+        _, exposure, margin, risk = self._values(symbol, sign, volume, price, sl)
+        entry = Entry()
+        entry.symbol, entry.sign, entry.volume, entry.price, entry.sl = symbol, sign, volume, price, sl
+        entry.exposure, entry.margin, entry.risk = exposure, margin, risk
+        old = self.entries.get(ticket)
+        if old is not None:
+            self._book(old, -1)
+        self.entries[ticket] = entry
+        self._book(entry, 1)
+
+    # --- update ---
+    def open(self, ticket, symbol, action, volume, price, sl=None):
+        """New (or replaced) position; ``action`` is 'BUY'/'SELL'."""
+        with self.lock:
+            self._set(ticket, symbol, 1 if action == 'BUY' else -1, volume, price, sl)
+
+    def close(self, ticket, volume=None):
+        """Remove a position, or reduce it by ``volume`` (partial close)."""
+        with self.lock:
+            e = self.entries.get(ticket)
+            if e is None:
+                return
+            if volume is not None and volume < e.volume - 1e-9:
+                self._set(ticket, e.symbol, e.sign, e.volume - volume, e.price, e.sl)
+                return
+            self._book(e, -1)
+            del self.entries[ticket]
+
+    # --- pre-trade ---
+    def check(self, symbol, action, volume, price, sl, equity):
+        """
+        (ok, reason) for a new order against the configured limits.
+        Touches only the totals and the two currencies of ``symbol``.
+        """
+        spec, exposure, margin, risk = self._values(symbol, 1 if action == 'BUY' else -1,
+                                                    volume, price, sl)
+        if equity <= 0:
+            return False, 'no equity'
+        if self.max_total_risk_percent:
+            limit = equity * self.max_total_risk_percent / 100.0
+            if self.total_risk + risk > limit:
+                return False, f'total risk {self.total_risk + risk:.2f} > {limit:.2f}'
+        if self.max_margin_percent:
+            limit = equity * self.max_margin_percent / 100.0
+            if self.total_margin + margin > limit:
+                return False, f'margin {self.total_margin + margin:.2f} > {limit:.2f}'
+        if self.max_currency_exposure:
+            limit = equity * self.max_currency_exposure
+            for ccy, delta in ((spec.base, exposure), (spec.quote, -exposure)):
+                if ccy == self.account_currency:
+                    continue
+                new = self.currencies.get(ccy, 0.0) + delta
+                # Order yang mengurangi exposure selalu boleh
+                if abs(new) > limit and abs(new) > abs(new - delta):
+                    return False, f'{ccy} exposure {new:.2f} > {limit:.2f}'
+        return True, None
+
+    def summary(self):
+        return {
+            'total_risk': self.total_risk,
+            'total_margin': self.total_margin,
+            'currencies': dict(self.currencies),
+            'symbols': {s: r.as_dict() for s, r in self.symbols.items() if r.count},
+        }
+
+
+def _spec_from_terminal(symbol):
+    from connector import get_symbol_spec
+    info = get_symbol_spec(symbol)
+    if info is None:
+        raise RuntimeError('symbol_info returned None for ' + symbol)
+    return SymbolSpec.from_info(info, symbol)
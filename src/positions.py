@@ -0,0 +1,172 @@
+"""
+Ticket-keyed book of open positions.
+
+``PositionBook.sync()`` reads positions_get once and applies only the
+difference to the book: new tickets are added, vanished tickets removed,
+and a position whose volume/SL/TP or floating values (price_current,
+profit, swap) changed is replaced by a new record. Records that were
+handed out are never mutated, so a list from ``list()`` can be rendered
+on another thread (monitor.Dashboard) while the next sync runs.
+
+Consumers subscribe to change events instead of re-scanning the list:
+
+    book.subscribe('opened', lambda pos, deal: ...)
+    book.subscribe('closed', ...)      # setiap posisi yang hilang
+    book.subscribe('sl_hit', ...)      # ditutup oleh SL broker
+    book.subscribe('tp_hit', ...)      # ditutup oleh TP broker
+    book.subscribe('modified', ...)    # volume / SL / TP berubah
+
+For closed positions the closing deal is looked up once
+(history_deals_get(position=ticket)) and passed as ``deal``.
+"""
+import threading
+
+from backend import mt5
+
+EVENTS = ('opened', 'modified', 'closed', 'sl_hit', 'tp_hit')
+
+
+class Position:
+    """
+    One open position, not modified after it enters the book. Attribute
+    access, plus ``pos['profit']`` for code written against the old dict
+    rows.
+    """
+    __slots__ = ('ticket', 'symbol', 'type', 'side', 'volume', 'price_open', 'sl', 'tp',
+                 'price_current', 'profit', 'swap', 'magic', 'time', 'time_update', 'comment')
+
+    def __init__(self, p):
+        self.ticket = p.ticket
+        self.symbol = p.symbol
+        self.side = 1 if p.type == mt5.ORDER_TYPE_BUY else -1
+        self.type = 'BUY' if self.side > 0 else 'SELL'
+        self.magic = p.magic
+        self.time = p.time
+        self.comment = p.comment
+        self.volume = p.volume
+        self.price_open = p.price_open
+        self.sl = p.sl
+        self.tp = p.tp
+        self.time_update = p.time_update
+        self.price_current = p.price_current
+        self.profit = p.profit
+        self.swap = p.swap
+
+    def changed(self, p):
+        return p.volume != self.volume or p.sl != self.sl or p.tp != self.tp \
+            or p.price_open != self.price_open
+
+    def moved(self, p):
+        return p.price_current != self.price_current or p.profit != self.profit \
+            or p.swap != self.swap
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self):
+        return (f'Position({self.ticket} {self.type} {self.symbol} {self.volume} @ {self.price_open} '
+                f'sl={self.sl} tp={self.tp} profit={self.profit})')
+
+
+class PositionBook:
+    def __init__(self):
+        self.positions = {}     # ticket -> Position
+        self.by_symbol = {}     # symbol -> {ticket: Position}
+        self._subscribers = {e: [] for e in EVENTS}
+        self.lock = threading.Lock()
+
+    def subscribe(self, event, callback):
+        """Call ``callback(position, deal)`` on ``event``; returns an unsubscribe function."""
+        if event not in self._subscribers:
+            raise ValueError(f'unknown event {event!r}, expected one of {EVENTS}')
+        self._subscribers[event].append(callback)
+        return lambda: self._subscribers[event].remove(callback)
+
+    def _emit(self, event, pos, deal=None):
+        for callback in self._subscribers[event]:
+            try:
+                callback(pos, deal)
+            except Exception as e:
+                print(f'Position event {event} handler error: {e}')
+
+    def _closing_deal(self, ticket):
+        deals = mt5.history_deals_get(position=ticket)
+        for d in reversed(deals or ()):
+            if d.entry != mt5.DEAL_ENTRY_IN:
+                return d
+        return None
+
+    def _replace(self, p):
+        # Record baru, yang lama mungkin sedang dirender thread dashboard
+        pos = self.positions[p.ticket] = Position(p)
+        self.by_symbol[pos.symbol][pos.ticket] = pos
+        return pos
+
+    def sync(self, symbol=None):
+        """
+        Apply the changes since the last sync (only ``symbol``'s positions
+        when given). Returns (opened, modified, closed) ticket counts.
+        """
+        raw = mt5.positions_get(symbol=symbol) if symbol else mt5.positions_get()
+        if raw is None:
+            return 0, 0, 0
+        events = []
+        with self.lock:
+            seen = set()
+            for p in raw:
+                seen.add(p.ticket)
+                pos = self.positions.get(p.ticket)
+                if pos is None:
+                    pos = self.positions[p.ticket] = Position(p)
+                    self.by_symbol.setdefault(pos.symbol, {})[pos.ticket] = pos
+                    events.append(('opened', pos))
+                elif pos.changed(p):
+                    events.append(('modified', self._replace(p)))
+                elif pos.moved(p):
+                    self._replace(p)
+            scope = self.positions if symbol is None else self.by_symbol.get(symbol, {})
+            gone = [t for t in scope if t not in seen]
+            for ticket in gone:
+                pos = self.positions.pop(ticket)
+                self.by_symbol[pos.symbol].pop(ticket, None)
+                events.append(('closed', pos))
+        opened = modified = 0
+        for event, pos in events:
+            if event == 'closed':
+                deal = self._closing_deal(pos.ticket)
+                self._emit('closed', pos, deal)
+                reason = getattr(deal, 'reason', None)
+                if reason == mt5.DEAL_REASON_SL:
+                    self._emit('sl_hit', pos, deal)
+                elif reason == mt5.DEAL_REASON_TP:
+                    self._emit('tp_hit', pos, deal)
+            else:
+                opened += event == 'opened'
+                modified += event == 'modified'
+                self._emit(event, pos)
+        return opened, modified, len(events) - opened - modified
+
+    def list(self, symbol=None):
+        """Open positions (all, or of ``symbol``) as a list of records."""
+        if symbol is None:
+            return list(self.positions.values())
+        return list(self.by_symbol.get(symbol, {}).values())
+
+    def get(self, ticket):
+        return self.positions.get(ticket)
+
+    def __len__(self):
+        return len(self.positions)
+
+
+_book = None
+
+def position_book():
+    """Process-wide PositionBook."""
+    global _book
+    if _book is None:
+        _book = PositionBook()
+    return _book
@@ -0,0 +1,347 @@
+"""
+Tick and candle recorder.
+
+Pulls ticks (copy_ticks_range) and closed candles (copy_rates_range) for a
+set of symbols in large batches and appends them to compressed columnar
+chunks, one ``.npz`` per chunk with one array per field:
+
+    {RECORD_DIR}/{symbol}/ticks/2024-05-01/{start_msc}_{end_msc}.npz
+    {RECORD_DIR}/{symbol}/M1/2024-05-01/{start}_{end}.npz
+
+Each chunk covers the half-open range [start, end) completely (ticks in ms,
+candles by open time in seconds, both in broker server time), so after a
+restart recording resumes at the newest chunk's ``end``. Days are split on
+server-time midnight. Memory stays bounded: a stream buffers at most
+RECORD_CHUNK_ROWS rows, batch windows shrink when a symbol is busy, and
+compression/writes run on a small thread pool with a bounded queue.
+
+Usage:
+    python src/recorder.py --symbols XAUUSDm,EURUSDm --kind both --since 2024-05-01
+    python src/recorder.py --once            # catch up to now, then exit
+
+The chunks can be replayed with the simulator:
+    MT5_BACKEND=sim MT5_SIM_DATA=data/record/{symbol}/ticks python src/main.py
+"""
+import argparse
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from backend import mt5
+from connector import timeframe_seconds
+
+RECORD_DIR = os.getenv('RECORD_DIR', 'data/record')
+RECORD_KIND = os.getenv('RECORD_KIND', 'ticks')               # ticks | rates | both
+RECORD_TIMEFRAME = os.getenv('RECORD_TIMEFRAME', 'M1')
+RECORD_SINCE_DAYS = int(os.getenv('RECORD_SINCE_DAYS', '7'))  # awal rekaman kalau belum ada data
+RECORD_CHUNK_ROWS = int(os.getenv('RECORD_CHUNK_ROWS', '500000'))
+RECORD_FLUSH_SECONDS = float(os.getenv('RECORD_FLUSH_SECONDS', '60'))
+RECORD_INTERVAL = float(os.getenv('RECORD_INTERVAL', '1'))     # jeda saat sudah up to date
+RECORD_WRITERS = int(os.getenv('RECORD_WRITERS', '2'))
+
+DAY = 86400
+
+running = True
+
+
+# ================================
+# === CHUNK FILES ================
+# ================================
+def stream_dir(root, symbol, kind):
+    return os.path.join(root, symbol, kind)
+
+
+def _day_name(day_start):
+    return datetime.fromtimestamp(day_start, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def _chunk_files(path):
+    """[(start, end, file)] of every chunk under a stream dir, oldest first."""
+    out = []
+    if not os.path.isdir(path):
+        return out
+    for day in sorted(os.listdir(path)):
+        day_dir = os.path.join(path, day)
+        if not os.path.isdir(day_dir):
+            continue
+        for name in os.listdir(day_dir):
+            if not name.endswith('.npz'):
+                continue
+            start, end = name[:-4].split('_')
+            out.append((int(start), int(end), os.path.join(day_dir, name)))
+    out.sort()
+    return out
+
+
+def last_end(path):
+    """End of the newest chunk (resume point) or None."""
+    files = _chunk_files(path)
+    return files[-1][1] if files else None
+
+
+def write_chunk(path, day_start, start, end, data):
+    day_dir = os.path.join(path, _day_name(day_start))
+    os.makedirs(day_dir, exist_ok=True)
+    target = os.path.join(day_dir, f'{start}_{end}.npz')
+    tmp = target + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez_compressed(f, **{name: data[name] for name in data.dtype.names})
+    os.replace(tmp, target)
+    return target
+
+
+def read_chunks(path, start=None, end=None):
+    """Concatenate recorded chunks overlapping [start, end) into one structured array."""
+    parts = []
+    key = None
+    for c_start, c_end, file in _chunk_files(path):
+        if (start is not None and c_end <= start) or (end is not None and c_start >= end):
+            continue
+        with np.load(file) as z:
+            names = z.files
+            cols = {name: z[name] for name in names}
+        dtype = np.dtype([(name, cols[name].dtype) for name in names])
+        part = np.zeros(len(cols[names[0]]), dtype)
+        for name in names:
+            part[name] = cols[name]
+        parts.append(part)
+        key = 'time_msc' if 'time_msc' in names else 'time'
+    if not parts:
+        return None
+    data = np.concatenate(parts)
+    if start is not None:
+        data = data[data[key] >= start]
+    if end is not None:
+        data = data[data[key] < end]
+    return data
+
+
+# ================================
+# === STREAM =====================
+# ================================
+class Stream:
+    """
+    One (symbol, ticks|timeframe) series: fetch window, buffer and flush.
+
+    Keys are ms for ticks and seconds for candles; ``cursor`` is the first
+    key not recorded yet.
+    """
+
+    def __init__(self, recorder, symbol, kind, since):
+        self.recorder = recorder
+        self.symbol = symbol
+        self.kind = kind
+        self.ticks = kind == 'ticks'
+        self.timeframe = None if self.ticks else getattr(mt5, 'TIMEFRAME_' + kind)
+        self.unit = 1000 if self.ticks else 1
+        self.path = stream_dir(recorder.root, symbol, kind)
+        resume = last_end(self.path)
+        self.cursor = resume if resume is not None else int(since * self.unit)
+        # Window awal: 1 jam tick / 30 hari candle, disesuaikan dengan kepadatan data
+        self.window = 3600 * 1000 if self.ticks else 30 * DAY
+        self.max_window = DAY * 1000 if self.ticks else 365 * DAY
+        self.min_window = 1000 if self.ticks else 60
+        self.buf = []
+        self.buf_rows = 0
+        self.buf_start = None
+        self.buf_end = None
+        self.buf_day = None
+        self.buf_since = None
+        self.rows = 0
+
+    def _server_now(self):
+        tick = mt5.symbol_info_tick(self.symbol)
+        if tick is None:
+            return None
+        if self.ticks:
+            return int(tick.time_msc)
+        seconds = timeframe_seconds(self.timeframe)
+        # Hanya bar yang sudah close
+        return int(tick.time) // seconds * seconds
+
+    def _fetch(self, start, end):
+        """Rows with key in [start, end)."""
+        t0 = datetime.fromtimestamp(start / self.unit, tz=timezone.utc)
+        t1 = datetime.fromtimestamp((end - 1) / self.unit + 1, tz=timezone.utc)
+        if self.ticks:
+            data = mt5.copy_ticks_range(self.symbol, t0, t1, mt5.COPY_TICKS_ALL)
+            key = 'time_msc'
+        else:
+            data = mt5.copy_rates_range(self.symbol, self.timeframe, t0, t1)
+            key = 'time'
+        if data is None:
+            return None
+        data = np.asarray(data)
+        keys = data[key]
+        return data[(keys >= start) & (keys < end)]
+
+    def step(self):
+        """Fetch the next window; returns True if more history is waiting."""
+        if self.buf_since is not None and time.monotonic() - self.buf_since >= self.recorder.flush_seconds:
+            self.flush()
+        now = self._server_now()
+        if now is None or now <= self.cursor:
+            return False
+        end = min(self.cursor + self.window, now)
+        data = self._fetch(self.cursor, end)
+        if data is None:
+            return False
+        chunk_rows = self.recorder.chunk_rows
+        if len(data) > chunk_rows // 2 and self.window > self.min_window:
+            self.window = max(self.window // 2, self.min_window)
+        elif len(data) < chunk_rows // 8 and self.window < self.max_window:
+            self.window = min(self.window * 2, self.max_window)
+        self._append(data, self.cursor, end)
+        self.cursor = end
+        return end < now
+
+    def _append(self, data, start, end):
+        key = 'time_msc' if self.ticks else 'time'
+        day_len = DAY * self.unit
+        # Pecah per hari (server time)
+        while start < end:
+            day = start // day_len * day_len
+            seg_end = min(end, day + day_len)
+            if self.buf_day is not None and self.buf_day != day:
+                self.flush()
+            keys = data[key]
+            seg = data[(keys >= start) & (keys < seg_end)]
+            if self.buf_start is None:
+                self.buf_start = start
+                self.buf_day = day
+                self.buf_since = time.monotonic()
+            if len(seg):
+                self.buf.append(seg)
+                self.buf_rows += len(seg)
+            self.buf_end = seg_end
+            if self.buf_rows >= self.recorder.chunk_rows:
+                self.flush()
+            start = seg_end
+
+    def flush(self):
+        if self.buf_start is None:
+            return
+        if self.buf_rows:
+            data = np.concatenate(self.buf)
+            self.recorder.submit(self.path, self.buf_day // self.unit, self.buf_start, self.buf_end, data)
+            self.rows += len(data)
+        self.buf = []
+        self.buf_rows = 0
+        self.buf_start = self.buf_end = self.buf_day = self.buf_since = None
+
+
+# ================================
+# === RECORDER ===================
+# ================================
+class Recorder:
+
+    def __init__(self, symbols, root=RECORD_DIR, kinds=('ticks',), since=None,
+                 chunk_rows=RECORD_CHUNK_ROWS, flush_seconds=RECORD_FLUSH_SECONDS,
+                 interval=RECORD_INTERVAL, writers=RECORD_WRITERS, max_pending=None):
+        self.root = root
+        self.chunk_rows = chunk_rows
+        self.flush_seconds = flush_seconds
+        self.interval = interval
+        self.pool = ThreadPoolExecutor(max_workers=writers, thread_name_prefix='recorder')
+        # Batas chunk yang menunggu ditulis -> memory tetap terbatas
+        self.pending = threading.BoundedSemaphore(max_pending or writers * 2)
+        self.errors = []
+        since = time.time() - RECORD_SINCE_DAYS * DAY if since is None else since
+        self.streams = []
+        for symbol in symbols:
+            mt5.symbol_select(symbol, True)
+            for kind in kinds:
+                self.streams.append(Stream(self, symbol, kind, since))
+
+    def submit(self, path, day_start, start, end, data):
+        self.pending.acquire()
+        future = self.pool.submit(write_chunk, path, day_start, start, end, data)
+
+        def done(f):
+            self.pending.release()
+            if f.exception() is not None:
+                self.errors.append(f.exception())
+                print(f'Recorder write error ({path}): {f.exception()}')
+        future.add_done_callback(done)
+
+    def run(self, once=False):
+        """Round-robin over streams until stopped (or caught up, with ``once``)."""
+        try:
+            while running:
+                behind = False
+                for stream in self.streams:
+                    if not running:
+                        break
+                    try:
+                        behind |= stream.step()
+                    except Exception as e:
+                        print(f'Recorder error ({stream.symbol} {stream.kind}): {e}')
+                if not behind:
+                    if once:
+                        break
+                    time.sleep(self.interval)
+        finally:
+            self.close()
+
+    def close(self):
+        for stream in self.streams:
+            stream.flush()
+        self.pool.shutdown(wait=True)
+
+    def summary(self):
+        return {(s.symbol, s.kind): s.rows for s in self.streams}
+
+
+def _stop(signum, frame):
+    global running
+    running = False
+
+
+def main():
+    from connector import initialize, shutdown
+
+    ap = argparse.ArgumentParser(description='Record MT5 ticks/candles to compressed chunks')
+    ap.add_argument('--symbols', default=os.getenv('RECORD_SYMBOLS') or os.getenv('SYMBOLS')
+                    or os.getenv('SYMBOL'), help='comma separated symbols')
+    ap.add_argument('--kind', choices=('ticks', 'rates', 'both'), default=RECORD_KIND)
+    ap.add_argument('--timeframe', default=RECORD_TIMEFRAME, help='candle timeframe for rates')
+    ap.add_argument('--dir', default=RECORD_DIR)
+    ap.add_argument('--since', help='start date (YYYY-MM-DD, UTC) when nothing is recorded yet')
+    ap.add_argument('--once', action='store_true', help='catch up to now and exit')
+    args = ap.parse_args()
+
+    symbols = [s.split(':')[0].strip() for s in (args.symbols or '').split(',') if s.strip()]
+    if not symbols:
+        ap.error('no symbols (use --symbols or RECORD_SYMBOLS)')
+    kinds = []
+    if args.kind in ('ticks', 'both'):
+        kinds.append('ticks')
+    if args.kind in ('rates', 'both'):
+        kinds.append(args.timeframe.upper())
+    since = None
+    if args.since:
+        since = datetime.strptime(args.since, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()
+
+    initialize(path=os.getenv('MT5_PATH'), login=os.getenv('MT5_LOGIN'),
+               password=os.getenv('MT5_PASSWORD'), server=os.getenv('MT5_SERVER'))
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    recorder = Recorder(symbols, root=args.dir, kinds=kinds, since=since)
+    t0 = time.perf_counter()
+    try:
+        recorder.run(once=args.once)
+    finally:
+        shutdown()
+    elapsed = time.perf_counter() - t0
+    for (symbol, kind), rows in recorder.summary().items():
+        print(f'{symbol} {kind}: {rows} rows ({rows / max(elapsed, 1e-9):.0f}/s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Incremental multi-timeframe candles from M1 bars (or ticks).
+
+A Resampler keeps M5/M15/H1/... bars up to date from the M1 series of one
+symbol, so a multi-timeframe strategy needs one copy_rates_from_pos per
+poll instead of one per timeframe. Only M1 bars newer than the last one
+seen are folded in (O(1) per bar and timeframe).
+
+Buckets are aligned to the broker's server time, which is what MT5 bar
+times already are: M5..D1 start at multiples of the bar length from
+server midnight, W1 starts on Sunday 00:00 and MN1 on the 1st of the month,
+matching the terminal.
+
+Each higher timeframe can be seeded once with its own history (one
+request per timeframe at startup); without a seed the history starts at
+the first complete bucket inside the M1 data.
+"""
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+from candle_store import RATES_DTYPE
+from connector import CandleBuffer, timeframe_seconds
+
+DAY = 86400
+WEEK = 7 * DAY
+
+
+def bucket_start(t, timeframe):
+    """Open time (server time) of the ``timeframe`` bar containing ``t``."""
+    if timeframe & 0xC000 == 0xC000:      # MN1
+        d = datetime.fromtimestamp(t, tz=timezone.utc)
+        return int(datetime(d.year, d.month, 1, tzinfo=timezone.utc).timestamp())
+    if timeframe & 0x8000:                # W1: minggu mulai hari Minggu
+        return (t - 3 * DAY) // WEEK * WEEK + 3 * DAY
+    seconds = timeframe_seconds(timeframe)
+    return t // seconds * seconds
+
+
+def _copy(row):
+    """Writable 0-d copy of a rates record (views from buffers are read-only)."""
+    bar = np.zeros((), row.dtype)
+    bar[()] = row
+    return bar
+
+
+class _Frame:
+    """State of one higher timeframe: closed bars + the bucket being built."""
+    __slots__ = ('timeframe', 'ring', 'bucket', 'agg', 'skip', 'volume_from')
+
+    def __init__(self, symbol, timeframe, capacity):
+        self.timeframe = timeframe
+        self.ring = CandleBuffer(symbol, timeframe, capacity)
+        self.bucket = None        # open time bucket yang sedang dibangun
+        self.agg = None           # agregat bar M1 close di bucket itu
+        self.skip = None          # bucket awal yang tidak lengkap (tanpa seed)
+        self.volume_from = None   # volume bar M1 sebelum ini sudah ada di seed
+
+    def _bucket(self, t):
+        b = bucket_start(t, self.timeframe)
+        if self.agg is None and self.skip is None and t != b:
+            self.skip = b     # data mulai di tengah bucket: bar pertama tidak lengkap
+        return b
+
+    def fold(self, row):
+        """Fold one closed M1 bar."""
+        t = int(row['time'])
+        b = self._bucket(t)
+        if b == self.skip or (self.bucket is not None and b < self.bucket):
+            return
+        if b != self.bucket:
+            if self.agg is not None:
+                self.ring.push(self.agg[None])    # bucket lama selesai
+            self.bucket = b
+            self.agg = _copy(row)
+            self.agg['time'] = b
+            return
+        agg = self.agg
+        if row['high'] > agg['high']:
+            agg['high'] = row['high']
+        if row['low'] < agg['low']:
+            agg['low'] = row['low']
+        agg['close'] = row['close']
+        if self.volume_from is None or t >= self.volume_from:
+            agg['tick_volume'] += row['tick_volume']
+            agg['real_volume'] += row['real_volume']
+
+    def show(self, forming):
+        """Push the current bucket's bar, including the forming M1 bar."""
+        if forming is None:
+            if self.agg is not None:
+                self.ring.push(self.agg[None])
+            return
+        b = self._bucket(int(forming['time']))
+        if b == self.skip:
+            return
+        if self.agg is not None:
+            if b != self.bucket:
+                # Bucket lama selesai: simpan versi final dari bar M1 close
+                self.ring.push(self.agg[None])
+            else:
+                bar = _copy(self.agg)
+                bar['high'] = max(bar['high'], forming['high'])
+                bar['low'] = min(bar['low'], forming['low'])
+                bar['close'] = forming['close']
+                bar['tick_volume'] += forming['tick_volume']
+                bar['real_volume'] += forming['real_volume']
+                self.ring.push(bar[None])
+                return
+        bar = _copy(forming)
+        bar['time'] = b
+        self.ring.push(bar[None])
+
+
+class Resampler:
+    """
+    Higher-timeframe bars for one symbol, fed with M1 bars.
+
+        res = Resampler('XAUUSDm', [mt5.TIMEFRAME_M5, mt5.TIMEFRAME_H1])
+        res.update(get_candle_view('XAUUSDm', mt5.TIMEFRAME_M1))  # tiap poll
+        h1 = res.view(mt5.TIMEFRAME_H1, 100)
+    """
+
+    def __init__(self, symbol, timeframes, capacity=500):
+        self.symbol = symbol
+        self.capacity = capacity
+        self.lock = threading.Lock()    # beberapa target bisa berbagi simbol yang sama
+        self.frames = {}
+        self.last_closed = None     # time bar M1 close terakhir yang sudah di-fold
+        self.forming = None
+        self._tick_bar = None
+        for tf in timeframes:
+            self.add(tf)
+
+    def add(self, timeframe):
+        """Start building ``timeframe`` (history begins at the next full bucket unless seeded)."""
+        if timeframe not in self.frames:
+            self.frames[timeframe] = _Frame(self.symbol, timeframe, self.capacity)
+        return self.frames[timeframe]
+
+    def seed(self, timeframe, rates, forming):
+        """
+        Load ``timeframe`` history (copy_rates_from_pos, last bar forming).
+        ``forming`` is the M1 bar that was open when ``rates`` was fetched:
+        its volume so far is taken out of the seeded bar and it is folded
+        in full once it closes, like every later M1 bar. M1 bars before it
+        only extend the forming bar's price range.
+        """
+        frame = self.frames[timeframe]
+        if len(rates) == 0:
+            return
+        frame.ring.push(rates)
+        frame.agg = _copy(rates[-1])
+        frame.bucket = int(frame.agg['time'])
+        frame.skip = None
+        frame.volume_from = int(forming['time'])
+        if bucket_start(frame.volume_from, timeframe) == frame.bucket:
+            for field in ('tick_volume', 'real_volume'):
+                frame.agg[field] -= min(frame.agg[field], forming[field])
+
+    def update(self, m1, forming=True):
+        """
+        Fold M1 bars (oldest first). With ``forming=True`` the last row is
+        the still-open M1 bar and is only shown, not folded.
+        """
+        if len(m1) == 0:
+            return
+        closed = m1[:-1] if forming else m1
+        times = closed['time']
+        start = 0 if self.last_closed is None else int(np.searchsorted(times, self.last_closed, 'right'))
+        for i in range(start, len(closed)):
+            row = closed[i]
+            for frame in self.frames.values():
+                frame.fold(row)
+        if len(closed):
+            self.last_closed = max(self.last_closed or 0, int(times[-1]))
+        self.forming = m1[-1] if forming else None
+        for frame in self.frames.values():
+            frame.show(self.forming)
+
+    def update_tick(self, time_msc, price, volume=1):
+        """Build M1 bars from ticks and fold them (for tick-driven callers)."""
+        t = int(time_msc) // 60000 * 60
+        bar = self._tick_bar
+        if bar is not None and int(bar['time']) != t:
+            self.update(bar[None], forming=False)
+            bar = None
+        if bar is None:
+            bar = np.zeros((), RATES_DTYPE)
+            bar['time'] = t
+            bar['open'] = bar['high'] = bar['low'] = price
+        bar['high'] = max(bar['high'], price)
+        bar['low'] = min(bar['low'], price)
+        bar['close'] = price
+        bar['tick_volume'] += volume
+        self._tick_bar = bar
+        self.forming = bar
+        for frame in self.frames.values():
+            frame.show(bar)
+
+    def view(self, timeframe, n=None):
+        """Newest ``n`` bars of ``timeframe`` (last one forming), zero-copy."""
+        return self.frames[timeframe].ring.view(n)
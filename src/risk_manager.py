@@ -1,25 +1,29 @@
 import math
-import MetaTrader5 as mt5
 
-def lot_by_risk(symbol, entry_price, stop_loss_price, risk_percent=0.5, min_lot=0.01):
-    account = mt5.account_info()
-    if account is None:
-        raise RuntimeError('No account info from MT5.')
-    equity = account.equity
-    # Untuk modal kecil, risk_percent default 0.5% per entry
-    risk_amount = equity * (risk_percent / 100.0)
-    sym = mt5.symbol_info(symbol)
-    if sym is None:
-        raise RuntimeError('symbol_info returned None for ' + symbol)
+# Untuk modal kecil, jangan lebih dari 0.05 lot
+MAX_LOT = 0.05
+
+def pip_value_of(sym):
+    """Account-currency value of a 1.0 price move for 1 lot."""
     point = getattr(sym, 'point', None) or 0.00001
     tick_value = getattr(sym, 'trade_tick_value', None) or getattr(sym, 'tick_value', None)
     tick_size = getattr(sym, 'trade_tick_size', None) or getattr(sym, 'tick_size', None)
     if tick_value and tick_size:
-        pip_value = tick_value / tick_size
-    else:
-        contract_size = getattr(sym, 'trade_contract_size', None) or getattr(sym, 'contract_size', None) or 100000
-        pip_value = contract_size * point
-    pips_risk = abs(entry_price - stop_loss_price)
+        return tick_value / tick_size
+    contract_size = getattr(sym, 'trade_contract_size', None) or getattr(sym, 'contract_size', None) or 100000
+    return contract_size * point
+
+def volume_limits(sym, min_lot=0.01):
+    """(lot_step, min_volume, max_volume) from symbol_info with fallbacks."""
+    lot_step = getattr(sym, 'volume_step', None) or getattr(sym, 'trade_volume_step', None) or 0.01
+    min_volume = getattr(sym, 'volume_min', None) or getattr(sym, 'trade_volume_min', None) or min_lot
+    max_volume = getattr(sym, 'volume_max', None) or getattr(sym, 'trade_volume_max', None) or 100.0
+    return lot_step, min_volume, max_volume
+
+def size_lots(equity, risk_percent, pips_risk, pip_value,
+              lot_step=0.01, min_volume=0.01, max_volume=100.0, min_lot=0.01):
+    """Lot sizing rules shared by live trading and the backtester."""
+    risk_amount = equity * (risk_percent / 100.0)
     if pips_risk <= 0:
         # Jika SL terlalu dekat, tetap entry dengan lot minimum
         return min_lot
@@ -27,14 +31,40 @@ def lot_by_risk(symbol, entry_price, stop_loss_price, risk_percent=0.5, min_lot=
     if value_per_lot == 0:
         return min_lot
     raw_lots = risk_amount / value_per_lot
-    lot_step = getattr(sym, 'volume_step', None) or getattr(sym, 'trade_volume_step', None) or 0.01
-    min_volume = getattr(sym, 'volume_min', None) or getattr(sym, 'trade_volume_min', None) or min_lot
-    max_volume = getattr(sym, 'volume_max', None) or getattr(sym, 'trade_volume_max', None) or 100.0
     lots = math.floor(raw_lots / lot_step) * lot_step
     lots = max(lots, min_volume, min_lot)
     lots = min(lots, max_volume)
     if lots <= 0:
         lots = min_lot
-    # Untuk modal kecil, jangan lebih dari 0.05 lot
-    lots = min(lots, 0.05)
+    lots = min(lots, MAX_LOT)
     return round(lots, 2)
+
+def size_lots_array(equity, risk_percent, pips_risk, pip_value,
+                    lot_step=0.01, min_volume=0.01, max_volume=100.0, min_lot=0.01):
+    """Vectorized size_lots over NumPy arrays of equity / pips_risk."""
+    import numpy as np
+    equity = np.asarray(equity, dtype=float)
+    pips_risk = np.asarray(pips_risk, dtype=float)
+    value_per_lot = pips_risk * pip_value
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw_lots = equity * (risk_percent / 100.0) / value_per_lot
+    lots = np.floor(raw_lots / lot_step) * lot_step
+    lots = np.minimum(np.maximum(lots, max(min_volume, min_lot)), max_volume)
+    lots = np.where(lots <= 0, min_lot, lots)
+    lots = np.round(np.minimum(lots, MAX_LOT), 2)
+    return np.where((pips_risk <= 0) | (value_per_lot == 0), min_lot, lots)
+
+def lot_by_risk(symbol, entry_price, stop_loss_price, risk_percent=0.5, min_lot=0.01, equity=None):
+    from connector import get_account_info, get_symbol_spec
+    if equity is None:
+        account = get_account_info()
+        if not account:
+            raise RuntimeError('No account info from MT5.')
+        equity = account['equity']
+    # Untuk modal kecil, risk_percent default 0.5% per entry
+    sym = get_symbol_spec(symbol)
+    if sym is None:
+        raise RuntimeError('symbol_info returned None for ' + symbol)
+    lot_step, min_volume, max_volume = volume_limits(sym, min_lot)
+    return size_lots(equity, risk_percent, abs(entry_price - stop_loss_price), pip_value_of(sym),
+                     lot_step, min_volume, max_volume, min_lot)
@@ -0,0 +1,136 @@
+"""
+Warm-start snapshot of the bot state.
+
+One ``.npz`` file holds the candle ring buffers (one array per
+(symbol, timeframe)) plus a JSON blob with the indicator engine state and
+the daily counters of every target. After a restart the buffers only
+need the bars since the snapshot (a delta fetch), the indicator engines
+continue from their saved recursion instead of reseeding, and
+``trades_today`` / ``loss_today`` / ``active`` are restored as long as
+the snapshot is from the same broker day (server time, like trade_stats).
+
+The file is rewritten every SNAPSHOT_INTERVAL seconds from the main loop
+and once more on shutdown (write to a temp file, then rename).
+"""
+import json
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SNAPSHOT_FILE = os.getenv('SNAPSHOT_FILE', 'snapshot_{login}.npz')   # kosong = nonaktif
+SNAPSHOT_INTERVAL = float(os.getenv('SNAPSHOT_INTERVAL', '30'))
+VERSION = 1
+
+
+def _day_start(symbols):
+    """Broker day (trade_stats.broker_day) of the latest tick of ``symbols``, or None."""
+    import connector
+    from trade_stats import broker_day
+    for symbol in symbols:
+        tick = connector.get_tick(symbol)
+        if tick is not None and tick.time:
+            return broker_day(tick.time)
+    return None
+
+
+def save(path, states):
+    """Write buffers + per-target state; returns the file size in bytes."""
+    import connector
+    meta = {'version': VERSION, 'saved_at': time.time(),
+            'day_start': _day_start(symbol for symbol, _ in states),
+            'targets': [], 'buffers': []}
+    arrays = {}
+    for (symbol, timeframe), st in states.items():
+        meta['targets'].append({
+            'symbol': symbol, 'timeframe': int(timeframe),
+            'trades_today': st.trades_today, 'loss_today': st.loss_today, 'active': st.active,
+            'engine': st.engine.state(),
+            'strategies': st.strategies.state() if st.strategies is not None else None,
+        })
+    for i, ((symbol, timeframe), buf) in enumerate(list(connector._candle_buffers.items())):
+        # Salinan di bawah lock buffer: fetch di thread pool bisa sedang merge
+        rates = buf.copy()
+        if rates is not None:
+            arrays[f'candles_{i}'] = rates
+            meta['buffers'].append({'symbol': symbol, 'timeframe': int(timeframe),
+                                    'capacity': buf.capacity, 'key': f'candles_{i}'})
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def load(path, states):
+    """
+    Restore what matches the current config into ``states`` and the
+    connector's candle buffers. Returns a short description, or None if
+    there is no usable snapshot.
+    """
+    import connector
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('version') != VERSION:
+                return None
+            buffers = 0
+            for b in meta['buffers']:
+                buf = connector.get_candle_buffer(b['symbol'], b['timeframe'], b['capacity'])
+                if buf.count == 0:
+                    buf.push(data[b['key']])
+                    buffers += 1
+    except (OSError, ValueError, KeyError) as e:
+        print(f'Snapshot {path} ignored: {e}')
+        return None
+
+    # Hari broker (waktu server), bukan tengah malam lokal; tanpa tick = jangan restore counter
+    day = _day_start(symbol for symbol, _ in states)
+    same_day = day is not None and meta['day_start'] == day
+    engines = counters = 0
+    for t in meta['targets']:
+        st = states.get((t['symbol'], t['timeframe']))
+        if st is None:
+            continue
+        engines += st.engine.restore(t['engine'])
+        if st.strategies is not None and t.get('strategies'):
+            st.strategies.restore(t['strategies'])
+        if same_day:
+            st.trades_today = t['trades_today']
+            st.loss_today = t['loss_today']
+            st.active = t['active']
+            counters += 1
+    age = time.time() - meta['saved_at']
+    return (f'{buffers} candle buffers, {engines} indicator states, '
+            f'{counters} daily counters (saved {age:.0f}s ago)')
+
+
+class Snapshotter:
+    """Periodic ``save`` driven from the main loop (no extra thread)."""
+
+    def __init__(self, path, states, interval=SNAPSHOT_INTERVAL):
+        self.path = path
+        self.states = states
+        self.interval = interval
+        self._next = time.monotonic() + interval
+
+    def maybe_save(self):
+        now = time.monotonic()
+        if not self.path or now < self._next:
+            return False
+        self._next = now + self.interval
+        self.save()
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            save(self.path, self.states)
+        except OSError as e:
+            print(f'Snapshot save failed: {e}')
@@ -1,5 +1,17 @@
-import pandas as pd
 import numpy as np
+from indicators import IndicatorEngine, IndicatorGraph
+
+# (tp_pct, sl_pct) per mode; mode lain pakai setting "normal"
+MODES = {
+    "normal": (0.0005, 0.0010),    # TP 0.05%, SL 0.1%
+    "scalping": (0.0002, 0.0004),  # TP 0.02% (2 pip XAUUSD ~ 0.2), SL 0.04% (4 pip)
+}
+
+# Parameter default detect_signal (bisa di-override, mis. hasil sweep)
+DEFAULT_PARAMS = dict(fast=3, slow=8, signal=3, rsi_period=7, rsi_upper=70, rsi_lower=30)
+
+def mode_pcts(mode):
+    return MODES.get(mode, MODES["normal"])
 
 def ema(series, period):
     return series.ewm(span=period, adjust=False).mean()
@@ -61,37 +73,52 @@ def calculate_lot(balance, risk_pct, entry, sl,
     return max(0.01, round(lot, 2))
 
 
+def signal_engine(params=None):
+    """Incremental engine with the same settings detect_signal uses."""
+    p = dict(DEFAULT_PARAMS, **(params or {}))
+    return IndicatorEngine(fast=p['fast'], slow=p['slow'], signal=p['signal'],
+                           rsi_period=p['rsi_period'])
+
+
 def detect_signal(df, balance=1000, risk_pct=0.01,
                   account_currency="USD", fx_rate=15000,
-                  mode="scalping"):
-    closes = df['close'].astype(float)
+                  mode="scalping", engine=None, params=None):
+    p = dict(DEFAULT_PARAMS, **(params or {}))
+    closes = np.asarray(df['close'], dtype=float)
     if len(closes) < 30:
         return None
 
-    # Indikator cepat
-    macd_line, signal_line, hist = macd(closes, fast=3, slow=8, signal=3)
-    rsi_vals = rsi(closes, period=7)
+    if engine is not None:
+        # Update state hanya untuk bar baru, bukan hitung ulang semua candle
+        ind = engine.sync(np.asarray(df['time']), closes)
+        macd_now, macd_prev = ind.macd, ind.macd_prev
+        sig_now, sig_prev = ind.signal, ind.signal_prev
+        hist_now = ind.hist
+        close_now = closes[-1]
+        rsi_now = ind.rsi
+    else:
+        # pandas hanya untuk jalur hitung ulang penuh (lambat diimport)
+        import pandas as pd
+        closes = pd.Series(closes)
 
-    macd_now, macd_prev = macd_line.iloc[-1], macd_line.iloc[-2]
-    sig_now, sig_prev = signal_line.iloc[-1], signal_line.iloc[-2]
-    hist_now = hist.iloc[-1]
-    close_now = closes.iloc[-1]
-    rsi_now = rsi_vals.iloc[-1]
+        # Indikator cepat
+        macd_line, signal_line, hist = macd(closes, fast=p['fast'], slow=p['slow'], signal=p['signal'])
+        rsi_vals = rsi(closes, period=p['rsi_period'])
+
+        macd_now, macd_prev = macd_line.iloc[-1], macd_line.iloc[-2]
+        sig_now, sig_prev = signal_line.iloc[-1], signal_line.iloc[-2]
+        hist_now = hist.iloc[-1]
+        close_now = closes.iloc[-1]
+        rsi_now = rsi_vals.iloc[-1]
 
     # Kondisi buy/sell agak longgar biar sering entry
-    buy = ((macd_prev < sig_prev) and (macd_now > sig_now)) and (rsi_now < 70)
-    sell = ((macd_prev > sig_prev) and (macd_now < sig_now)) and (rsi_now > 30)
+    buy = ((macd_prev < sig_prev) and (macd_now > sig_now)) and (rsi_now < p['rsi_upper'])
+    sell = ((macd_prev > sig_prev) and (macd_now < sig_now)) and (rsi_now > p['rsi_lower'])
 
     # --- MODE HANDLER ---
-    if mode == "normal":
-        tp_pct = 0.0005   # 0.05%
-        sl_pct = 0.0010   # 0.1%
-    elif mode == "scalping":
-        tp_pct = 0.0002   # 0.02% (2 pip XAUUSD ~ 0.2)
-        sl_pct = 0.0004   # 0.04% (4 pip)
-    else:
-        tp_pct = 0.0005
-        sl_pct = 0.0010
+    tp_pct, sl_pct = mode_pcts(mode)
+    tp_pct = p.get('tp_pct', tp_pct)
+    sl_pct = p.get('sl_pct', sl_pct)
 
     if buy:
         sl = float(close_now * (1 - sl_pct))
@@ -116,3 +143,158 @@ def detect_signal(df, balance=1000, risk_pct=0.01,
                 'sl_band': sl, 'tp_band': tp, 'lot': lot, 'mode': mode}
 
     return None
+
+
+# ================================
+# === STRATEGY PLUGIN ============
+# ================================
+# Strategi mendeklarasikan indikator yang dibutuhkan di IndicatorGraph
+# bersama; node yang sama (mis. EMA 8) dihitung sekali untuk semua strategi.
+STRATEGIES = {}
+
+def register(name):
+    """Class decorator: make a Strategy available under ``name``."""
+    def deco(cls):
+        cls.name = name
+        STRATEGIES[name] = cls
+        return cls
+    return deco
+
+
+class Strategy:
+    """
+    Base class for strategy plugins.
+
+    ``requires(graph)`` runs once and stores the node keys it needs;
+    ``evaluate(graph, close)`` runs every poll and returns a signal dict
+    (the keys of detect_signal except ``lot``, plus ``strategy``; main
+    sizes orders with lot_by_risk) or None.
+    """
+    name = None
+    defaults = {}
+
+    def __init__(self, params=None, mode="scalping"):
+        params = params or {}
+        # Parameter per strategi ({"macd_rsi": {...}}) atau satu dict untuk semua
+        params = params.get(self.name, params)
+        self.p = dict(self.defaults, **{k: v for k, v in params.items() if not isinstance(v, dict)})
+        self.mode = mode
+
+    def requires(self, graph):
+        raise NotImplementedError
+
+    def evaluate(self, graph, close):
+        raise NotImplementedError
+
+    def signal(self, action, close):
+        tp_pct, sl_pct = mode_pcts(self.mode)
+        tp_pct = self.p.get('tp_pct', tp_pct)
+        sl_pct = self.p.get('sl_pct', sl_pct)
+        side = 1 if action == 'BUY' else -1
+        return {'action': action, 'price': float(close),
+                'sl_band': float(close * (1 - side * sl_pct)),
+                'tp_band': float(close * (1 + side * tp_pct)),
+                'mode': self.mode, 'strategy': self.name}
+
+
+def _crossed(graph, a, b):
+    """+1 if ``a`` crossed above ``b`` on the forming bar, -1 below, else 0."""
+    before = graph.prev(a) - graph.prev(b)
+    after = graph.now(a) - graph.now(b)
+    if before < 0 < after:
+        return 1
+    if before > 0 > after:
+        return -1
+    return 0
+
+
+@register('macd_rsi')
+class MacdRsi(Strategy):
+    """detect_signal as a plugin: MACD/signal cross with an RSI filter."""
+    defaults = DEFAULT_PARAMS
+
+    def requires(self, graph):
+        p = self.p
+        self.macd, self.sig, _ = graph.macd(p['fast'], p['slow'], p['signal'])
+        self.rsi = graph.rsi(p['rsi_period'])
+
+    def evaluate(self, graph, close):
+        cross = _crossed(graph, self.macd, self.sig)
+        rsi_now = graph.now(self.rsi)
+        if cross > 0 and rsi_now < self.p['rsi_upper']:
+            return self.signal('BUY', close)
+        if cross < 0 and rsi_now > self.p['rsi_lower']:
+            return self.signal('SELL', close)
+        return None
+
+
+@register('macd_trend')
+class MacdTrend(Strategy):
+    """MACD cross in the direction of an EMA trend filter (shares the MACD EMAs)."""
+    defaults = dict(fast=3, slow=8, signal=3, trend=8)
+
+    def requires(self, graph):
+        p = self.p
+        self.macd, self.sig, _ = graph.macd(p['fast'], p['slow'], p['signal'])
+        self.trend = graph.ema(p['trend'])
+
+    def evaluate(self, graph, close):
+        cross = _crossed(graph, self.macd, self.sig)
+        trend = graph.now(self.trend)
+        if cross > 0 and close > trend:
+            return self.signal('BUY', close)
+        if cross < 0 and close < trend:
+            return self.signal('SELL', close)
+        return None
+
+
+@register('bb_revert')
+class BollingerRevert(Strategy):
+    """Close re-entering the Bollinger band, confirmed by RSI."""
+    defaults = dict(bb_period=10, bb_dev=1.8, rsi_period=7, rsi_upper=70, rsi_lower=30)
+
+    def requires(self, graph):
+        p = self.p
+        self.upper, _, self.lower = graph.bollinger(p['bb_period'], p['bb_dev'])
+        self.rsi = graph.rsi(p['rsi_period'])
+        self.close = ('close',)
+
+    def evaluate(self, graph, close):
+        if _crossed(graph, self.close, self.lower) > 0 and graph.prev(self.rsi) < self.p['rsi_lower']:
+            return self.signal('BUY', close)
+        if _crossed(graph, self.close, self.upper) < 0 and graph.prev(self.rsi) > self.p['rsi_upper']:
+            return self.signal('SELL', close)
+        return None
+
+
+class StrategySet:
+    """Several strategies on one (symbol, timeframe), sharing one graph."""
+
+    def __init__(self, names, params=None, mode="scalping"):
+        unknown = [n for n in names if n not in STRATEGIES]
+        if unknown:
+            raise ValueError(f"unknown strategy {', '.join(unknown)}; available: {', '.join(STRATEGIES)}")
+        self.graph = IndicatorGraph()
+        self.strategies = [STRATEGIES[n](params, mode) for n in names]
+        for s in self.strategies:
+            s.requires(self.graph)
+
+    def evaluate(self, candles):
+        """Signals of all strategies for the latest candle (in registration order)."""
+        closes = np.asarray(candles['close'], dtype=float)
+        if len(closes) < 30:
+            return []
+        self.graph.sync(np.asarray(candles['time']), closes)
+        close = float(closes[-1])
+        signals = []
+        for s in self.strategies:
+            sig = s.evaluate(self.graph, close)
+            if sig is not None:
+                signals.append(sig)
+        return signals
+
+    def state(self):
+        return self.graph.state()
+
+    def restore(self, state):
+        return self.graph.restore(state)
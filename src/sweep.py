@@ -0,0 +1,225 @@
+"""
+Parameter sweep for detect_signal settings using all CPU cores.
+
+Candle arrays are placed in shared memory once; worker processes attach to
+them instead of receiving pickled copies, so each task only ships a small
+parameter dict. Each candidate is scored with backtest.run_backtest and the
+results are ranked by net P/L, then drawdown, then win rate.
+
+Search modes:
+    grid    - every combination of the grid values
+    random  - ``--samples`` random combinations from the grid
+    halving - successive halving: score all candidates on a short slice of
+              history, keep the best 1/eta, repeat on a longer slice
+
+Usage:
+    python src/sweep.py candles.csv --search grid --grid fast=2,3,5 slow=8,13,21
+    python src/sweep.py candles.csv --search halving --save best_params.json
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from tabulate import tabulate
+
+from backtest import load_candles, run_backtest
+
+CANDLE_FIELDS = ('time', 'open', 'high', 'low', 'close')
+
+DEFAULT_GRID = {
+    'fast': [3, 5, 8],
+    'slow': [8, 13, 21],
+    'signal': [3, 5, 9],
+    'rsi_period': [7, 14],
+    'rsi_upper': [65, 70, 80],
+    'rsi_lower': [20, 30, 35],
+    'tp_pct': [0.0002, 0.0005],
+    'sl_pct': [0.0004, 0.0010],
+}
+
+
+# ================================
+# === SHARED MEMORY ==============
+# ================================
+def share_candles(candles, fields=CANDLE_FIELDS):
+    """
+    Copy candle arrays into one shared memory block.
+
+    Returns ``(shm, meta)``; ``meta`` is a small picklable description that
+    workers pass to attach_candles. The caller must close/unlink ``shm``.
+    """
+    arrays = {k: np.ascontiguousarray(candles[k]) for k in fields}
+    size = sum(a.nbytes for a in arrays.values())
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    layout = []
+    offset = 0
+    for k, a in arrays.items():
+        np.ndarray(a.shape, a.dtype, buffer=shm.buf, offset=offset)[:] = a
+        layout.append((k, a.dtype.str, a.shape, offset))
+        offset += a.nbytes
+    return shm, {'name': shm.name, 'layout': layout}
+
+
+def attach_candles(meta):
+    """Read-only NumPy views over a block created by share_candles."""
+    try:
+        shm = shared_memory.SharedMemory(name=meta['name'], track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name=meta['name'])
+    candles = {}
+    for k, dtype, shape, offset in meta['layout']:
+        a = np.ndarray(shape, np.dtype(dtype), buffer=shm.buf, offset=offset)
+        a.flags.writeable = False
+        candles[k] = a
+    return shm, candles
+
+
+_worker = {}
+
+def _init_worker(meta, backtest_kwargs):
+    shm, candles = attach_candles(meta)
+    # Simpan referensi shm supaya buffer tidak ikut tertutup
+    _worker.update(shm=shm, candles=candles, kwargs=backtest_kwargs)
+
+
+def _evaluate(task):
+    params, start, end = task
+    _, _, stats = run_backtest(_worker['candles'], params=params, start=start, end=end,
+                               **_worker['kwargs'])
+    return params, stats
+
+
+# ================================
+# === SEARCH =====================
+# ================================
+def parse_grid(items):
+    """``['fast=2,3,5', 'tp_pct=0.0002,0.0005']`` -> grid dict."""
+    grid = dict(DEFAULT_GRID)
+    for item in items or []:
+        key, values = item.split('=', 1)
+        grid[key] = [float(v) if '.' in v else int(v) for v in values.split(',')]
+    return grid
+
+
+def valid(params):
+    return params['fast'] < params['slow'] and params['rsi_lower'] < params['rsi_upper']
+
+
+def grid_candidates(grid):
+    keys = list(grid)
+    for values in itertools.product(*(grid[k] for k in keys)):
+        params = dict(zip(keys, values))
+        if valid(params):
+            yield params
+
+
+def random_candidates(grid, samples, seed=None):
+    rng = random.Random(seed)
+    seen = set()
+    tries = 0
+    while len(seen) < samples and tries < samples * 20:
+        tries += 1
+        params = {k: rng.choice(v) for k, v in grid.items()}
+        key = tuple(sorted(params.items()))
+        if valid(params) and key not in seen:
+            seen.add(key)
+            yield params
+
+
+def rank_key(result):
+    _, stats = result
+    return (-stats['net_pnl'], stats['max_drawdown'], -stats['win_rate'])
+
+
+def run_sweep(candles, candidates, workers=None, search='grid', eta=3, min_bars=20000,
+              **backtest_kwargs):
+    """Evaluate candidates across a process pool; returns ranked (params, stats)."""
+    candidates = list(candidates)
+    n = len(candles['close'])
+    workers = workers or os.cpu_count() or 1
+    shm, meta = share_candles(candles)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(meta, backtest_kwargs)) as pool:
+            if search != 'halving':
+                tasks = [(p, 0, n) for p in candidates]
+                chunk = max(1, len(tasks) // (workers * 8))
+                return sorted(pool.map(_evaluate, tasks, chunksize=chunk), key=rank_key)
+
+            # Successive halving: data bertambah, kandidat berkurang
+            rounds = max(1, int(np.ceil(np.log(max(len(candidates), 1)) / np.log(eta))))
+            bars = max(min_bars, n // eta ** (rounds - 1))
+            while True:
+                start = max(0, n - bars)
+                tasks = [(p, start, n) for p in candidates]
+                chunk = max(1, len(tasks) // (workers * 8))
+                results = sorted(pool.map(_evaluate, tasks, chunksize=chunk), key=rank_key)
+                if bars >= n or len(results) <= 1:
+                    return results
+                candidates = [p for p, _ in results[:max(1, len(results) // eta)]]
+                bars = min(n, bars * eta)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def print_results(results, top=20):
+    rows = []
+    for params, stats in results[:top]:
+        rows.append([
+            ' '.join(f"{k}={v}" for k, v in params.items()),
+            stats['trades'],
+            f"{stats['net_pnl']:.2f}",
+            f"{stats['max_drawdown']:.2f}",
+            f"{stats['win_rate']:.2f}%",
+            f"{stats['profit_factor']:.2f}",
+        ])
+    headers = ["Params", "Trades", "Net P/L", "Max DD", "Win Rate", "PF"]
+    print(tabulate(rows, headers=headers, tablefmt="grid"))
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Parameter sweep for the MACD/RSI strategy')
+    ap.add_argument('candles', help='.csv or .npy candle file')
+    ap.add_argument('--search', choices=('grid', 'random', 'halving'), default='grid')
+    ap.add_argument('--grid', nargs='*', help='override grid values, e.g. fast=2,3,5')
+    ap.add_argument('--samples', type=int, default=200, help='candidates for random/halving')
+    ap.add_argument('--eta', type=int, default=3, help='halving keep ratio (1/eta)')
+    ap.add_argument('--seed', type=int, default=None)
+    ap.add_argument('--workers', type=int, default=None)
+    ap.add_argument('--mode', default='scalping')
+    ap.add_argument('--equity', type=float, default=1000.0)
+    ap.add_argument('--risk', type=float, default=1.0)
+    ap.add_argument('--top', type=int, default=20)
+    ap.add_argument('--save', help='write best params to this JSON file')
+    args = ap.parse_args()
+
+    candles = load_candles(args.candles)
+    grid = parse_grid(args.grid)
+    if args.search == 'grid':
+        candidates = grid_candidates(grid)
+    else:
+        candidates = random_candidates(grid, args.samples, args.seed)
+
+    t0 = time.perf_counter()
+    results = run_sweep(candles, candidates, workers=args.workers, search=args.search,
+                        eta=args.eta, mode=args.mode, equity=args.equity,
+                        risk_percent=args.risk)
+    elapsed = time.perf_counter() - t0
+
+    print_results(results, args.top)
+    print(f"{len(results)} candidates ranked in {elapsed:.1f}s")
+    if args.save and results:
+        with open(args.save, 'w') as f:
+            json.dump(results[0][0], f, indent=2)
+        print(f"Best params saved to {args.save}")
+
+
+if __name__ == '__main__':
+    main()
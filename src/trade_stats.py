@@ -0,0 +1,218 @@
+"""
+Streaming trade statistics.
+
+Every closing deal is folded into running accumulators once, in O(1):
+today's P/L (win / loss sums, count), overall win rate and profit factor,
+max drawdown of the realized equity curve, a rolling Sharpe over the last
+SHARPE_WINDOW trades and a last-N window for the dashboard table. The
+dashboard and the daily guards in ``main`` read these numbers instead of
+re-querying or re-scanning the history.
+
+The day rolls over at the broker day boundary: deal times from MT5 are in
+server time, so the trading day is ``time // 86400`` of the deal (or of the
+latest tick passed to ``roll``).
+
+Fed from ``HistoryStore.subscribe`` (history is replayed once, then only
+new deals arrive); see ``connector.get_trade_stats``.
+"""
+import math
+import os
+import threading
+from collections import deque
+
+from dotenv import load_dotenv
+
+from backend import mt5
+
+load_dotenv()
+
+TRADE_STATS_WINDOW = int(os.getenv('TRADE_STATS_WINDOW', '10'))   # last-N di dashboard
+SHARPE_WINDOW = int(os.getenv('SHARPE_WINDOW', '50'))              # jumlah trade untuk rolling Sharpe
+DAY = 86400
+
+
+def broker_day(t):
+    """Start (server-time epoch) of the broker day containing ``t``."""
+    return int(t) // DAY * DAY
+
+
+class Window:
+    """Running sum / sum of squares / wins of the last ``n`` values."""
+    __slots__ = ('n', 'values', 'total', 'total_sq', 'wins')
+
+    def __init__(self, n):
+        self.n = n
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.wins = 0
+
+    def push(self, x):
+        self.values.append(x)
+        self.total += x
+        self.total_sq += x * x
+        self.wins += x >= 0
+        if len(self.values) > self.n:
+            old = self.values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+            self.wins -= old >= 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def mean(self):
+        return self.total / len(self.values) if self.values else 0.0
+
+    def std(self):
+        """Sample standard deviation (0 with fewer than two values)."""
+        k = len(self.values)
+        if k < 2:
+            return 0.0
+        var = (self.total_sq - self.total * self.total / k) / (k - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class TradeStats:
+    """Accumulators for one scope (all symbols, or one symbol)."""
+
+    def __init__(self, window=TRADE_STATS_WINDOW, sharpe_window=SHARPE_WINDOW):
+        self.day_start = None
+        self.daily_profit = self.daily_win = self.daily_loss = 0.0
+        self.daily_count = 0
+        self.count = self.wins = 0
+        self.gross_profit = self.gross_loss = 0.0
+        self.equity = self.peak = self.max_drawdown = 0.0
+        self.returns = Window(sharpe_window)
+        self.window = Window(window)
+        self.last = deque(maxlen=window)      # deal terakhir, terbaru di kanan
+
+    def roll(self, now):
+        """Reset the daily accumulators if ``now`` (server time) is in a later day."""
+        day = broker_day(now)
+        if self.day_start is None or day > self.day_start:
+            self.day_start = day
+            self.daily_profit = self.daily_win = self.daily_loss = 0.0
+            self.daily_count = 0
+
+    def add(self, deal):
+        """Fold in one closing deal (a dict from ``record``)."""
+        net = deal['profit']
+        self.roll(deal['time_close'])
+        if broker_day(deal['time_close']) == self.day_start:
+            self.daily_profit += net
+            if net > 0:
+                self.daily_win += net
+            elif net < 0:
+                self.daily_loss += net
+            self.daily_count += 1
+        self.count += 1
+        self.wins += net >= 0
+        if net > 0:
+            self.gross_profit += net
+        else:
+            self.gross_loss -= net
+        self.equity += net
+        self.peak = max(self.peak, self.equity)
+        self.max_drawdown = max(self.max_drawdown, self.peak - self.equity)
+        self.returns.push(net)
+        self.window.push(net)
+        self.last.append(deal)
+
+    @property
+    def win_rate(self):
+        return self.wins / self.count * 100 if self.count else 0.0
+
+    @property
+    def profit_factor(self):
+        if self.gross_loss:
+            return self.gross_profit / self.gross_loss
+        return math.inf if self.gross_profit else 0.0
+
+    @property
+    def sharpe(self):
+        """Per-trade Sharpe (mean / std of net P/L) over the last SHARPE_WINDOW trades."""
+        std = self.returns.std()
+        return self.returns.mean() / std if std else 0.0
+
+    def daily(self):
+        return {'profit': self.daily_profit, 'win': self.daily_win,
+                'loss': self.daily_loss, 'count': self.daily_count}
+
+    def recent(self):
+        """Last-N closing deals, newest first."""
+        return list(reversed(self.last))
+
+    def summary(self):
+        return {'trades': self.count, 'win_rate': self.win_rate,
+                'profit_factor': self.profit_factor, 'max_drawdown': self.max_drawdown,
+                'sharpe': self.sharpe, 'net': self.equity, **self.daily()}
+
+
+def record(deal):
+    """
+    Dashboard row for a deal dict from the history store (full columns), or
+    None if it is not a closing BUY/SELL deal. Net P/L includes commission
+    and swap.
+    """
+    if deal['type'] not in (mt5.ORDER_TYPE_BUY, mt5.ORDER_TYPE_SELL) or deal['entry'] == mt5.DEAL_ENTRY_IN:
+        return None
+    return {
+        'ticket': deal['ticket'],
+        # Deal penutup berlawanan arah dengan posisinya
+        'type': 'SELL' if deal['type'] == mt5.ORDER_TYPE_BUY else 'BUY',
+        'symbol': deal['symbol'],
+        'volume': deal['volume'],
+        'price_open': deal['price'],
+        'price_close': deal['price'],
+        'time_close': deal['time'],
+        'profit': deal['profit'] + deal['commission'] + deal['swap'],
+    }
+
+
+class StatsBook:
+    """
+    TradeStats for all symbols plus one per symbol. ``add`` runs on the
+    thread that syncs the history (dashboard), ``roll`` / ``get`` on the
+    trading thread, so all three take the same lock.
+    """
+
+    def __init__(self, window=TRADE_STATS_WINDOW, sharpe_window=SHARPE_WINDOW):
+        self.window = window
+        self.sharpe_window = sharpe_window
+        self.all = TradeStats(window, sharpe_window)
+        self.symbols = {}
+        self.now = None         # waktu server terakhir yang diketahui
+        self.lock = threading.RLock()
+
+    def get(self, symbol=None):
+        if symbol is None:
+            return self.all
+        with self.lock:
+            stats = self.symbols.get(symbol)
+            if stats is None:
+                stats = self.symbols[symbol] = TradeStats(self.window, self.sharpe_window)
+                if self.now is not None:
+                    stats.roll(self.now)
+            return stats
+
+    def add(self, deal):
+        """HistoryStore listener: fold in one new deal (ignored if not a closing trade)."""
+        row = record(deal)
+        if row is None:
+            return
+        with self.lock:
+            if self.now is None or row['time_close'] > self.now:
+                self.now = row['time_close']
+            self.all.add(row)
+            self.get(row['symbol']).add(row)
+
+    def roll(self, now):
+        """Advance the broker clock (e.g. tick time) so days roll over without deals."""
+        with self.lock:
+            if self.now is not None and now <= self.now:
+                return
+            self.now = now
+            self.all.roll(now)
+            for stats in self.symbols.values():
+                stats.roll(now)
@@ -1,32 +1,23 @@
-import MetaTrader5 as mt5
+from backend import mt5
+from connector import get_tick, invalidate
+from execution import executor
 
-def send_market_order(symbol, action, volume, sl, tp, deviation=20, comment='python-mt5-bot'):
-    tick = mt5.symbol_info_tick(symbol)
-    if tick is None:
-        raise RuntimeError('No tick for ' + symbol)
-    price = tick.ask if action == 'BUY' else tick.bid
-    order_type = mt5.ORDER_TYPE_BUY if action == 'BUY' else mt5.ORDER_TYPE_SELL
-    request = {
-        'action': mt5.TRADE_ACTION_DEAL,
-        'symbol': symbol,
-        'volume': float(volume),
-        'type': order_type,
-        'price': float(price),
-        'sl': float(sl) if sl else 0.0,
-        'tp': float(tp) if tp else 0.0,
-        'deviation': deviation,
-        'magic': 234000,
-        'comment': comment,
-        'type_filling': mt5.ORDER_FILLING_FOK,
-    }
-    result = mt5.order_send(request)
-    return result
+def send_market_order(symbol, action, volume, sl, tp, deviation=20, comment='python-mt5-bot',
+                      signal_price=None):
+    """
+    Kirim market order lewat execution.executor (filling mode ter-cache,
+    retry requote). Detail latency & slippage: execution.last_report().
+    """
+    report = executor.send(symbol, action, volume, sl, tp, signal_price=signal_price,
+                           comment=comment, deviation=deviation)
+    return report.result
 
 def close_position(position):
     symbol = position.symbol
     volume = position.volume
-    action = 'SELL' if position.type == 0 else 'BUY'
-    tick = mt5.symbol_info_tick(symbol)
+    # position dari positions_get (type 0/1) atau PositionBook ('BUY'/'SELL')
+    action = 'SELL' if position.type in (mt5.ORDER_TYPE_BUY, 'BUY') else 'BUY'
+    tick = get_tick(symbol, max_age=0)
     price = tick.bid if action == 'SELL' else tick.ask
     order_type = mt5.ORDER_TYPE_SELL if action == 'SELL' else mt5.ORDER_TYPE_BUY
     request = {
@@ -38,9 +29,11 @@ def close_position(position):
         'price': float(price),
         'deviation': 20,
         'magic': 234000,
-        'comment': 'close by python'
+        'comment': 'close by python',
+        'type_filling': executor.filling_modes(symbol)[0],
     }
     res = mt5.order_send(request)
+    invalidate(symbol)
     return res
 
 def modify_sl_tp(position_ticket, symbol, sl=None, tp=None):
@@ -52,4 +45,5 @@ def modify_sl_tp(position_ticket, symbol, sl=None, tp=None):
         'tp': float(tp) if tp else 0.0,
     }
     res = mt5.order_send(request)
+    invalidate(symbol)
     return res
@@ -0,0 +1,138 @@
+"""
+Trailing stop for all open positions.
+
+Every call computes the new SL of every position in one NumPy pass:
+
+    new_sl = bid - TRAILING_PIPS * point     (BUY)
+    new_sl = ask + TRAILING_PIPS * point     (SELL)
+
+Like the terminal's own trailing stop it only starts once the new SL is
+at or beyond the open price, and it only moves the SL forward. A
+modification is sent only when it improves the SL by at least
+TRAILING_STEP_PIPS; the rest are counted as suppressed. Sends go through
+a token bucket (TRAILING_MAX_PER_SEC, burst TRAILING_BURST) so a fast
+market cannot flood the terminal or hit the broker's request limits;
+candidates over the budget (smallest improvement first) wait for the
+next call and are counted as throttled.
+"""
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+import metrics
+from backend import mt5
+from connector import get_symbol_spec, get_tick
+from trader import modify_sl_tp
+
+load_dotenv()
+
+TRAILING_PIPS = float(os.getenv('TRAILING_PIPS') or 0)            # jarak SL dari harga (point); 0 = off
+TRAILING_STEP_PIPS = float(os.getenv('TRAILING_STEP_PIPS') or 20)  # perbaikan minimum per modifikasi
+TRAILING_MAX_PER_SEC = float(os.getenv('TRAILING_MAX_PER_SEC') or 5)
+TRAILING_BURST = int(os.getenv('TRAILING_BURST') or 10)
+
+_t_trail = metrics.stage('trailing')
+
+
+class TrailingStop:
+    def __init__(self, distance=TRAILING_PIPS, step=TRAILING_STEP_PIPS,
+                 max_per_sec=TRAILING_MAX_PER_SEC, burst=TRAILING_BURST):
+        self.distance = distance
+        self.step = step
+        self.rate = max_per_sec
+        self.burst = burst
+        self.tokens = float(burst)
+        self._refilled = time.monotonic()
+        self.pending = {}       # ticket -> SL terakhir yang dikirim (sebelum book ter-sync)
+        self.sent = 0
+        self.suppressed = 0     # perbaikan < step
+        self.throttled = 0      # lewat budget order_send
+        self.failed = 0
+
+    def _take(self, n):
+        """Up to ``n`` send tokens from the bucket."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        k = min(n, int(self.tokens))
+        self.tokens -= k
+        return k
+
+    def _quote(self, symbol):
+        """(bid, ask, point, digits, stops_level) or None if the symbol has no data."""
+        tick = get_tick(symbol)
+        spec = get_symbol_spec(symbol)
+        if tick is None or spec is None:
+            return None
+        return tick.bid, tick.ask, spec.point, spec.digits, getattr(spec, 'trade_stops_level', 0) or 0
+
+    def plan(self, positions):
+        """
+        One vectorized pass over ``positions``: returns the indexes of the
+        positions whose SL should move (biggest improvement first) and the
+        new SL of every position.
+        """
+        quotes = {}
+        rows = np.empty((len(positions), 7))
+        for i, pos in enumerate(positions):
+            if pos.symbol not in quotes:
+                quotes[pos.symbol] = self._quote(pos.symbol)
+            q = quotes[pos.symbol]
+            if q is None:
+                rows[i] = np.nan
+                continue
+            bid, ask, point, digits, stops = q
+            # SL yang baru dikirim tapi belum terlihat di book tetap dihitung
+            sl = pos.sl
+            sent = self.pending.get(pos.ticket)
+            if sent is not None and (not sl or (sent - sl) * pos.side > 0):
+                sl = sent
+            rows[i] = (pos.side, pos.price_open, sl, bid if pos.side > 0 else ask, point, digits, stops)
+        side, price_open, sl, price, point, digits, stops = rows.T
+        scale = 10.0 ** digits
+        new_sl = np.round((price - side * np.maximum(self.distance, stops) * point) * scale) / scale
+        # Tanpa SL: perbaikan dihitung dari harga open
+        current = np.where(sl > 0, sl, price_open)
+        improvement = (new_sl - current) * side
+        with np.errstate(invalid='ignore'):
+            moving = ((new_sl - price_open) * side >= 0) & (improvement > 0)
+            candidate = moving & (improvement >= self.step * point)
+        self.suppressed += int(np.count_nonzero(moving & ~candidate))
+        idx = np.flatnonzero(candidate)
+        order = idx[np.argsort(-(improvement[idx] / point[idx]), kind='stable')]
+        return order, new_sl
+
+    def update(self, positions):
+        """Trail ``positions`` (PositionBook records); returns modifications sent."""
+        if not self.distance or not positions:
+            return 0
+        t0 = metrics.now()
+        live = {p.ticket for p in positions}
+        for ticket in [t for t in self.pending if t not in live]:
+            del self.pending[ticket]
+        suppressed = self.suppressed
+        order, new_sl = self.plan(positions)
+        allowed = self._take(len(order))
+        self.throttled += len(order) - allowed
+        sent = 0
+        for i in order[:allowed]:
+            pos = positions[i]
+            sl = float(new_sl[i])
+            res = modify_sl_tp(pos.ticket, pos.symbol, sl, pos.tp)
+            if getattr(res, 'retcode', None) == mt5.TRADE_RETCODE_DONE:
+                self.pending[pos.ticket] = sl
+                sent += 1
+            else:
+                self.failed += 1
+        self.sent += sent
+        metrics.incr('trailing_sent', sent)
+        metrics.incr('trailing_suppressed', self.suppressed - suppressed)
+        metrics.incr('trailing_throttled', len(order) - allowed)
+        _t_trail.record(t0)
+        return sent
+
+    def summary(self):
+        return {'sent': self.sent, 'suppressed': self.suppressed,
+                'throttled': self.throttled, 'failed': self.failed}
@@ -0,0 +1,270 @@
+"""
+Walk-forward analysis for the detect_signal parameters.
+
+History is cut into rolling windows: the parameters are optimized on
+``--train-days`` of in-sample bars, the best set is traded on the next
+``--test-days`` of out-of-sample bars, then everything moves forward by
+``--step-days`` (default: test-days; a shorter step cuts each test window
+at the start of the next, so no bar is traded twice). Only the
+out-of-sample trades count; stitched together they form one equity curve
+that was never fitted on the bars it traded.
+
+Every in-sample evaluation (symbol x window x candidate) goes to one
+process pool. Candle store series (``SYMBOL:TF`` or a ``.candles`` path)
+and ``.npy`` files are memory-mapped by each worker, so all workers read
+the same pages instead of receiving copies; CSV input is put into shared
+memory once (sweep.share_candles). The out-of-sample runs are chained in
+the parent: each window starts with the equity the previous one ended
+with, so position sizing compounds like one account per symbol.
+
+Usage:
+    python src/candle_store.py import data/XAUUSDm_M1.csv --symbol XAUUSDm
+    python src/walkforward.py XAUUSDm:M1 EURUSDm:M1 --store data/candles --train-days 60 --test-days 14
+    python src/walkforward.py candles.csv --search grid --grid fast=3,5 slow=13,21 --equity-out wf.csv
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+from tabulate import tabulate
+
+from backtest import TRADE_DTYPE, load_candles, run_backtest, summarize
+from sweep import (attach_candles, grid_candidates, parse_grid, random_candidates, rank_key,
+                   share_candles)
+
+DAY = 86400
+# Bar sebelum window out-of-sample untuk pemanasan indikator (tanpa entry)
+WARMUP_BARS = 500
+
+
+def resolve(source, store):
+    """File path of ``source`` (a file, or ``SYMBOL:TF`` in the candle store)."""
+    if os.path.exists(source):
+        return source
+    symbol, _, tf = source.partition(':')
+    return os.path.join(store, f'{symbol}_{(tf or "M1").upper()}') + '.candles'
+
+
+def make_windows(times, train_days, test_days, step_days=None, min_bars=1000):
+    """
+    Rolling windows over sorted bar ``times`` as index triples
+    ``(is_start, oos_start, oos_end)``; in-sample is ``is_start:oos_start``.
+    Out-of-sample ranges never overlap: with a step shorter than the test
+    period each one ends where the next one starts.
+    """
+    train, test = int(train_days * DAY), int(test_days * DAY)
+    step = int((step_days or test_days) * DAY)
+    if step <= 0 or test <= 0:
+        raise ValueError('test and step periods must be positive')
+    n = len(times)
+    if n == 0:
+        return []
+    bounds = []
+    t, last = int(times[0]), int(times[-1])
+    while t + train <= last:
+        lo, mid, hi = np.searchsorted(times, [t, t + train, t + train + test])
+        if mid - lo >= min_bars:
+            bounds.append((int(lo), int(mid), int(hi)))
+        t += step
+    out = []
+    for k, (lo, mid, hi) in enumerate(bounds):
+        if k + 1 < len(bounds):
+            hi = min(hi, bounds[k + 1][1])
+        if hi > mid:
+            out.append((lo, mid, hi))
+    return out
+
+
+# ================================
+# === WORKER =====================
+# ================================
+_worker = {}
+
+def _init_worker(refs, backtest_kwargs):
+    sources, shms = [], []
+    for ref in refs:
+        if 'shm' in ref:
+            shm, candles = attach_candles(ref['shm'])
+            shms.append(shm)
+        else:
+            # .candles / .npy: map file yang sama di semua worker
+            candles = load_candles(ref['path'])
+        sources.append(candles)
+    _worker.update(sources=sources, shms=shms, kwargs=backtest_kwargs)
+
+
+def _evaluate(task):
+    key, params, start, end = task
+    _, _, stats = run_backtest(_worker['sources'][key[0]], params=params, start=start, end=end,
+                               **_worker['kwargs'])
+    return key, params, stats
+
+
+# ================================
+# === WALK-FORWARD ===============
+# ================================
+def _day(t):
+    return datetime.fromtimestamp(int(t), timezone.utc).strftime('%Y-%m-%d')
+
+
+def run_walkforward(sources, candidates, train_days=60, test_days=14, step_days=None,
+                    workers=None, equity=1000.0, **backtest_kwargs):
+    """
+    ``sources``: list of (label, path). Returns (windows, trades, curve, stats):
+    one row per window, the stitched out-of-sample trades (sorted by exit
+    time, with a ``symbol`` field), the combined equity after every exit
+    and the summary of that curve.
+    """
+    candidates = list(candidates)
+    if not candidates:
+        raise ValueError('no parameter candidates to evaluate')
+    workers = workers or os.cpu_count() or 1
+    loaded, refs, shms = [], [], []
+    for label, path in sources:
+        candles = load_candles(path)
+        if path.endswith(('.candles', '.npy')):
+            refs.append({'path': path})
+        else:
+            shm, meta = share_candles(candles)
+            shms.append(shm)
+            refs.append({'shm': meta})
+        loaded.append((label, candles, make_windows(candles['time'], train_days, test_days,
+                                                     step_days)))
+
+    best = {}
+    try:
+        tasks = [((i, w), params, lo, mid)
+                 for i, (_, _, wins) in enumerate(loaded)
+                 for w, (lo, mid, _) in enumerate(wins)
+                 for params in candidates]
+        if tasks:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(refs, dict(backtest_kwargs, equity=equity))) as pool:
+                chunk = max(1, len(tasks) // (workers * 8))
+                for key, params, stats in pool.map(_evaluate, tasks, chunksize=chunk):
+                    if key not in best or rank_key((params, stats)) < rank_key(best[key]):
+                        best[key] = (params, stats)
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+    # Out-of-sample berurutan per simbol: equity window berikutnya = akhir window sebelumnya
+    windows, parts = [], []
+    for i, (label, candles, wins) in enumerate(loaded):
+        eq = equity
+        for w, (lo, mid, hi) in enumerate(wins):
+            params, is_stats = best[(i, w)]
+            trades, _, stats = run_backtest(candles, params=params, equity=eq,
+                                            start=max(0, mid - WARMUP_BARS), end=hi, trade_from=mid,
+                                            **backtest_kwargs)
+            eq = stats['final_equity']
+            parts.append((label, trades))
+            windows.append({
+                'symbol': label, 'in_sample': (_day(candles['time'][lo]), _day(candles['time'][mid - 1])),
+                'out_of_sample': (_day(candles['time'][mid]), _day(candles['time'][hi - 1])),
+                'params': params, 'is_net': is_stats['net_pnl'], 'oos': stats,
+            })
+
+    dtype = np.dtype(TRADE_DTYPE.descr + [('symbol', 'U32')])
+    trades = np.empty(sum(len(t) for _, t in parts), dtype)
+    k = 0
+    for label, t in parts:
+        for name in TRADE_DTYPE.names:
+            trades[name][k:k + len(t)] = t[name]
+        trades['symbol'][k:k + len(t)] = label
+        k += len(t)
+    trades = trades[np.argsort(trades['exit_time'], kind='stable')]
+    # Satu akun per simbol, digabung jadi satu kurva
+    start_equity = equity * len(sources)
+    curve = start_equity + np.cumsum(trades['pnl'])
+    return windows, trades, curve, summarize(trades, curve, start_equity)
+
+
+def print_windows(windows):
+    rows = []
+    for w in windows:
+        oos = w['oos']
+        rows.append([
+            w['symbol'],
+            ' .. '.join(w['in_sample']),
+            ' .. '.join(w['out_of_sample']),
+            ' '.join(f"{k}={v}" for k, v in w['params'].items()),
+            f"{w['is_net']:.2f}",
+            oos['trades'],
+            f"{oos['net_pnl']:.2f}",
+            f"{oos['max_drawdown']:.2f}",
+        ])
+    headers = ["Symbol", "In-sample", "Out-of-sample", "Best params", "IS Net",
+               "OOS Trades", "OOS Net", "OOS DD"]
+    print(tabulate(rows, headers=headers, tablefmt="grid"))
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Walk-forward analysis for the MACD/RSI strategy')
+    ap.add_argument('sources', nargs='+', help='SYMBOL:TF from the candle store, or .candles/.npy/.csv files')
+    ap.add_argument('--store', default=os.getenv('CANDLE_STORE') or 'data/candles')
+    ap.add_argument('--train-days', type=float, default=60)
+    ap.add_argument('--test-days', type=float, default=14)
+    ap.add_argument('--step-days', type=float, default=None,
+                    help='default: --test-days; shorter steps cut each test window at the next one')
+    ap.add_argument('--search', choices=('grid', 'random'), default='random')
+    ap.add_argument('--grid', nargs='*', help='override grid values, e.g. fast=2,3,5')
+    ap.add_argument('--samples', type=int, default=60, help='candidates for random search')
+    ap.add_argument('--seed', type=int, default=None)
+    ap.add_argument('--workers', type=int, default=None)
+    ap.add_argument('--mode', default='scalping')
+    ap.add_argument('--equity', type=float, default=1000.0, help='start equity per symbol')
+    ap.add_argument('--risk', type=float, default=1.0)
+    ap.add_argument('--trades', help='write stitched out-of-sample trades to this CSV')
+    ap.add_argument('--equity-out', help='write the combined equity curve to this CSV')
+    ap.add_argument('--save', help='write per-window best params to this JSON file')
+    args = ap.parse_args()
+
+    sources = []
+    for s in args.sources:
+        path = resolve(s, args.store)
+        label = os.path.splitext(os.path.basename(path))[0]
+        sources.append((label, path))
+    grid = parse_grid(args.grid)
+    if args.search == 'grid':
+        candidates = list(grid_candidates(grid))
+    else:
+        candidates = list(random_candidates(grid, args.samples, args.seed))
+
+    if not candidates:
+        ap.error('no parameter candidates: --samples must be > 0 and --grid must yield a value per key')
+
+    t0 = time.perf_counter()
+    windows, trades, curve, stats = run_walkforward(
+        sources, candidates, train_days=args.train_days, test_days=args.test_days,
+        step_days=args.step_days, workers=args.workers, equity=args.equity,
+        mode=args.mode, risk_percent=args.risk)
+    elapsed = time.perf_counter() - t0
+
+    print_windows(windows)
+    print("\nStitched out-of-sample:")
+    for k, v in stats.items():
+        print(f"{k:<14}: {v:.2f}" if isinstance(v, float) else f"{k:<14}: {v}")
+    print(f"{len(windows)} windows x {len(candidates)} candidates in {elapsed:.1f}s")
+
+    if args.trades or args.equity_out:
+        import pandas as pd
+        if args.trades:
+            pd.DataFrame(trades).to_csv(args.trades, index=False)
+        if args.equity_out:
+            pd.DataFrame({'time': trades['exit_time'], 'equity': curve}).to_csv(args.equity_out,
+                                                                              index=False)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump([{k: w[k] for k in ('symbol', 'in_sample', 'out_of_sample', 'params')}
+                       for w in windows], f, indent=2)
+        print(f"Window params saved to {args.save}")
+
+
+if __name__ == '__main__':
+    main()